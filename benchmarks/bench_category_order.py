@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# benchmarks/bench_category_order.py
+"""
+Static vs dynamic (most-constrained-first) category order in the weighted fill.
+
+For each seed and order, counts fill dead-ends ("No valid traits left" warnings), duplicate
+resample failures, traits outside tolerance after the fill (and by how much in total) and
+adjustment iterations, and times the generation.
+
+    python benchmarks/bench_category_order.py --size 4200 --seeds 1-10
+"""
+import argparse
+import re
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.pre_validator import load_yaml_config
+from src.generator import Generator, CATEGORY_ORDERS
+from src.quotas import resolve_numerology
+from src.seed_search import parse_seed_range
+
+ITERATIONS_PATTERN = re.compile(r"after (\d+) iterations|Max iterations \((\d+)\)")
+
+
+def run(numerology_config, rules_config, seed, **generator_kwargs):
+    stats = {"dead_ends": 0, "duplicates": 0, "outside": 0, "deviation": 0, "iterations": 0, "error": None}
+    generator = None
+
+    def on_log(message: str):
+        if message.startswith("Adjustment Phase starting"):
+            config = generator.compiled_config
+            for trait_id, count in enumerate(generator.trait_counts.counts):
+                excess = abs(count - config.target_counts[trait_id]) - config.tolerances[trait_id]
+                if excess > 0:
+                    stats["outside"] += 1
+                    stats["deviation"] += excess
+        elif "WARNING_FILL: No valid traits left" in message:
+            stats["dead_ends"] += 1
+        elif "no unique resample was found" in message:
+            stats["duplicates"] += 1
+        else:
+            match = ITERATIONS_PATTERN.search(message)
+            if match:
+                stats["iterations"] = int(match.group(1) or match.group(2))
+
+    started = time.perf_counter()
+    generator = Generator(numerology_config, rules_config, seed=seed, log_callback=on_log, **generator_kwargs)
+    try:
+        generator.generate_tokens()
+    except (RuntimeError, ValueError) as e:
+        stats["error"] = str(e).splitlines()[0][:60]
+    stats["elapsed"] = time.perf_counter() - started
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare category orders of the weighted fill.")
+    parser.add_argument("--size", type=int, default=420, help="Number of tokens (default: 420).")
+    parser.add_argument("--seeds", default="1-10", help="Seeds, e.g. '1-10' or '3,7' (default: 1-10).")
+    parser.add_argument("--numerology", default="numerology.yaml")
+    parser.add_argument("--rules", default="rules.yaml")
+    args = parser.parse_args()
+
+    numerology_config = resolve_numerology(load_yaml_config(args.numerology), target_count=args.size)
+    rules_config = load_yaml_config(args.rules)
+    seeds = parse_seed_range(args.seeds)
+    print(f"Collection size: {args.size}  seeds: {args.seeds}")
+    print(f"{'order':<8} {'dead-ends':>10} {'dup fails':>10} {'outside':>8} {'deviation':>10} {'adj iters':>10} {'failed':>7} {'time':>9}")
+    for category_order in CATEGORY_ORDERS:
+        results = [run(numerology_config, rules_config, seed, category_order=category_order) for seed in seeds]
+        total = lambda key: sum(result[key] for result in results)
+        failed = sum(1 for result in results if result["error"])
+        print(f"{category_order:<8} {total('dead_ends'):>10} {total('duplicates'):>10} {total('outside'):>8} "
+              f"{total('deviation'):>10} {total('iterations'):>10} "
+              f"{failed:>7} {total('elapsed'):>8.2f}s")
+
+
+if __name__ == "__main__":
+    main()
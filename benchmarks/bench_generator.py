@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# benchmarks/bench_generator.py
+"""
+Generation benchmark for large collections.
+
+Scales numerology.yaml to --size tokens (largest remainder per category, see src/quotas.py),
+validates it, generates once and reports wall time per phase and peak memory.
+
+    python benchmarks/bench_generator.py --size 100000
+"""
+import argparse
+import resource
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.pre_validator import PreValidator, load_yaml_config
+from src.generator import Generator, ADJUSTMENT_MODES, ALLOCATION_MODES, CATEGORY_ORDERS, WEIGHTING_MODES
+from src.quotas import resolve_numerology
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark token generation at a given collection size.")
+    parser.add_argument("--size", type=int, default=100000, help="Number of tokens (default: 100000).")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--numerology", default="numerology.yaml")
+    parser.add_argument("--rules", default="rules.yaml")
+    parser.add_argument("--allocation_mode", choices=list(ALLOCATION_MODES), default="weighted")
+    parser.add_argument("--adjustment_mode", choices=list(ADJUSTMENT_MODES), default="greedy")
+    parser.add_argument("--category_order", choices=list(CATEGORY_ORDERS), default="static")
+    parser.add_argument("--weighting_mode", choices=list(WEIGHTING_MODES), default="remaining")
+    parser.add_argument("--column_sampling", action="store_true", help="Draw free categories as whole columns in the weighted fill.")
+    parser.add_argument("--token_store", default=None, help="Back the token store with a memory-mapped file at this path.")
+    parser.add_argument("--skip_validation", action="store_true", help="Do not run PreValidator on the scaled numerology.")
+    args = parser.parse_args()
+
+    numerology_config = resolve_numerology(load_yaml_config(args.numerology), target_count=args.size)
+    rules_config = load_yaml_config(args.rules)
+    print(f"Collection size: {args.size}  seed: {args.seed}  allocation: {args.allocation_mode}  adjustment: {args.adjustment_mode}")
+
+    if not args.skip_validation:
+        started = time.perf_counter()
+        results = PreValidator(numerology_config, rules_config).validate()
+        print(f"  validate      {time.perf_counter() - started:8.2f}s  {results[0] if len(results) == 1 else f'{len(results)} error(s)'}")
+        for error in results[1:] if len(results) > 1 else []:
+            print(f"    - {error}")
+
+    phase_started = {"t": time.perf_counter()}
+    phase_times = []
+    phase_markers = ("Seeding Sovereign", "Weighted Random Fill Phase starting", "Deck Allocation Phase starting",
+                     "Swap Repair Phase starting", "Adjustment Phase starting", "Flow Rebalancing", "Final Validation starting")
+
+    def on_log(message: str):
+        for marker in phase_markers:
+            if message.startswith(marker):
+                now = time.perf_counter()
+                phase_times.append((marker, now - phase_started["t"]))
+                phase_started["t"] = now
+
+    started = time.perf_counter()
+    generator = Generator(numerology_config, rules_config, seed=args.seed, log_callback=on_log,
+                          allocation_mode=args.allocation_mode, adjustment_mode=args.adjustment_mode,
+                          column_sampling=args.column_sampling, category_order=args.category_order,
+                          weighting_mode=args.weighting_mode, token_store_path=args.token_store)
+    tokens = generator.generate_tokens()
+    total = time.perf_counter() - started
+    phase_times.append(("end", time.perf_counter() - phase_started["t"]))
+
+    # Each entry's time belongs to the phase that started at the previous marker
+    for (marker, _), (_, elapsed) in zip(phase_times, phase_times[1:]):
+        print(f"  {marker[:40]:<40} {elapsed:8.2f}s")
+    print(f"  generate      {total:8.2f}s  ({len(tokens) / total:,.0f} tokens/s)")
+    print(f"  peak RSS      {peak_rss_mb():8.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+# benchmarks/bench_sampling.py
+"""
+Per-draw cost of the fill's weighted sampling as a category grows wider:
+rebuilding weights + random.choices (O(traits)) vs FenwickSampler update + draw (O(log traits)).
+
+    python benchmarks/bench_sampling.py
+"""
+import random
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.sampling import FenwickSampler
+
+DRAWS = 20000
+
+
+def bench_choices(targets, rng):
+    counts = [0] * len(targets)
+    population = range(len(targets))
+    for _ in range(DRAWS):
+        weights = [float(t - c + 1) if t > c else 0.001 for t, c in zip(targets, counts)]
+        counts[rng.choices(population, weights=weights, k=1)[0]] += 1
+
+
+def bench_fenwick(targets, rng):
+    counts = [0] * len(targets)
+    weight = lambda i: (targets[i] - counts[i] + 1) * 1000 if targets[i] > counts[i] else 1
+    sampler = FenwickSampler([weight(i) for i in range(len(targets))])
+    for _ in range(DRAWS):
+        i = sampler.sample(rng)
+        counts[i] += 1
+        sampler.update(i, weight(i))
+
+
+def main():
+    print(f"{DRAWS} draws per run")
+    print(f"{'traits':>8} {'choices':>10} {'fenwick':>10}")
+    for width in (8, 32, 128, 512, 2048):
+        targets = [DRAWS // width + 1] * width
+        timings = []
+        for bench in (bench_choices, bench_fenwick):
+            started = time.perf_counter()
+            bench(targets, random.Random(1))
+            timings.append(time.perf_counter() - started)
+        print(f"{width:>8} {timings[0]:>9.3f}s {timings[1]:>9.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+# benchmarks/bench_singleton_seeding.py
+"""
+Singleton seeding at scale: --singletons traits with target_count 1, spread over
+--categories categories (each filled up by one common trait), seeded over --size tokens.
+
+    python benchmarks/bench_singleton_seeding.py --singletons 1000 --size 100000
+"""
+import argparse
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.generator import Generator
+from src.token_state import TokenStates
+from src.token_store import TokenStore
+
+
+def build_numerology(size: int, singletons: int, category_total: int):
+    categories = {}
+    for cat_idx in range(category_total):
+        count = singletons // category_total + (1 if cat_idx < singletons % category_total else 0)
+        traits = {f"one_of_one_{cat_idx:02d}_{i:04d}": {"target_count": 1, "tolerance": 0} for i in range(count)}
+        traits["common"] = {"target_count": size - count, "tolerance": 0}
+        categories[f"Category {cat_idx:02d}"] = {"traits": traits}
+    return {"target_count": size, "categories": categories}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark seeding of 1/1 traits.")
+    parser.add_argument("--size", type=int, default=100000, help="Number of tokens (default: 100000).")
+    parser.add_argument("--singletons", type=int, default=1000, help="Number of 1/1 traits (default: 1000).")
+    parser.add_argument("--categories", type=int, default=10, help="Categories the 1/1 traits are spread over (default: 10).")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    numerology_config = build_numerology(args.size, args.singletons, args.categories)
+    generator = Generator(numerology_config, {}, seed=args.seed, log_callback=lambda m: None)
+    # The state generate_tokens() sets up before seeding: an empty token store and its derived per-token state
+    generator.token_store = TokenStore.create(generator.compiled_config, args.size, len(str(args.size)))
+    generator.tokens_data = generator.token_store.rows()
+    generator.token_states = TokenStates(generator.compiled_config, generator.tokens_data)
+    generator.trait_counts.reset()
+
+    started = time.perf_counter()
+    generator._seed_special_singletons()
+    elapsed = time.perf_counter() - started
+
+    seeded = sum(len(data["traits"]) for data in generator.tokens_data)
+    print(f"{args.singletons} singletons over {args.size} tokens: {seeded} seeded in {elapsed:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+# benchmarks/bench_weighting.py
+"""
+"remaining" vs "lookahead" selection weights in the weighted fill.
+
+Reports the same fill-quality numbers as bench_category_order.py: traits outside tolerance
+after the fill, their total deviation beyond tolerance and adjustment iterations.
+
+    python benchmarks/bench_weighting.py --size 4200 --seeds 1-5
+"""
+import argparse
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from src.pre_validator import load_yaml_config
+from src.generator import WEIGHTING_MODES
+from src.quotas import resolve_numerology
+from src.seed_search import parse_seed_range
+from bench_category_order import run
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare selection weightings of the weighted fill.")
+    parser.add_argument("--size", type=int, default=420, help="Number of tokens (default: 420).")
+    parser.add_argument("--seeds", default="1-10", help="Seeds, e.g. '1-10' or '3,7' (default: 1-10).")
+    parser.add_argument("--numerology", default="numerology.yaml")
+    parser.add_argument("--rules", default="rules.yaml")
+    args = parser.parse_args()
+
+    numerology_config = resolve_numerology(load_yaml_config(args.numerology), target_count=args.size)
+    rules_config = load_yaml_config(args.rules)
+    seeds = parse_seed_range(args.seeds)
+    print(f"Collection size: {args.size}  seeds: {args.seeds}")
+    print(f"{'weighting':<10} {'outside':>8} {'deviation':>10} {'adj iters':>10} {'failed':>7} {'time':>9}")
+    for weighting_mode in WEIGHTING_MODES:
+        results = [run(numerology_config, rules_config, seed, weighting_mode=weighting_mode) for seed in seeds]
+        total = lambda key: sum(result[key] for result in results)
+        failed = sum(1 for result in results if result["error"])
+        print(f"{weighting_mode:<10} {total('outside'):>8} {total('deviation'):>10} {total('iterations'):>10} "
+              f"{failed:>7} {total('elapsed'):>8.2f}s")
+
+
+if __name__ == "__main__":
+    main()
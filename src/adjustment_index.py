@@ -0,0 +1,92 @@
+# src/adjustment_index.py
+"""
+Incrementally maintained indexes for the Generator's adjustment phase.
+
+The adjustment phase moves tokens from over-assigned traits to under-assigned
+traits of the same category. Instead of rescanning every token and every trait
+count each iteration, it keeps an inverted index of which tokens hold each trait
+and priority queues of traits ordered by how far they are from target. Both are
+updated on every reassignment, so the work per iteration is proportional to the
+number of changes rather than to collection size x trait count.
+"""
+
+import heapq
+from typing import List, Dict, Any, Tuple, Optional, Set
+
+
+class TraitTokenIndex:
+    """Inverted index: trait ID -> set of token indices currently holding that trait."""
+
+    def __init__(self, config, tokens_data: List[Dict[str, Any]]):
+        self.holders: List[Set[int]] = [set() for _ in range(config.trait_total)]
+        trait_index = config.trait_index
+        for token_idx, token_data in enumerate(tokens_data):
+            for cat, trait_name in token_data['traits'].items():
+                trait_id = trait_index.get((cat, trait_name))
+                if trait_id is not None:
+                    self.holders[trait_id].add(token_idx)
+
+    def tokens_with(self, trait_id: int) -> Set[int]:
+        return self.holders[trait_id]
+
+    def add(self, token_idx: int, trait_id: int):
+        """Records that a token received a trait in a category it did not hold yet."""
+        self.holders[trait_id].add(token_idx)
+
+    def move(self, token_idx: int, old_trait_id: int, new_trait_id: int):
+        """Records that a token switched from one trait to another."""
+        self.holders[old_trait_id].discard(token_idx)
+        self.holders[new_trait_id].add(token_idx)
+
+
+class DeviationQueue:
+    """
+    Max-priority queue of trait IDs keyed by a positive deviation from target.
+
+    Updates never search the heap: each update bumps the trait's version and pushes
+    a new entry, and entries whose version is out of date are dropped when they
+    reach the top. Traits with a deviation of zero or less are not queued.
+    """
+
+    def __init__(self):
+        self._heap: List[Tuple[int, int, int]] = []  # (-deviation, trait_id, version)
+        self._versions: Dict[int, int] = {}
+
+    def update(self, trait_id: int, deviation: int):
+        version = self._versions.get(trait_id, 0) + 1
+        self._versions[trait_id] = version
+        if deviation > 0:
+            heapq.heappush(self._heap, (-deviation, trait_id, version))
+
+    def _drop_stale(self):
+        heap = self._heap
+        versions = self._versions
+        while heap and versions[heap[0][1]] != heap[0][2]:
+            heapq.heappop(heap)
+
+    def peek(self) -> Optional[Tuple[int, int]]:
+        """(deviation, trait_id) of the most deviant trait without removing it, or None."""
+        self._drop_stale()
+        if not self._heap:
+            return None
+        neg_deviation, trait_id, _ = self._heap[0]
+        return (-neg_deviation, trait_id)
+
+    def pop(self) -> Optional[Tuple[int, int]]:
+        """Removes and returns (deviation, trait_id) of the most deviant trait, or None."""
+        self._drop_stale()
+        if not self._heap:
+            return None
+        neg_deviation, trait_id, _ = heapq.heappop(self._heap)
+        self._versions[trait_id] += 1
+        return (-neg_deviation, trait_id)
+
+    def pop_above(self, threshold: int) -> List[Tuple[int, int]]:
+        """Removes and returns every trait whose deviation exceeds `threshold`, most deviant first."""
+        popped = []
+        while True:
+            top = self.peek()
+            if top is None or top[0] <= threshold:
+                return popped
+            popped.append(self.pop())
+
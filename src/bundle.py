@@ -0,0 +1,130 @@
+# src/bundle.py
+"""
+Packed single-file metadata bundle: every token's JSON document in one file.
+
+    header   32 bytes: magic, format version, token count, token ID width, index offset
+    records  the token JSON documents, concatenated, exactly as written to json/<token_id>.json
+    index    token count fixed-width entries: record offset (uint64), record length (uint32),
+             token ID (UTF-8, NUL-padded to the ID width)
+
+BundleReader memory-maps a bundle; token N is one index entry read plus one slice, so
+opening a collection of any size costs the same and nothing is parsed until it is asked
+for. Records are the exported documents byte for byte, so `unpack_bundle` (src/exporter.py,
+which also writes bundles) restores the json/ directory losslessly.
+"""
+
+import json
+import mmap
+import os
+import struct
+from typing import List, Dict, Any, Optional, Iterator, Tuple
+
+MAGIC = b"NFTBUNDL"
+FORMAT_VERSION = 1
+BUNDLE_NAME = "metadata.bundle" # Written by the exporter next to json/
+_HEADER = struct.Struct("<8sIIIQ4x") # magic, version, token_count, id_width, index_offset; padded to 32 bytes
+_ENTRY = struct.Struct("<QI") # record offset, record length; followed by the token ID bytes
+
+
+class BundleWriter:
+    """
+    Appends token records to a new bundle at `path`. The file is assembled under a temporary
+    name and renamed into place by `close`, so readers never see a partial bundle.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._temp_path = path + ".tmp"
+        self._file = open(self._temp_path, "wb")
+        self._file.write(bytes(_HEADER.size))
+        self._entries: List[Tuple[int, int, bytes]] = [] # (offset, length, token ID)
+        self._offset = _HEADER.size
+
+    def add(self, token_id: str, document: str):
+        record = document.encode("utf-8")
+        self._file.write(record)
+        self._entries.append((self._offset, len(record), token_id.encode("utf-8")))
+        self._offset += len(record)
+
+    def close(self):
+        """Writes the index and header and moves the bundle into place."""
+        id_width = max((len(token_id) for _, _, token_id in self._entries), default=0)
+        entry = struct.Struct(_ENTRY.format + f"{id_width}s")
+        self._file.write(b"".join(entry.pack(offset, length, token_id) for offset, length, token_id in self._entries))
+        self._file.seek(0)
+        self._file.write(_HEADER.pack(MAGIC, FORMAT_VERSION, len(self._entries), id_width, self._offset))
+        self._file.close()
+        os.replace(self._temp_path, self.path)
+
+    def abort(self):
+        self._file.close()
+        os.remove(self._temp_path)
+
+    def __enter__(self) -> "BundleWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class BundleReader:
+    """Random access to the tokens of a bundle: `reader[n]` is token n's metadata dict, in export order."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, self.token_count, self.id_width, self._index_offset = _HEADER.unpack_from(self._buffer, 0)
+        except struct.error:
+            magic, version = None, None
+        if magic != MAGIC or version != FORMAT_VERSION:
+            self._buffer.close()
+            raise ValueError(f"{path} is not a version {FORMAT_VERSION} metadata bundle.")
+        self._entry = struct.Struct(_ENTRY.format + f"{self.id_width}s")
+        self._rows: Optional[Dict[str, int]] = None # Token ID -> index; built on the first lookup by ID
+
+    def __len__(self) -> int:
+        return self.token_count
+
+    def _index_entry(self, n: int) -> Tuple[int, int, bytes]:
+        if not 0 <= n < self.token_count:
+            raise IndexError("token index out of range")
+        return self._entry.unpack_from(self._buffer, self._index_offset + n * self._entry.size)
+
+    def document(self, n: int) -> bytes:
+        """Token n's JSON document, as exported."""
+        offset, length, _ = self._index_entry(n)
+        return self._buffer[offset:offset + length]
+
+    def token_id(self, n: int) -> str:
+        return self._index_entry(n)[2].rstrip(b"\0").decode("utf-8")
+
+    def __getitem__(self, n: int) -> Dict[str, Any]:
+        return json.loads(self.document(n))
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return (self[n] for n in range(self.token_count))
+
+    def index_of(self, token_id: str) -> int:
+        """Position of a token ID (KeyError if absent)."""
+        if self._rows is None:
+            self._rows = {self.token_id(n): n for n in range(self.token_count)}
+        return self._rows[token_id]
+
+    def get(self, token_id: str) -> Dict[str, Any]:
+        """The metadata of the token with this ID."""
+        return self[self.index_of(token_id)]
+
+    def close(self):
+        self._buffer.close()
+
+    def __enter__(self) -> "BundleReader":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
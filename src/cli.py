@@ -9,16 +9,22 @@ import os
 # Attempt to import from src, assuming standard project structure
 try:
     from .pre_validator import PreValidator, load_yaml_config
-    from .generator import Generator
-    from .exporter import Exporter
+    from .generator import Generator, ADJUSTMENT_MODES, ALLOCATION_MODES, CATEGORY_ORDERS, WEIGHTING_MODES
+    from .exporter import Exporter, JSON_LAYOUTS, unpack_bundle
     from .models import Token # Assuming Token will be in models.py
+    from .progress_log import LOG_LEVEL_NAMES
+    from .seed_search import search_seeds, parse_seed_range, write_search_report
+    from .quotas import resolve_numerology
 except ImportError:
     # Fallback if running script directly from src or tests without proper PYTHONPATH
     sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
     from src.pre_validator import PreValidator, load_yaml_config
-    from src.generator import Generator
-    from src.exporter import Exporter
+    from src.generator import Generator, ADJUSTMENT_MODES, ALLOCATION_MODES, CATEGORY_ORDERS, WEIGHTING_MODES
+    from src.exporter import Exporter, JSON_LAYOUTS, unpack_bundle
     from src.models import Token
+    from src.progress_log import LOG_LEVEL_NAMES
+    from src.seed_search import search_seeds, parse_seed_range, write_search_report
+    from src.quotas import resolve_numerology
 
 
 def handle_generate_command(args):
@@ -28,6 +34,26 @@ def handle_generate_command(args):
     print(f"  Numerology File: {args.numerology}")
     print(f"  Rules File: {args.rules}")
     print(f"  Output Directory Base: {args.output_dir}")
+    if args.collection_size is not None:
+        print(f"  Collection Size: {args.collection_size}")
+    print(f"  Log Level: {args.log_level}")
+    print(f"  Allocation Mode: {args.allocation_mode}")
+    print(f"  Category Order: {args.category_order}")
+    print(f"  Weighting Mode: {args.weighting_mode}")
+    print(f"  Adjustment Mode: {args.adjustment_mode}")
+    if args.swap_repair:
+        print("  Swap Repair: Enabled")
+    if args.column_sampling:
+        print("  Column Sampling: Enabled")
+    if args.token_store:
+        print(f"  Token Store File: {args.token_store}")
+    print(f"  JSON Layout: {args.json_layout}")
+    if args.compact_json:
+        print("  Compact JSON: Enabled")
+    if args.bundle:
+        print("  Metadata Bundle: Enabled")
+    if args.seeds or args.search:
+        print(f"  Seed Search: {args.seeds or f'{args.search} seeds from {args.seed}'}")
     if args.relaxed_tolerance:
         print("  Relaxed Tolerance: Enabled")
     if args.prioritize_sets:
@@ -39,6 +65,12 @@ def handle_generate_command(args):
         numerology_config = load_yaml_config(args.numerology)
         rules_config = load_yaml_config(args.rules)
         print("  Configuration files loaded successfully.")
+        if args.collection_size is not None:
+            if args.collection_size <= 0:
+                raise ValueError(f"--collection_size must be a positive integer, got {args.collection_size}.")
+            # Rescales every category's target counts to the requested size (largest remainder per category).
+            numerology_config = resolve_numerology(numerology_config, target_count=args.collection_size)
+            print(f"  Numerology targets scaled to {args.collection_size} tokens.")
 
         # 2. Pre-Validate Configurations
         print("\nStep 2: Pre-validating configurations...")
@@ -51,6 +83,25 @@ def handle_generate_command(args):
             sys.exit(1)
         print("  Configurations are valid.")
 
+        # 2b. Optional multi-seed search; the winning seed is generated and exported below
+        search_result = None
+        if args.seeds or args.search:
+            seeds = parse_seed_range(args.seeds) if args.seeds else list(range(args.seed, args.seed + args.search))
+            print(f"\nSearching {len(seeds)} seeds with {args.workers or os.cpu_count()} worker(s)...")
+            def report_seed(result):
+                status = f"error: {result.error}" if result.error else f"{result.violation_count} trait(s) outside tolerance (total {result.violation_total})"
+                print(f"  Seed {result.seed}: {status} [{result.elapsed:.2f}s]")
+            search_result = search_seeds(
+                numerology_config, rules_config, seeds,
+                workers=args.workers,
+                generator_kwargs={"adjustment_mode": args.adjustment_mode, "swap_repair": args.swap_repair, "allocation_mode": args.allocation_mode,
+                                  "column_sampling": args.column_sampling, "category_order": args.category_order,
+                                  "weighting_mode": args.weighting_mode},
+                progress_callback=report_seed
+            )
+            args.seed = search_result.best.seed
+            print(f"  Best seed: {args.seed} ({len(search_result.results)} completed, {search_result.cancelled} cancelled after a perfect seed was found).")
+
         # 3. Generate Tokens
         # TODO: Pass args.relaxed_tolerance and args.prioritize_sets to Generator
         #       once those features are implemented in the Generator.
@@ -58,7 +109,15 @@ def handle_generate_command(args):
         generator = Generator(
             numerology_config=numerology_config,
             rules_config=rules_config,
-            seed=args.seed
+            seed=args.seed,
+            log_level=args.log_level,
+            adjustment_mode=args.adjustment_mode,
+            swap_repair=args.swap_repair,
+            allocation_mode=args.allocation_mode,
+            column_sampling=args.column_sampling,
+            category_order=args.category_order,
+            weighting_mode=args.weighting_mode,
+            token_store_path=args.token_store
         )
         
         # Generator is expected to return List[Token] from src.models
@@ -68,12 +127,13 @@ def handle_generate_command(args):
 
         # 4. Export Tokens
         print("\nStep 4: Exporting tokens...")
-        exporter = Exporter(output_dir_base=args.output_dir)
-        
-        # Get category order for CSV from numerology_config
-        numerology_categories = list(numerology_config.get('categories', {}).keys())
+        exporter = Exporter(output_dir_base=args.output_dir, compact_json=args.compact_json, json_layout=args.json_layout,
+                            bundle=args.bundle)
         
-        exporter.export_tokens(generated_tokens, numerology_categories)
+        # Category order for CSV comes from the generator's compiled numerology
+        exporter.export_tokens(generated_tokens, generator.compiled_config)
+        if search_result is not None:
+            write_search_report(search_result, os.path.join(exporter.versioned_output_dir, "seed_search.json"))
         print("  Tokens exported successfully.")
 
         print("\nNFT Metadata Generation Process Completed Successfully!")
@@ -94,6 +154,16 @@ def handle_generate_command(args):
         sys.exit(1)
 
 
+def handle_unpack_command(args):
+    """Handles the 'unpack' command: restores a bundle's token JSON files."""
+    try:
+        file_total = unpack_bundle(args.bundle, args.json_dir, args.json_layout)
+        print(f"Unpacked {file_total} token files from {args.bundle} to {args.json_dir}")
+    except (FileNotFoundError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
 def main():
     """Main CLI entry point."""
     parser = argparse.ArgumentParser(description="NFT Metadata Generator CLI")
@@ -119,6 +189,13 @@ def main():
         default="rules.yaml",
         help="Path to the rules YAML file (default: rules.yaml)."
     )
+    generate_parser.add_argument(
+        "--collection_size",
+        type=int,
+        default=None,
+        help="Generate this many tokens, scaling numerology targets and tolerances proportionally "
+             "(default: the numerology's root target_count)."
+    )
     generate_parser.add_argument(
         "--relaxed_tolerance",
         action="store_true",
@@ -135,7 +212,115 @@ def main():
         default="output",
         help="Base directory for output files (default: output)."
     )
+    generate_parser.add_argument(
+        "--log_level",
+        type=str.upper,
+        choices=list(LOG_LEVEL_NAMES),
+        default="INFO",
+        help="Generator log verbosity: TRACE, DEBUG, INFO or WARN (default: INFO)."
+    )
+    generate_parser.add_argument(
+        "--allocation_mode",
+        type=str,
+        choices=list(ALLOCATION_MODES),
+        default="weighted",
+        help="How traits are allocated before adjustment: 'weighted' per-token random draws, "
+             "or 'deck' exact per-category decks dealt over gender partitions (default: weighted)."
+    )
+    generate_parser.add_argument(
+        "--category_order",
+        type=str,
+        choices=list(CATEGORY_ORDERS),
+        default="static",
+        help="Order of a token's categories in the weighted fill: 'static' (Gender, Body, Rank, Glyph, then "
+             "numerology order), or 'dynamic' most-constrained-first (default: static)."
+    )
+    generate_parser.add_argument(
+        "--weighting_mode",
+        type=str,
+        choices=list(WEIGHTING_MODES),
+        default="remaining",
+        help="Trait weights of the weighted fill: 'remaining' count + 1, or 'lookahead', which also divides "
+             "by the trait's remaining eligible supply by gender and rules (default: remaining)."
+    )
+    generate_parser.add_argument(
+        "--adjustment_mode",
+        type=str,
+        choices=list(ADJUSTMENT_MODES),
+        default="greedy",
+        help="How trait counts are fixed after the weighted fill: 'greedy' iterative reassignment, "
+             "or 'flow' per-category max-flow (augmenting-path) rebalancing (default: greedy)."
+    )
+    generate_parser.add_argument(
+        "--swap_repair",
+        action="store_true",
+        help="Repair rule violations and duplicate tokens by swapping trait values between tokens, "
+             "which keeps every trait count unchanged (default: False)."
+    )
+    generate_parser.add_argument(
+        "--column_sampling",
+        action="store_true",
+        help="In the weighted fill, draw every category without rules or gender restrictions for all "
+             "tokens at once against its quotas (default: False)."
+    )
+    generate_parser.add_argument(
+        "--token_store",
+        type=str,
+        default=None,
+        help="Keep the generated collection in a memory-mapped token store file at this path instead of "
+             "in memory; a later run can reopen it with TokenStore.open (default: off)."
+    )
+    generate_parser.add_argument(
+        "--json_layout",
+        type=str,
+        choices=list(JSON_LAYOUTS),
+        default="flat",
+        help="Layout of the token JSON files: 'flat' json/<id>.json, or 'sharded' json/<id prefix>/<id>.json "
+             "for very large collections; json_manifest.json maps every token ID to its file (default: flat)."
+    )
+    generate_parser.add_argument(
+        "--bundle",
+        action="store_true",
+        help="Also pack every token's JSON document into one metadata.bundle file with an offset index "
+             "(unpack with the 'unpack' command) (default: False)."
+    )
+    generate_parser.add_argument(
+        "--compact_json",
+        action="store_true",
+        help="Write the token JSON files without indentation or spaces (default: False)."
+    )
+    generate_parser.add_argument(
+        "--seeds",
+        type=str,
+        default=None,
+        help="Search these seeds and export the best one, e.g. '1-500' or '3,7,42' (default: off)."
+    )
+    generate_parser.add_argument(
+        "--search",
+        type=int,
+        default=None,
+        help="Search N consecutive seeds starting at --seed and export the best one (default: off)."
+    )
+    generate_parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Worker processes for --seeds/--search (default: number of CPUs)."
+    )
     generate_parser.set_defaults(func=handle_generate_command)
+
+    # --- Unpack Command ---
+    unpack_parser = subparsers.add_parser("unpack", help="Restore the token JSON files of a metadata bundle")
+    unpack_parser.add_argument("bundle", type=str, help="Path to the metadata.bundle file.")
+    unpack_parser.add_argument("json_dir", type=str, help="Directory to write the token JSON files to.")
+    unpack_parser.add_argument(
+        "--json_layout",
+        type=str,
+        choices=list(JSON_LAYOUTS),
+        default="flat",
+        help="Layout of the restored files (default: flat)."
+    )
+    unpack_parser.set_defaults(func=handle_unpack_command)
     
     # --- (Future commands can be added here) ---
     # validate_parser = subparsers.add_parser("validate", help="Validate configuration files")
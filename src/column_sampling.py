@@ -0,0 +1,59 @@
+# src/column_sampling.py
+"""
+Whole-column draws for "free" categories in the weighted fill.
+
+A category is free when none of its traits takes part in an incompatibility rule (as a
+partner or as a `breakable_by` breaker), none carries a gender tag and the category has
+no `gender_specific_to`. Its value then never depends on the token's other traits, so
+instead of one weighted draw per token the whole column is drawn at once before the
+per-token fill, which treats the drawn values like seeded ones.
+
+The column is drawn against the quota vector: the deck holds (target - already assigned)
+cards per trait and the tokens receive a uniformly random subset of it, i.e. a
+multivariate hypergeometric sample. Every trait ends within its target whenever the
+deck covers the column (exactly on target when it matches the column size). Tokens
+beyond the deck get traits uniformly among those with a non-zero target, the same
+weights the per-token fill uses once every target is met.
+
+The draw is a `random.Random` sample (or shuffle) of a plain list. It only saves the
+per-token draws of the free categories; in the shipped numerology that is Gender alone
+(Background has rule traits), and the 100k-token fill measures the same with or without it.
+"""
+
+import random
+from typing import List, Sequence
+
+
+def free_category_ids(config, masks) -> List[int]:
+    """IDs of the categories whose draws are independent of every other trait of a token."""
+    breaker_ids = set()
+    for groups in masks.unlockable:
+        for group_breakers, _ in groups:
+            breaker_ids.update(group_breakers)
+    free_ids = []
+    for cat_id, trait_ids in enumerate(config.category_trait_ids):
+        if not trait_ids or config.category_gender_spec[cat_id]:
+            continue
+        if any(masks.forbidden[t] or config.trait_genders[t] or t in breaker_ids for t in trait_ids):
+            continue
+        free_ids.append(cat_id)
+    return free_ids
+
+
+def draw_quota_column(trait_ids: Sequence[int], remaining: Sequence[int], fallback_ids: Sequence[int],
+                      size: int, seed: int) -> List[int]:
+    """
+    Draws `size` trait IDs from a deck of `remaining[i]` copies of `trait_ids[i]`, in random order.
+    If the deck is smaller than `size`, the rest are drawn uniformly from `fallback_ids`.
+    """
+    deck_size = sum(remaining)
+    extra = max(size - deck_size, 0)
+    if extra and not fallback_ids:
+        raise ValueError("Column is larger than its deck and there are no fallback traits to draw.")
+    rng = random.Random(seed)
+    deck = [trait_id for trait_id, copies in zip(trait_ids, remaining) for _ in range(copies)]
+    if extra == 0:
+        return rng.sample(deck, size)
+    deck.extend(rng.choice(fallback_ids) for _ in range(extra))
+    rng.shuffle(deck)
+    return deck
@@ -0,0 +1,109 @@
+# src/combination_index.py
+"""
+Incremental uniqueness index over the tokens' trait combinations.
+
+Each trait ID gets a fixed random 64-bit key, and a token's fingerprint is the XOR
+of the keys of its traits (Zobrist hashing). Changing one trait updates the
+fingerprint with two XORs, so the Generator can check "would this token duplicate
+another one?" in O(1) at the moment a trait is drawn or reassigned, instead of
+finding duplicates at the end of generation. Tokens that share a fingerprint are
+compared trait by trait, so a 64-bit collision never reports a false duplicate.
+"""
+
+import random
+from array import array
+from typing import List, Dict, Any, Optional
+
+_ZOBRIST_SEED = 0x5EED_7A17  # Fixed: fingerprints are internal and independent of the generation seed
+
+
+class CombinationIndex:
+    """Fingerprint -> tokens index for the registered tokens of `tokens_data`."""
+
+    def __init__(self, config, tokens_data: List[Dict[str, Any]]):
+        self.config = config
+        self.tokens_data = tokens_data
+        key_rng = random.Random(_ZOBRIST_SEED)
+        self.trait_keys = array('Q', (key_rng.getrandbits(64) for _ in range(config.trait_total)))
+        self._fingerprints: Dict[int, int] = {}       # token_idx -> fingerprint
+        self._buckets: Dict[int, List[int]] = {}      # fingerprint -> registered token indices
+
+    def _key(self, category_name: str, trait_name: Optional[str]) -> int:
+        # Traits missing from numerology contribute nothing; the trait-by-trait comparison still tells them apart.
+        trait_id = self.config.trait_index.get((category_name, trait_name))
+        return 0 if trait_id is None else self.trait_keys[trait_id]
+
+    def fingerprint(self, token_traits: Dict[str, str]) -> int:
+        fingerprint = 0
+        for category_name, trait_name in token_traits.items():
+            fingerprint ^= self._key(category_name, trait_name)
+        return fingerprint
+
+    def __contains__(self, token_idx: int) -> bool:
+        return token_idx in self._fingerprints
+
+    def __len__(self) -> int:
+        return len(self._fingerprints)
+
+    def add(self, token_idx: int):
+        """Registers a token with its current traits."""
+        fingerprint = self.fingerprint(self.tokens_data[token_idx]['traits'])
+        self._fingerprints[token_idx] = fingerprint
+        self._buckets.setdefault(fingerprint, []).append(token_idx)
+
+    def remove(self, token_idx: int):
+        fingerprint = self._fingerprints.pop(token_idx)
+        bucket = self._buckets[fingerprint]
+        bucket.remove(token_idx)
+        if not bucket:
+            del self._buckets[fingerprint]
+
+    def _match_in_bucket(self, fingerprint: int, token_traits: Dict[str, str], ignore_idx: int) -> Optional[int]:
+        for other_idx in self._buckets.get(fingerprint, ()):
+            if other_idx != ignore_idx and self.tokens_data[other_idx]['traits'] == token_traits:
+                return other_idx
+        return None
+
+    def find_duplicate(self, token_traits: Dict[str, str], ignore_idx: int = -1) -> Optional[int]:
+        """Index of a registered token (other than `ignore_idx`) with exactly these traits, or None."""
+        return self._match_in_bucket(self.fingerprint(token_traits), token_traits, ignore_idx)
+
+    def would_duplicate(self, token_idx: int, category_name: str, new_trait: str) -> bool:
+        """True if setting `category_name` to `new_trait` on a registered token would duplicate another token."""
+        token_traits = self.tokens_data[token_idx]['traits']
+        old_trait = token_traits.get(category_name)
+        fingerprint = self._fingerprints[token_idx] ^ self._key(category_name, old_trait) ^ self._key(category_name, new_trait)
+        if fingerprint not in self._buckets:
+            return False
+        hypothetical_traits = token_traits.copy()
+        hypothetical_traits[category_name] = new_trait
+        return self._match_in_bucket(fingerprint, hypothetical_traits, token_idx) is not None
+
+    def update_trait(self, token_idx: int, category_name: str, old_trait: Optional[str], new_trait: Optional[str]):
+        """Moves a registered token to its new fingerprint after one of its traits changed."""
+        fingerprint = self._fingerprints[token_idx]
+        new_fingerprint = fingerprint ^ self._key(category_name, old_trait) ^ self._key(category_name, new_trait)
+        if new_fingerprint == fingerprint:
+            return
+        bucket = self._buckets[fingerprint]
+        bucket.remove(token_idx)
+        if not bucket:
+            del self._buckets[fingerprint]
+        self._fingerprints[token_idx] = new_fingerprint
+        self._buckets.setdefault(new_fingerprint, []).append(token_idx)
+
+    def is_duplicate(self, token_idx: int) -> bool:
+        """True if another registered token currently has exactly this token's traits."""
+        return self._match_in_bucket(self._fingerprints[token_idx], self.tokens_data[token_idx]['traits'], token_idx) is not None
+
+    def duplicate_tokens(self) -> List[int]:
+        """Registered tokens that share their traits with an earlier-registered token."""
+        duplicates = []
+        for bucket in self._buckets.values():
+            if len(bucket) < 2:
+                continue
+            for position, token_idx in enumerate(bucket):
+                token_traits = self.tokens_data[token_idx]['traits']
+                if any(self.tokens_data[other_idx]['traits'] == token_traits for other_idx in bucket[:position]):
+                    duplicates.append(token_idx)
+        return sorted(duplicates)
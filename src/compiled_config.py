@@ -0,0 +1,205 @@
+# src/compiled_config.py
+"""
+Integer-interned view of numerology.yaml used by the generation hot paths.
+
+Categories and traits are mapped to dense integer IDs once. Per-trait data
+(target counts, tolerances, gender tags, glyph law numbers) lives in flat arrays
+indexed by trait ID, so inner loops avoid nested dict traversal and string hashing.
+"""
+
+from array import array
+from typing import List, Dict, Any, Tuple, Optional, Iterator
+
+# Gender tag codes stored in CompiledConfig.trait_genders.
+GENDER_NONE = 0    # Trait has no 'gender' field (available to every token, including Unknown gender)
+GENDER_UNISEX = 1  # Trait is explicitly tagged "Unisex" (any case)
+
+NO_LAW_NUMBER = -1  # Stored in CompiledConfig.glyph_law_numbers for non-glyph traits and 'blank'
+
+# Glyph tiers by law number (prdv2.md power_system.glyph_tiers); glyphs without a law number are "Blank".
+GLYPH_TIER_LAWS = (("Sovereign", 1, 7), ("Capo", 8, 14), ("Soldier", 15, 28), ("Street", 29, 48))
+
+
+def parse_glyph_law_number(glyph_name: str) -> Optional[int]:
+    """Extracts law number from glyph_name, returns None if not parsable or 'blank'."""
+    if glyph_name.lower() == "blank":
+        return None
+    if glyph_name.startswith("glyph_") and len(glyph_name) > 6 and glyph_name[6:].isdigit():
+        return int(glyph_name[6:])
+    return None
+
+
+def glyph_tier(law_number: Optional[int]) -> Optional[str]:
+    """Tier of a glyph with this law number ("Blank" for None), or None if no tier covers it."""
+    if law_number is None:
+        return "Blank"
+    for tier, first_law, last_law in GLYPH_TIER_LAWS:
+        if first_law <= law_number <= last_law:
+            return tier
+    return None
+
+
+class CompiledConfig:
+    """
+    Dense, array-backed representation of a numerology configuration.
+
+    Trait IDs are assigned category by category in YAML order, so the traits of
+    category `c` occupy the contiguous ID range `category_trait_ids[c]`.
+    Malformed entries (non-dict traits, non-int counts) compile to zero; reporting
+    them is PreValidator's job.
+    """
+
+    def __init__(self, numerology_config: Dict[str, Any]):
+        self.target_collection_size: int = numerology_config.get('target_count', 420)
+
+        self.category_names: List[str] = []
+        self.category_index: Dict[str, int] = {}
+        self.category_trait_ids: List[range] = []
+        self.category_gender_spec: List[Optional[str]] = []
+
+        self.trait_names: List[str] = []
+        self.trait_index: Dict[Tuple[str, str], int] = {}
+        self.trait_category = array('i')
+        self.target_counts = array('i')
+        self.tolerances = array('i')
+        self.trait_genders = array('b')
+        self.glyph_law_numbers = array('i')
+
+        self.gender_names: List[str] = ["", "Unisex"]
+        self.gender_codes: Dict[str, int] = {"Unisex": GENDER_UNISEX}
+
+        categories = numerology_config.get('categories', {})
+        if not isinstance(categories, dict):
+            categories = {}
+
+        for cat_name, cat_data in categories.items():
+            cat_id = len(self.category_names)
+            self.category_names.append(cat_name)
+            self.category_index[cat_name] = cat_id
+            cat_data = cat_data if isinstance(cat_data, dict) else {}
+            self.category_gender_spec.append(cat_data.get('gender_specific_to'))
+
+            traits = cat_data.get('traits', {})
+            if not isinstance(traits, dict):
+                traits = {}
+            first_trait_id = len(self.trait_names)
+            for trait_name, trait_data in traits.items():
+                trait_data = trait_data if isinstance(trait_data, dict) else {}
+                self.trait_index[(cat_name, trait_name)] = len(self.trait_names)
+                self.trait_names.append(trait_name)
+                self.trait_category.append(cat_id)
+                self.target_counts.append(self._as_int(trait_data.get('target_count')))
+                self.tolerances.append(self._as_int(trait_data.get('tolerance')))
+                self.trait_genders.append(self._intern_gender(trait_data.get('gender')))
+                law_number = parse_glyph_law_number(trait_name) if cat_name == "Glyph" else None
+                self.glyph_law_numbers.append(NO_LAW_NUMBER if law_number is None else law_number)
+            self.category_trait_ids.append(range(first_trait_id, len(self.trait_names)))
+
+    @staticmethod
+    def _as_int(value: Any) -> int:
+        return value if isinstance(value, int) and not isinstance(value, bool) else 0
+
+    def _intern_gender(self, gender: Any) -> int:
+        if not gender or not isinstance(gender, str):
+            return GENDER_NONE
+        if gender.lower() == "unisex":
+            return GENDER_UNISEX
+        code = self.gender_codes.get(gender)
+        if code is None:
+            code = len(self.gender_names)
+            self.gender_names.append(gender)
+            self.gender_codes[gender] = code
+        return code
+
+    @property
+    def trait_total(self) -> int:
+        return len(self.trait_names)
+
+    def trait_id(self, category_name: str, trait_name: str) -> Optional[int]:
+        """Returns the dense ID of a trait, or None if it is not defined in numerology."""
+        return self.trait_index.get((category_name, trait_name))
+
+    def trait_key(self, trait_id: int) -> Tuple[str, str]:
+        """Returns (CategoryName, TraitName) for a trait ID."""
+        return (self.category_names[self.trait_category[trait_id]], self.trait_names[trait_id])
+
+    def traits_of(self, category_name: str) -> range:
+        """Trait ID range of a category (empty if the category is unknown)."""
+        cat_id = self.category_index.get(category_name)
+        return self.category_trait_ids[cat_id] if cat_id is not None else range(0)
+
+    def trait_gender_name(self, trait_id: int) -> Optional[str]:
+        """The trait's 'gender' tag ("Male", "Female", "Unisex", ...) or None if untagged."""
+        code = self.trait_genders[trait_id]
+        return self.gender_names[code] if code != GENDER_NONE else None
+
+    def law_number(self, trait_id: int) -> Optional[int]:
+        law = self.glyph_law_numbers[trait_id]
+        return None if law == NO_LAW_NUMBER else law
+
+    def is_trait_gender_allowed(self, trait_id: int, token_gender: str) -> bool:
+        """
+        Trait-level gender check ("Flexible Unisex"): Unisex tokens may take any gendered trait,
+        Unisex traits are open to every known gender, Unknown-gender tokens only take untagged traits.
+        """
+        code = self.trait_genders[trait_id]
+        if code == GENDER_NONE:
+            return True
+        if token_gender == "Unknown":
+            return False
+        if token_gender == "Unisex" or code == GENDER_UNISEX:
+            return True
+        return self.gender_names[code] == token_gender
+
+    def within_tolerance(self, trait_id: int, count: int) -> bool:
+        target = self.target_counts[trait_id]
+        tol = self.tolerances[trait_id]
+        return target - tol <= count <= target + tol
+
+
+class TraitCounts:
+    """
+    Contiguous counter array indexed by trait ID.
+
+    Hot paths read and write `counts[trait_id]` directly. The mapping interface keyed by
+    (CategoryName, TraitName) is kept for reporting code (CLI, GUI, debug output).
+    """
+    __slots__ = ("config", "counts")
+
+    def __init__(self, config: CompiledConfig):
+        self.config = config
+        self.counts = array('i', [0]) * config.trait_total
+
+    def reset(self):
+        for trait_id in range(len(self.counts)):
+            self.counts[trait_id] = 0
+
+    def __getitem__(self, key: Tuple[str, str]) -> int:
+        return self.counts[self.config.trait_index[key]]
+
+    def __setitem__(self, key: Tuple[str, str], value: int):
+        self.counts[self.config.trait_index[key]] = value
+
+    def get(self, key: Tuple[str, str], default: int = 0) -> int:
+        trait_id = self.config.trait_index.get(key)
+        return default if trait_id is None else self.counts[trait_id]
+
+    def __contains__(self, key: object) -> bool:
+        return key in self.config.trait_index
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
+    def __iter__(self) -> Iterator[Tuple[str, str]]:
+        return iter(self.config.trait_index)
+
+    def keys(self) -> Iterator[Tuple[str, str]]:
+        return iter(self.config.trait_index)
+
+    def values(self) -> Iterator[int]:
+        return iter(self.counts)
+
+    def items(self) -> Iterator[Tuple[Tuple[str, str], int]]:
+        counts = self.counts
+        for key, trait_id in self.config.trait_index.items():
+            yield key, counts[trait_id]
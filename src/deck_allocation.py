@@ -0,0 +1,120 @@
+# src/deck_allocation.py
+"""
+Deck dealing for the "deck" allocation mode.
+
+For each category the Generator builds a deck with exactly (target - already seeded)
+cards per trait and deals it to the tokens that still need the category, so trait
+counts are exact by construction instead of approximated by weighted draws.
+
+Tokens are partitioned by gender. `split_deck` first decides how many cards of each
+trait go to each partition (a small transportation problem: a trait may only go to
+partitions whose gender can wear it), then `deal` hands each partition's shuffled
+cards to its tokens, skipping cards the token cannot take. Tokens left without a
+card and the cards left over are returned for the Generator's repair pass.
+"""
+
+from collections import deque
+from typing import List, Tuple, Callable
+
+DEAL_SCAN_LIMIT = 64  # Cards examined per token before it is left to the repair pass
+EXCHANGE_HOLDER_LIMIT = 256  # Holders of one trait examined per exchange attempt in the repair pass
+
+
+def split_deck(copies: List[int], allowed: List[List[int]], capacities: List[int]) -> List[List[int]]:
+    """
+    Splits `copies[t]` cards of each trait over partitions with `capacities[p]` tokens.
+    `allowed[t]` lists the partitions trait t may go to. Returns `placed[t][p]`.
+
+    Traits with the fewest allowed partitions are placed first, each spread over its
+    partitions in proportion to their remaining room. Cards that no longer fit are
+    placed by augmenting paths that move other traits' cards between partitions, so
+    as many cards as possible are placed (all of them whenever a full split exists).
+    """
+    partition_total = len(capacities)
+    room = list(capacities)
+    placed = [[0] * partition_total for _ in copies]
+    unplaced = [0] * len(copies)
+
+    for trait in sorted(range(len(copies)), key=lambda t: (len(allowed[t]), t)):
+        remaining = copies[trait]
+        partitions = [p for p in allowed[trait] if room[p] > 0]
+        total_room = sum(room[p] for p in partitions)
+        if remaining and total_room:
+            # Largest remainder split of min(remaining, total_room) in proportion to room
+            share = min(remaining, total_room)
+            quotas = [share * room[p] / total_room for p in partitions]
+            counts = [min(int(q), room[p]) for q, p in zip(quotas, partitions)]
+            order = sorted(range(len(partitions)), key=lambda i: (-(quotas[i] - counts[i]), i))
+            left = share - sum(counts)
+            while left:
+                for i in order:
+                    if left and counts[i] < room[partitions[i]]:
+                        counts[i] += 1
+                        left -= 1
+            for p, count in zip(partitions, counts):
+                placed[trait][p] += count
+                room[p] -= count
+                remaining -= count
+        unplaced[trait] = remaining
+
+    for trait, remaining in enumerate(unplaced):
+        while remaining and _augment(trait, allowed, placed, room):
+            remaining -= 1
+    return placed
+
+
+def _augment(trait: int, allowed: List[List[int]], placed: List[List[int]], room: List[int]) -> bool:
+    """Places one more card of `trait`, shifting other cards along a partition path if needed."""
+    parent = {}  # partition -> (previous partition, trait moved from previous into it), None for a start
+    queue = deque()
+    for p in allowed[trait]:
+        if p not in parent:
+            parent[p] = None
+            queue.append(p)
+    while queue:
+        p = queue.popleft()
+        if room[p] > 0:
+            # Walk back: each hop moves one card of the recorded trait into p from the previous partition.
+            room[p] -= 1
+            while parent[p] is not None:
+                previous, moved_trait = parent[p]
+                placed[moved_trait][p] += 1
+                placed[moved_trait][previous] -= 1
+                p = previous
+            placed[trait][p] += 1
+            return True
+        for other_trait, row in enumerate(placed):
+            if row[p] <= 0:
+                continue
+            for q in allowed[other_trait]:
+                if q not in parent:
+                    parent[q] = (p, other_trait)
+                    queue.append(q)
+    return False
+
+
+def deal(cards: List[int], token_indices: List[int], valid_mask_of: Callable[[int], int],
+         scan_limit: int = DEAL_SCAN_LIMIT) -> Tuple[List[Tuple[int, int]], List[int]]:
+    """
+    Deals shuffled `cards` (trait IDs) to tokens in order. Each token takes the top card
+    whose bit is set in `valid_mask_of(token_idx)`, looking at most `scan_limit` cards deep.
+    Returns the (token_idx, trait_id) deals and the tokens left without a card; the cards
+    not dealt remain in `cards`.
+    """
+    dealt = []
+    undealt = []
+    for token_idx in token_indices:
+        if not cards:
+            undealt.append(token_idx)
+            continue
+        valid_mask = valid_mask_of(token_idx)
+        position = len(cards) - 1
+        stop = max(-1, position - scan_limit)
+        while position > stop and not (valid_mask >> cards[position]) & 1:
+            position -= 1
+        if position == stop:
+            undealt.append(token_idx)
+            continue
+        cards[position], cards[-1] = cards[-1], cards[position]
+        dealt.append((token_idx, cards.pop()))
+    return dealt, undealt
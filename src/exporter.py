@@ -5,16 +5,104 @@ Handles the export of generated NFT metadata to JSON and CSV formats.
 import json
 import csv
 import os
-from typing import List, Dict, Any
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from json.encoder import encode_basestring_ascii as _json_string # C-accelerated; what json.dump uses for str
+from typing import List, Dict, Any, Union, Optional, Tuple
 import sys # Added for path adjustment
 import os # Added for path adjustment
 
 # Import the authoritative Token class from models.py
 try:
-    from src.models import Token
+    from src.models import Token, hash_tokens
+    from src.compiled_config import CompiledConfig
+    from src.bundle import BundleWriter, BundleReader, BUNDLE_NAME
 except ImportError:
     sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-    from src.models import Token
+    from src.models import Token, hash_tokens
+    from src.compiled_config import CompiledConfig
+    from src.bundle import BundleWriter, BundleReader, BUNDLE_NAME
+
+JSON_BATCH_SIZE = 1024 # Token files per task of the JSON writer
+
+# Layout of the per-token JSON files under json/:
+#   "flat"    - json/<token_id>.json (default)
+#   "sharded" - json/<token_id without its last SHARD_DIGITS characters>/<token_id>.json, e.g. json/012/012345.json
+JSON_LAYOUTS = ("flat", "sharded")
+SHARD_DIGITS = 3 # Up to 1000 numeric token IDs per shard directory
+MANIFEST_NAME = "json_manifest.json" # Token ID -> path of its file relative to json/, next to json/
+
+
+def token_json_path(token_id: str, layout: str = "flat") -> str:
+    """Path of the token's JSON file relative to json/ ('/'-separated)."""
+    if layout == "sharded":
+        return f"{token_id[:-SHARD_DIGITS] or '0'}/{token_id}.json"
+    return f"{token_id}.json"
+
+
+def _json_scalar(value) -> str:
+    if isinstance(value, str):
+        return _json_string(value)
+    if value is None:
+        return "null"
+    if value is True:
+        return "true"
+    if value is False:
+        return "false"
+    if isinstance(value, int):
+        return int.__repr__(value)
+    return json.dumps(value)
+
+
+def render_token_json(token_id: str, hash_id: str, traits: Dict[str, str], metadata: Dict[str, Any], compact: bool = False) -> str:
+    """
+    The token's JSON document, as `json.dump(..., indent=4)` would write it (or with
+    separators (",", ":") if `compact`). The schema is fixed, so the document is assembled
+    directly; metadata values are scalars or lists of scalars.
+    """
+    if compact:
+        traits_json = ",".join(f"{_json_string(name)}:{_json_scalar(value)}" for name, value in traits.items())
+        metadata_json = ",".join(
+            f"{_json_string(key)}:" + ("[" + ",".join(map(_json_scalar, value)) + "]" if isinstance(value, list) else _json_scalar(value))
+            for key, value in metadata.items())
+        return (f'{{"token_id":{_json_string(token_id)},"hash_id":{_json_string(hash_id)},'
+                f'"traits":{{{traits_json}}},"metadata":{{{metadata_json}}}}}')
+    if traits:
+        traits_json = "{\n" + ",\n".join(f"        {_json_string(name)}: {_json_scalar(value)}" for name, value in traits.items()) + "\n    }"
+    else:
+        traits_json = "{}"
+    metadata_lines = []
+    for key, value in metadata.items():
+        if isinstance(value, list):
+            value_json = "[\n" + ",\n".join("            " + _json_scalar(item) for item in value) + "\n        ]" if value else "[]"
+        else:
+            value_json = _json_scalar(value)
+        metadata_lines.append(f"        {_json_string(key)}: {value_json}")
+    return (f'{{\n    "token_id": {_json_string(token_id)},\n    "hash_id": {_json_string(hash_id)},\n'
+            f'    "traits": {traits_json},\n    "metadata": {{\n' + ",\n".join(metadata_lines) + "\n    }\n}")
+
+
+def _write_json_batch(batch: List[Tuple[str, str]]):
+    for file_path, document in batch:
+        with open(file_path, 'w') as f:
+            f.write(document)
+
+
+def unpack_bundle(bundle_path: str, json_output_dir: str, layout: str = "flat") -> int:
+    """
+    Writes every record of a bundle (src/bundle.py) to `json_output_dir` at its token_json_path
+    for `layout`, byte for byte as exported. Returns the number of files written.
+    """
+    if layout not in JSON_LAYOUTS:
+        raise ValueError(f"Unknown JSON layout: {layout!r}. Expected one of {', '.join(JSON_LAYOUTS)}.")
+    with BundleReader(bundle_path) as reader:
+        for n in range(len(reader)):
+            file_path = os.path.join(json_output_dir, *token_json_path(reader.token_id(n), layout).split("/"))
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            with open(file_path, 'wb') as f:
+                f.write(reader.document(n))
+        return len(reader)
 
 
 class Exporter:
@@ -22,8 +110,21 @@ class Exporter:
     Exports token metadata to specified formats.
     """
 
-    def __init__(self, output_dir_base: str = "output"):
+    def __init__(self, output_dir_base: str = "output", compact_json: bool = False, max_workers: Optional[int] = None, json_layout: str = "flat",
+                 bundle: bool = False):
+        """
+        `compact_json` writes the token JSON files without indentation or spaces. `max_workers`
+        is the thread count of the JSON writer (default: CPU count; 1 writes in the calling thread).
+        `json_layout` is one of JSON_LAYOUTS. `bundle` also packs every token's JSON document into
+        one BUNDLE_NAME file (see src/bundle.py).
+        """
+        if json_layout not in JSON_LAYOUTS:
+            raise ValueError(f"Unknown JSON layout: {json_layout!r}. Expected one of {', '.join(JSON_LAYOUTS)}.")
         self.output_dir_base = output_dir_base
+        self.compact_json = compact_json
+        self.json_layout = json_layout
+        self.bundle = bundle
+        self.max_workers = max_workers
         self.versioned_output_dir = self._get_next_versioned_dir(self.output_dir_base)
 
     def _get_next_versioned_dir(self, base_dir_name: str) -> str:
@@ -60,22 +161,29 @@ class Exporter:
         if not os.path.exists(path):
             os.makedirs(path, exist_ok=True) # exist_ok=True is helpful
 
-    def export_tokens(self, tokens: List[Token], numerology_categories: List[str]):
+    def export_tokens(self, tokens: List[Token], numerology_categories: Union[List[str], CompiledConfig]):
         """
         Generates all token data in memory and then writes all files in batch.
-        `numerology_categories` should be a list of category names in desired order for CSV.
+        `numerology_categories` is either a list of category names in desired order for CSV,
+        or the generator's CompiledConfig (its category order is used).
         """
         if not tokens:
             print("No tokens to export.")
             return
 
+        if isinstance(numerology_categories, CompiledConfig):
+            numerology_categories = numerology_categories.category_names
+
+        # Hash every token once up front; the JSON and CSV writers read the cached hash_id
+        hash_tokens(tokens)
+
         # Create the versioned output directory
         self._ensure_dir_exists(self.versioned_output_dir)
 
         # Export to JSON
-        json_output_dir = os.path.join(self.versioned_output_dir, "json")
-        self._ensure_dir_exists(json_output_dir)
-        self._export_to_json(tokens, json_output_dir)
+        json_output_dir = os.path.join(self.versioned_output_dir, "json") # Created by _export_to_json's final rename
+        self._export_to_json(tokens, json_output_dir, os.path.join(self.versioned_output_dir, BUNDLE_NAME) if self.bundle else None)
+        self._write_manifest(tokens, os.path.join(self.versioned_output_dir, MANIFEST_NAME))
 
         # Export to CSV
         csv_output_path = os.path.join(self.versioned_output_dir, "metadata.csv")
@@ -83,7 +191,7 @@ class Exporter:
 
         print(f"Successfully exported {len(tokens)} tokens to {self.versioned_output_dir}")
 
-    def _export_to_json(self, tokens: List[Token], json_output_dir: str):
+    def _export_to_json(self, tokens: List[Token], json_output_dir: str, bundle_path: Optional[str] = None):
         """
         Exports each token to an individual JSON file.
         Format (as per PRD v2.3):
@@ -104,30 +212,80 @@ class Exporter:
                 "set_bonuses": []
             }
         }
+
+        With the "sharded" layout each file goes to its shard directory instead (see token_json_path).
+        Tokens are rendered and written in batches of JSON_BATCH_SIZE on a thread pool (a batch's
+        file writes release the GIL while another batch renders). Everything goes into a temporary
+        directory next to `json_output_dir`, which must not exist yet; it is renamed into place once
+        complete, so a failed export leaves no partial `json/` directory. With `bundle_path`, the same
+        documents are also packed, in token order, into a bundle there.
+        """
+        staging_dir = tempfile.mkdtemp(prefix=".json-", dir=os.path.dirname(os.path.abspath(json_output_dir)))
+        try:
+            if self.json_layout != "flat":
+                for shard in {token_json_path(token.token_id, self.json_layout).rpartition("/")[0] for token in tokens}:
+                    os.mkdir(os.path.join(staging_dir, shard))
+            chunks = [tokens[start:start + JSON_BATCH_SIZE] for start in range(0, len(tokens), JSON_BATCH_SIZE)]
+            bundle = BundleWriter(bundle_path) if bundle_path else None
+            workers = self.max_workers or os.cpu_count() or 1
+            executor = ThreadPoolExecutor(max_workers=workers) if workers > 1 and len(chunks) > 1 else None
+            try:
+                batches = executor.map(self._write_json_chunk, chunks, [staging_dir] * len(chunks)) if executor else (
+                    self._write_json_chunk(chunk, staging_dir) for chunk in chunks)
+                for chunk, batch in zip(chunks, batches): # In token order
+                    if bundle is not None:
+                        for token, (_, document) in zip(chunk, batch):
+                            bundle.add(token.token_id, document)
+            except BaseException:
+                if bundle is not None:
+                    bundle.abort()
+                raise
+            finally:
+                if executor is not None:
+                    executor.shutdown()
+            if bundle is not None:
+                bundle.close()
+            os.rename(staging_dir, json_output_dir)
+        except BaseException:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            raise
+        # print(f"Exported {len(tokens)} tokens to JSON files in {json_output_dir}") # Covered by main export message
+
+    def _write_manifest(self, tokens: List[Token], manifest_path: str):
         """
+        Writes the JSON manifest: {"layout", "token_count", "files": {token_id: path relative to json/}},
+        so readers can locate every file without listing directories. Replaced atomically.
+        """
+        manifest = {
+            "layout": self.json_layout,
+            "token_count": len(tokens),
+            "files": {token.token_id: token_json_path(token.token_id, self.json_layout) for token in tokens}
+        }
+        with open(manifest_path + ".tmp", 'w') as f:
+            json.dump(manifest, f, indent=None if self.compact_json else 4)
+        os.replace(manifest_path + ".tmp", manifest_path)
+
+    def _write_json_chunk(self, tokens: List[Token], json_output_dir: str) -> List[Tuple[str, str]]:
+        batch = self._render_json_batch(tokens, json_output_dir)
+        _write_json_batch(batch)
+        return batch
+
+    def _render_json_batch(self, tokens: List[Token], json_output_dir: str) -> List[Tuple[str, str]]:
+        """(file path, JSON document) of each token."""
+        batch = []
         for token in tokens:
-            file_path = os.path.join(json_output_dir, f"{token.token_id}.json")
-            
-            # Prepare metadata block with defaults for now
-            # These would ideally come from the Token object if populated by the generator
+            traits = token.traits # Built from the token store on each access, so read once
             metadata_block = {
-                "power_tier": getattr(token, 'power_tier', "Common"),
-                "power_score": getattr(token, 'power_score', 0),
-                "law_number": getattr(token, 'law_number', None), # Assuming None is acceptable for null
-                "trait_count": len(token.traits), # This can be calculated directly
-                "special_abilities": getattr(token, 'special_abilities', []),
-                "set_bonuses": getattr(token, 'set_bonuses', [])
-            }
-            
-            token_data = {
-                "token_id": token.token_id,
-                "hash_id": token.hash_id,
-                "traits": token.traits,
-                "metadata": metadata_block
+                "power_tier": token.power_tier,
+                "power_score": token.power_score,
+                "law_number": token.law_number,
+                "trait_count": len(traits),
+                "special_abilities": token.special_abilities,
+                "set_bonuses": token.set_bonuses
             }
-            with open(file_path, 'w') as f:
-                json.dump(token_data, f, indent=4)
-        # print(f"Exported {len(tokens)} tokens to JSON files in {json_output_dir}") # Covered by main export message
+            batch.append((os.path.join(json_output_dir, *token_json_path(token.token_id, self.json_layout).split("/")),
+                          render_token_json(token.token_id, token.hash_id, traits, metadata_block, self.compact_json)))
+        return batch
 
     def _export_to_csv(self, tokens: List[Token], csv_output_path: str, numerology_categories: List[str]):
         """
@@ -149,8 +307,9 @@ class Exporter:
                     "hash_id": token.hash_id,
                 }
                 # Add trait values to the row, using .get for safety if a category is missing for a token
+                traits = token.traits
                 for category in numerology_categories:
-                    row_data[category] = token.traits.get(category, "") 
+                    row_data[category] = traits.get(category, "") 
                 writer.writerow(row_data)
         # print(f"Exported {len(tokens)} tokens to CSV file: {csv_output_path}") # Covered by main export message
 
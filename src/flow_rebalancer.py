@@ -0,0 +1,138 @@
+# src/flow_rebalancer.py
+"""
+Flow-based rebalancing of one category's trait counts.
+
+Within a category every token holds exactly one trait, so fixing the counts is a
+transportation problem: tokens (supply) are reassigned between traits whose counts
+must end within [target - tolerance, target + tolerance]. A token may only be moved
+to a trait in its "allowed" mask, which the Generator builds from gender eligibility
+and compatibility with the token's other traits.
+
+The network here is the residual graph of that problem collapsed onto the traits:
+edge u -> v has a capacity equal to the number of tokens holding u that may take v.
+Successive shortest augmenting paths (breadth-first, i.e. every token move costs 1)
+first raise traits below their lower bound, then drain traits above their upper
+bound. Each augmentation changes only the two end counts, so bounds already satisfied
+stay satisfied, and the number of reassigned tokens is kept small.
+"""
+
+from collections import deque
+from typing import List, Dict, Tuple, Optional, Set
+
+Move = Tuple[int, int, int]  # (token_idx, from_trait_id, to_trait_id)
+
+
+class CategoryFlowNetwork:
+    """
+    Trait-level residual network for one category.
+
+    Trait IDs are the CompiledConfig IDs of the category (a contiguous range);
+    allowed masks use the same bit layout as ConstraintMasks.
+    """
+
+    def __init__(self, trait_ids: range, lower_bounds: List[int], upper_bounds: List[int]):
+        self.trait_ids = trait_ids
+        self.size = len(trait_ids)
+        self.lower = list(lower_bounds)
+        self.upper = list(upper_bounds)
+        self.counts = [0] * self.size
+        self.holders: List[Set[int]] = [set() for _ in range(self.size)]
+        self.capacity = [[0] * self.size for _ in range(self.size)]  # [from][to] movable tokens
+        self._token_trait: Dict[int, int] = {}
+        self._token_mask: Dict[int, int] = {}
+        self._token_allowed: Dict[int, List[int]] = {}
+
+    def add_token(self, token_idx: int, trait_id: int, allowed_mask: int):
+        """Adds a token currently holding `trait_id`; `allowed_mask` holds the traits it may move to."""
+        local_id = trait_id - self.trait_ids.start
+        # The token's current trait stays allowed, so a later augmentation can move it back.
+        local_mask = ((allowed_mask >> self.trait_ids.start) & ((1 << self.size) - 1)) | (1 << local_id)
+        allowed = [v for v in range(self.size) if (local_mask >> v) & 1]
+        self._token_trait[token_idx] = local_id
+        self._token_mask[token_idx] = local_mask
+        self._token_allowed[token_idx] = allowed
+        self.counts[local_id] += 1
+        self.holders[local_id].add(token_idx)
+        row = self.capacity[local_id]
+        for v in allowed:
+            if v != local_id:
+                row[v] += 1
+
+    def _move_token(self, token_idx: int, to_local: int):
+        from_local = self._token_trait[token_idx]
+        self._token_trait[token_idx] = to_local
+        self.counts[from_local] -= 1
+        self.counts[to_local] += 1
+        self.holders[from_local].discard(token_idx)
+        self.holders[to_local].add(token_idx)
+        from_row = self.capacity[from_local]
+        to_row = self.capacity[to_local]
+        for v in self._token_allowed[token_idx]:
+            if v != from_local:
+                from_row[v] -= 1
+            if v != to_local:
+                to_row[v] += 1
+
+    def _shortest_path(self, sources: List[int], is_sink) -> Optional[List[int]]:
+        """Breadth-first search from all sources at once; returns the trait path to the nearest sink."""
+        parent = [-2] * self.size
+        queue = deque()
+        for source in sources:
+            parent[source] = -1
+            queue.append(source)
+        capacity = self.capacity
+        while queue:
+            u = queue.popleft()
+            row = capacity[u]
+            for v in range(self.size):
+                if parent[v] != -2 or row[v] <= 0:
+                    continue
+                parent[v] = u
+                if is_sink(v):
+                    path = [v]
+                    while parent[path[-1]] != -1:
+                        path.append(parent[path[-1]])
+                    path.reverse()
+                    return path
+                queue.append(v)
+        return None
+
+    def _augment(self, path: List[int]) -> List[Move]:
+        # Apply the last hop first, so a token moved into an intermediate trait
+        # is not the one moved out of it.
+        moves = []
+        start = self.trait_ids.start
+        token_masks = self._token_mask
+        for hop in range(len(path) - 1, 0, -1):
+            u, v = path[hop - 1], path[hop]
+            token_idx = next(t for t in self.holders[u] if (token_masks[t] >> v) & 1)
+            self._move_token(token_idx, v)
+            moves.append((token_idx, u + start, v + start))
+        return moves
+
+    def rebalance(self) -> Tuple[List[Move], List[int]]:
+        """
+        Augments until every trait is within its bounds or no augmenting path remains.
+        Returns the token moves in application order and the trait IDs still out of bounds.
+        """
+        moves: List[Move] = []
+        counts, lower, upper = self.counts, self.lower, self.upper
+
+        # Phase 1: raise traits below their lower bound, taking tokens from traits above theirs.
+        while any(counts[v] < lower[v] for v in range(self.size)):
+            sources = [u for u in range(self.size) if counts[u] > lower[u]]
+            path = self._shortest_path(sources, lambda v: counts[v] < lower[v])
+            if path is None:
+                break
+            moves.extend(self._augment(path))
+
+        # Phase 2: drain traits above their upper bound into traits with room below theirs.
+        while any(counts[u] > upper[u] for u in range(self.size)):
+            sources = [u for u in range(self.size) if counts[u] > upper[u]]
+            path = self._shortest_path(sources, lambda v: counts[v] < upper[v])
+            if path is None:
+                break
+            moves.extend(self._augment(path))
+
+        unresolved = [v + self.trait_ids.start for v in range(self.size) if not (lower[v] <= counts[v] <= upper[v])]
+        return moves, unresolved
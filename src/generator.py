@@ -4,28 +4,78 @@ Handles the core logic of generating NFT metadata based on configurations.
 """
 
 import random
-from typing import List, Dict, Any, Tuple, Optional, Callable
+from typing import List, Dict, Any, Tuple, Optional, Callable, Union, Set
 import sys
 import os
-import json
 
 # Assuming models.py contains Token and other necessary data structures
 try:
     from src.models import Token
+    from src.rules_compiler import CompiledRules, ConstraintMasks
+    from src.compiled_config import CompiledConfig, TraitCounts, parse_glyph_law_number, glyph_tier
+    from src.progress_log import TRACE, DEBUG, INFO, WARN, DEFAULT_LOG_LEVEL, parse_log_level
+    from src.adjustment_index import TraitTokenIndex, DeviationQueue
+    from src.flow_rebalancer import CategoryFlowNetwork
+    from src.combination_index import CombinationIndex
+    from src.quotas import resolve_numerology
+    from src.deck_allocation import split_deck, deal, EXCHANGE_HOLDER_LIMIT
+    from src.sampling import MaskedTraitSampler
+    from src.column_sampling import free_category_ids, draw_quota_column
+    from src.token_pool import TokenPool
+    from src.validation import validate_collection
+    from src.token_state import TokenStates, DERIVED_CATEGORIES
+    from src.token_table import CodeMatrix
+    from src.token_store import TokenStore, TokenRows
 except ImportError:
     sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
     from src.models import Token
+    from src.rules_compiler import CompiledRules, ConstraintMasks
+    from src.compiled_config import CompiledConfig, TraitCounts, parse_glyph_law_number, glyph_tier
+    from src.progress_log import TRACE, DEBUG, INFO, WARN, DEFAULT_LOG_LEVEL, parse_log_level
+    from src.adjustment_index import TraitTokenIndex, DeviationQueue
+    from src.flow_rebalancer import CategoryFlowNetwork
+    from src.combination_index import CombinationIndex
+    from src.quotas import resolve_numerology
+    from src.deck_allocation import split_deck, deal, EXCHANGE_HOLDER_LIMIT
+    from src.sampling import MaskedTraitSampler
+    from src.column_sampling import free_category_ids, draw_quota_column
+    from src.token_pool import TokenPool
+    from src.validation import validate_collection
+    from src.token_state import TokenStates, DERIVED_CATEGORIES
+    from src.token_table import CodeMatrix
+    from src.token_store import TokenStore, TokenRows
 
 
 # Assuming numerology.yaml and rules.yaml are loaded and parsed elsewhere
 # and passed to the Generator class or its methods.
 
+# How trait counts are brought back within tolerance after the weighted fill:
+#   "greedy" - iterative one-token reassignments with a relaxing tolerance (default)
+#   "flow"   - per-category transportation problem solved by shortest augmenting paths
+ADJUSTMENT_MODES = ("greedy", "flow")
+
+# How traits are first allocated to tokens:
+#   "weighted" - per-token weighted random draws from the remaining counts (default)
+#   "deck"     - per-category decks with exact target counts dealt over gender partitions
+ALLOCATION_MODES = ("weighted", "deck")
+
+# Order in which the weighted fill visits a token's categories:
+#   "static"  - Gender, Body, Rank, Glyph, then numerology order (default)
+#   "dynamic" - after Gender and Body, the category with the fewest valid traits left for the token (DSATUR-style)
+CATEGORY_ORDERS = ("static", "dynamic")
+GENDER_CATEGORIES = ("Gender", "Body") # Decide the token's gender, so they are always filled first
+
+# Selection weights of the weighted fill:
+#   "remaining" - remaining count + 1 (default)
+#   "lookahead" - remaining count + 1 divided by the trait's remaining eligible supply (tokens still to fill whose gender may take it)
+WEIGHTING_MODES = ("remaining", "lookahead")
+
 class Generator:
     """
     Generates NFT metadata based on trait rarities, gender rules, and incompatibilities.
     """
 
-    def __init__(self, numerology_config: Dict[str, Any], rules_config: Dict[str, Any], seed: int = 0, log_callback: Optional[Callable[[str], None]] = None):
+    def __init__(self, numerology_config: Dict[str, Any], rules_config: Dict[str, Any], seed: int = 0, log_callback: Optional[Callable[[str], None]] = None, log_level: Union[int, str] = DEFAULT_LOG_LEVEL, adjustment_mode: str = "greedy", swap_repair: bool = False, allocation_mode: str = "weighted", column_sampling: bool = False, category_order: str = "static", weighting_mode: str = "remaining", token_store_path: Optional[str] = None):
         """
         Initializes the Generator.
 
@@ -34,52 +84,84 @@ class Generator:
             rules_config: Parsed content of rules.yaml.
             seed: Random seed for deterministic generation.
             log_callback: Optional function to call for emitting progress messages.
+            log_level: Minimum level (TRACE/DEBUG/INFO/WARN, name or number) of messages to emit.
+            adjustment_mode: One of ADJUSTMENT_MODES; selects the phase that fixes trait counts after the fill.
+            swap_repair: If True, rule violations and duplicate tokens left after adjustment are repaired
+                by count-neutral swaps of a category value between two tokens.
+            allocation_mode: One of ALLOCATION_MODES; selects how traits are allocated before adjustment.
+            column_sampling: If True, the weighted fill draws the whole column of every category without
+                rules or gender restrictions at once (only Gender in the shipped numerology).
+            category_order: One of CATEGORY_ORDERS; selects the order of categories within a token in the weighted fill.
+            weighting_mode: One of WEIGHTING_MODES; selects the trait selection weights of the weighted fill.
+            token_store_path: If given, the TokenStore holding the collection is a memory-mapped file at this path
+                (reopenable with TokenStore.open after the run) instead of an in-memory buffer.
         """
-        self.numerology_config = numerology_config
+        if adjustment_mode not in ADJUSTMENT_MODES:
+            raise ValueError(f"Unknown adjustment mode: {adjustment_mode!r}. Expected one of {', '.join(ADJUSTMENT_MODES)}.")
+        if allocation_mode not in ALLOCATION_MODES:
+            raise ValueError(f"Unknown allocation mode: {allocation_mode!r}. Expected one of {', '.join(ALLOCATION_MODES)}.")
+        if category_order not in CATEGORY_ORDERS:
+            raise ValueError(f"Unknown category order: {category_order!r}. Expected one of {', '.join(CATEGORY_ORDERS)}.")
+        if weighting_mode not in WEIGHTING_MODES:
+            raise ValueError(f"Unknown weighting mode: {weighting_mode!r}. Expected one of {', '.join(WEIGHTING_MODES)}.")
+        # Percent/ratio targets and percent tolerances are resolved to integer counts for this collection size.
+        self.numerology_config = resolve_numerology(numerology_config)
         self.rules_config = rules_config
         self.seed = seed
         self.log_callback = log_callback
-        random.seed(self.seed)
-        self.tokens_data: List[Dict[str, Any]] = [] # Stores trait dicts during generation
-        self.trait_counts: Dict[Tuple[str, str], int] = {} # (CategoryName, TraitName) -> count
-
-        self.target_collection_size = numerology_config.get('target_count', 420)
-
-        # Initialize trait_counts from numerology_config
-        for category_name, category_data in self.numerology_config.get('categories', {}).items():
-            for trait_name in category_data.get('traits', {}).keys():
-                self.trait_counts[(category_name, trait_name)] = 0
+        self.adjustment_mode = adjustment_mode
+        self.swap_repair = swap_repair
+        self.allocation_mode = allocation_mode
+        self.column_sampling = column_sampling
+        self.category_order = category_order
+        self.weighting_mode = weighting_mode
+        self.token_store_path = token_store_path
+        self.set_log_level(log_level)
+        # No global random.seed: every phase draws from its own substream (see `_substream`).
+        # Incompatibility rules are compiled once; every compatibility query is a dict lookup.
+        self.compiled_rules = CompiledRules(rules_config)
+        # Categories/traits interned to dense IDs; targets, tolerances and gender tags live in flat arrays.
+        self.compiled_config = CompiledConfig(self.numerology_config)
+        # Per-(category, gender) candidate bitmasks and per-trait forbidden-partner bitmasks.
+        self.constraint_masks = ConstraintMasks(self.compiled_config, self.compiled_rules)
+        self.tokens_data: List[Dict[str, Any]] = [] # Token dicts; during generate_tokens() a view of the token store's rows
+        self.trait_counts = TraitCounts(self.compiled_config) # trait_id -> count (also readable by (CategoryName, TraitName))
+        # Fingerprint index of completed tokens; keeps trait combinations unique as they are drawn and changed.
+        self.combination_index = CombinationIndex(self.compiled_config, self.tokens_data)
+        # Gender, law number, glyph tier and Sovereign flag per token; updated only when Gender, Body or Glyph change.
+        self.token_states = TokenStates(self.compiled_config, self.tokens_data)
+
+        self.target_collection_size = self.compiled_config.target_collection_size
+        self.validation_report = None # ValidationReport of the last generate_tokens() run
+        self.token_store: Optional[TokenStore] = None # Codes, law numbers and tiers of the last generate_tokens() run
+        self._under_target_mask = 0 # Bit t set while trait t is below target; kept by the weighted fill for the dynamic order
 
     def _parse_glyph_law_number(self, glyph_name: str) -> Optional[int]:
         """Extracts law number from glyph_name, returns None if not parsable or 'blank'."""
-        if glyph_name.lower() == "blank":
-            return None
-        if glyph_name.startswith("glyph_") and len(glyph_name) > 6 and glyph_name[6:].isdigit():
-            return int(glyph_name[6:])
-        return None
+        return parse_glyph_law_number(glyph_name)
 
     def _get_token_gender(self, token_traits: Dict[str, str]) -> str:
         """
         Determines token gender, prioritizing 'Gender' trait, then 'Body' trait's gender attribute.
+        For hypothetical trait dicts; the gender of a token in `tokens_data` is `self.token_states.genders[token_idx]`.
         """
-        if "Gender" in token_traits:
-            return token_traits["Gender"]
-        
-        body_trait_value = token_traits.get("Body")
-        if body_trait_value:
-            body_category_config = self.numerology_config.get("categories", {}).get("Body", {})
-            body_trait_config = body_category_config.get("traits", {}).get(body_trait_value)
-            if body_trait_config and "gender" in body_trait_config: # Check if 'gender' key exists
-                return body_trait_config["gender"]
-        
-        return "Unknown"
+        return self.token_states.gender_of(token_traits)
+
+    def _set_token_trait(self, token_idx: int, category_name: str, trait_name: str):
+        """Assigns a trait to a token and keeps its derived state (gender, law number, tier) current."""
+        if self.tokens_data.__class__ is TokenRows: # Straight to the store's codes, skipping the row views
+            self.token_store.set_trait(token_idx, self.compiled_config.category_index[category_name], trait_name)
+        else:
+            self.tokens_data[token_idx]['traits'][category_name] = trait_name
+        if category_name in DERIVED_CATEGORIES:
+            self.token_states.update(token_idx, category_name)
 
     def _is_category_applicable_by_gender_spec(self, category_name: str, token_gender: str) -> bool:
         """
         Checks if a category is applicable based on its 'gender_specific_to' field from numerology.
         """
-        category_config = self.numerology_config.get('categories', {}).get(category_name, {})
-        gender_specific_to = category_config.get('gender_specific_to') # e.g., "Male", "Female"
+        cat_id = self.compiled_config.category_index.get(category_name)
+        gender_specific_to = self.compiled_config.category_gender_spec[cat_id] if cat_id is not None else None # e.g., "Male", "Female"
 
         if not gender_specific_to: # Unisex category or no gender specification for the category itself
             return True
@@ -97,109 +179,105 @@ class Generator:
         Gets valid traits for a given category, considering token gender and incompatibilities.
         Implements "Flexible Unisex": Unisex tokens can be assigned Male/Female traits.
         """
-        category_config = self.numerology_config.get('categories', {}).get(category_name, {})
-        all_traits_in_category = list(category_config.get('traits', {}).keys())
-        valid_traits = []
+        trait_names = self.compiled_config.trait_names
+        return [trait_names[trait_id] for trait_id in self._get_valid_trait_ids_for_category(category_name, token_gender, assigned_traits)]
 
-        for trait_name in all_traits_in_category:
-            trait_config = category_config.get('traits', {}).get(trait_name, {})
-            
-            # 1. Check trait-level gender restriction (Flexible Unisex)
-            trait_gender_restriction = trait_config.get('gender') # e.g., "Male", "Female", "Unisex"
-            
-            if trait_gender_restriction: # If the trait itself has a gender defined
-                is_gender_match = False
-                if token_gender == "Unknown":
-                    self._emit_progress(f"      DEBUG_VALID_TRAITS: Trait '{trait_name}' (gender: {trait_gender_restriction}) skipped for UNKNOWN gender token.")
-                    continue 
-
-                if token_gender == "Unisex":
-                    is_gender_match = True # Unisex token can be assigned any gendered trait
-                elif trait_gender_restriction.lower() == "unisex":
-                    is_gender_match = True # Unisex traits are available to Male/Female gender
-                elif trait_gender_restriction == token_gender:
-                    is_gender_match = True # Exact gender match
-                
-                if not is_gender_match:
-                    self._emit_progress(f"      DEBUG_VALID_TRAITS: Trait '{trait_name}' (gender: {trait_gender_restriction}) skipped. No match for token gender '{token_gender}'.")
-                    continue 
-
-            # 2. Check incompatibilities with already assigned traits
-            is_compatible = True
-            for assigned_cat, assigned_trait_val in assigned_traits.items():
-                if not self._check_compatibility(category_name, trait_name, assigned_cat, assigned_trait_val):
-                    is_compatible = False
-                    self._emit_progress(f"      DEBUG_VALID_TRAITS: Trait '{category_name}:{trait_name}' incompatible with existing '{assigned_cat}:{assigned_trait_val}'.")
-                    break
-            
-            if is_compatible:
-                valid_traits.append(trait_name)
-        
-        return valid_traits
+    def _get_valid_trait_ids_for_category(self, category_name: str, token_gender: str, assigned_traits: Dict[str, str]) -> List[int]:
+        """
+        Same as `_get_valid_traits_for_category`, returning trait IDs (ascending).
+        """
+        return self.constraint_masks.iter_bits(self._valid_trait_mask(category_name, token_gender, assigned_traits))
 
-    def _check_compatibility(self, cat1: str, trait1: str, cat2: str, trait2: str, for_adjustment_debug: bool = False) -> bool:
-        """Checks if two traits are compatible based on rules.yaml."""
-        if not self.rules_config or 'incompatibilities' not in self.rules_config:
+    def _valid_trait_mask(self, category_name: str, token_gender: str, assigned_traits: Dict[str, str], assigned_ids: Optional[List[int]] = None) -> int:
+        """
+        Bitmask of a category's valid trait IDs: the gender-filtered candidate mask ANDed with
+        the complement of the partners forbidden by the already assigned traits.
+        `assigned_ids` may pass the trait IDs of `assigned_traits` when the caller already tracks them.
+        """
+        cat_id = self.compiled_config.category_index.get(category_name)
+        if cat_id is None:
+            return 0
+        masks = self.constraint_masks
+        candidate_mask = masks.candidate_mask(cat_id, token_gender)
+        if assigned_ids is None:
+            assigned_ids = self._assigned_trait_ids(assigned_traits)
+        valid_mask = candidate_mask & ~masks.forbidden_by(assigned_ids)
+        if self._trace_enabled: self._emit_progress(f"      DEBUG_VALID_TRAITS: Category '{category_name}': {bin(candidate_mask).count('1')} trait(s) match gender '{token_gender}', {bin(valid_mask).count('1')} compatible with existing traits.", TRACE)
+        return valid_mask
+
+    def _assigned_trait_ids(self, token_traits: Dict[str, str]) -> List[int]:
+        """Trait IDs of a token's assigned traits (traits missing from numerology are ignored)."""
+        trait_index = self.compiled_config.trait_index
+        assigned_ids = []
+        for cat_val in token_traits.items():
+            trait_id = trait_index.get(cat_val)
+            if trait_id is not None:
+                assigned_ids.append(trait_id)
+        return assigned_ids
+
+    def _check_compatibility(self, cat1: str, trait1: str, cat2: str, trait2: str, for_adjustment_debug: bool = False, token_traits: Optional[Dict[str, str]] = None) -> bool:
+        """
+        Checks if two traits are compatible based on the compiled rules.yaml index.
+        If `token_traits` is given, rules whose `breakable_by` trait is on the token are lifted.
+        """
+        entry = self.compiled_rules.lookup(cat1, trait1, cat2, trait2)
+        if entry is None or entry.is_broken_by(token_traits):
             return True
 
-        for rule_idx, rule in enumerate(self.rules_config['incompatibilities']):
-            rule_a_cat, rule_a_trait = rule['trait_a']
-            rule_b_cat, rule_b_trait = rule['trait_b']
-
-            is_match = (cat1 == rule_a_cat and trait1 == rule_a_trait and \
-                        cat2 == rule_b_cat and trait2 == rule_b_trait) or \
-                       (cat1 == rule_b_cat and trait1 == rule_b_trait and \
-                        cat2 == rule_a_cat and trait2 == rule_a_trait)
-
-            if is_match:
-                if for_adjustment_debug:
-                    description = rule.get('description', 'No description')
-                    self._emit_progress(f"        DEBUG_COMPAT_ADJ: Incompatibility by rule #{rule_idx}. Traits: ('{cat1}':'{trait1}') vs ('{cat2}':'{trait2}'). Rule details: '{rule_a_cat}':'{rule_a_trait}' incompatible with '{rule_b_cat}':'{rule_b_trait}'. Desc: {description}")
-                return False
-        return True
+        if for_adjustment_debug:
+            description = "; ".join(entry.descriptions)
+            rule_a_cat, rule_a_trait = entry.trait_a
+            rule_b_cat, rule_b_trait = entry.trait_b
+            self._emit_progress(f"        DEBUG_COMPAT_ADJ: Incompatibility by rule #{entry.rule_indices[0]}. Traits: ('{cat1}':'{trait1}') vs ('{cat2}':'{trait2}'). Rule details: '{rule_a_cat}':'{rule_a_trait}' incompatible with '{rule_b_cat}':'{rule_b_trait}'. Desc: {description}", DEBUG)
+        return False
 
     def _calculate_weights(self, category_name: str, trait_names: List[str], current_token_idx: int) -> List[float]:
         """
         Calculates weights for trait selection.
         """
-        weights = []
-        category_traits_config = self.numerology_config['categories'][category_name]['traits']
-
-        for trait_name in trait_names:
-            trait_config = category_traits_config.get(trait_name, {})
-            target_count = trait_config.get('target_count', 0)
-            current_count = self.trait_counts.get((category_name, trait_name), 0)
-
-            weight_numerator = target_count - current_count
+        trait_ids = [self.compiled_config.trait_id(category_name, trait_name) for trait_name in trait_names]
+        return self._calculate_weights_by_id(trait_ids)
+
+    def _calculate_weights_by_id(self, trait_ids: List[int]) -> List[float]:
+        """Calculates selection weights for trait IDs from the remaining count (target - current)."""
+        target_counts = self.compiled_config.target_counts
+        counts = self.trait_counts.counts
+        # Remaining count + 1 while under target, a token weight once met, 0 for target-0 traits.
+        return [
+            0.0 if trait_id is None or target_counts[trait_id] == 0
+            else float(target_counts[trait_id] - counts[trait_id] + 1) if target_counts[trait_id] > counts[trait_id]
+            else 0.001
+            for trait_id in trait_ids
+        ]
 
-            if target_count == 0: 
-                weight = 0.0
-            elif weight_numerator > 0:
-                weight = float(weight_numerator + 1) 
-            else:
-                weight = 0.001 
-            
-            weights.append(max(0.0, weight))
-            
-        return weights
+    def _sampling_weight(self, trait_id: int) -> int:
+        """`_calculate_weights_by_id` for one trait in integer units of 0.001 (exact sums for the fill's samplers)."""
+        target_count = self.compiled_config.target_counts[trait_id]
+        if target_count == 0:
+            return 0
+        remaining = target_count - self.trait_counts.counts[trait_id]
+        return (remaining + 1) * 1000 if remaining > 0 else 1
 
     def _can_swap(self, token1_idx: int, token2_idx: int, category_to_swap: str) -> bool:
         """
-        NOTE: This method is currently NOT USED by the main generation logic's adjustment phase.
+        True if the two tokens can exchange their `category_to_swap` values and both stay valid.
+        A swap leaves every trait count unchanged. If it changes a token's gender (Gender/Body),
+        the token's other traits must still accept the new gender.
         """
-        token1_traits = self.tokens_data[token1_idx]['traits'].copy()
-        token2_traits = self.tokens_data[token2_idx]['traits'].copy()
+        token1_traits = self.tokens_data[token1_idx]['traits']
+        token2_traits = self.tokens_data[token2_idx]['traits']
+        if category_to_swap not in token1_traits or category_to_swap not in token2_traits: return False
         trait_from_token1 = token1_traits[category_to_swap]
         trait_from_token2 = token2_traits[category_to_swap]
         if trait_from_token1 == trait_from_token2: return False
-        token1_gender = self._get_token_gender(token1_traits)
-        token2_gender = self._get_token_gender(token2_traits)
-        temp_token1_traits = token1_traits.copy()
-        temp_token1_traits[category_to_swap] = trait_from_token2
-        if not self._is_trait_valid_for_token(trait_from_token2, category_to_swap, temp_token1_traits, token1_gender): return False
-        temp_token2_traits = token2_traits.copy()
-        temp_token2_traits[category_to_swap] = trait_from_token1
-        if not self._is_trait_valid_for_token(trait_from_token1, category_to_swap, temp_token2_traits, token2_gender): return False
+        sets_gender = category_to_swap in GENDER_CATEGORIES
+        for token_idx, token_traits, incoming_trait in ((token1_idx, token1_traits, trait_from_token2), (token2_idx, token2_traits, trait_from_token1)):
+            token_gender = self.token_states.genders[token_idx]
+            temp_token_traits = token_traits.copy()
+            temp_token_traits[category_to_swap] = incoming_trait
+            new_gender = self._get_token_gender(temp_token_traits) if sets_gender else token_gender
+            if new_gender != token_gender and not self._gender_change_keeps_token_valid(temp_token_traits, category_to_swap, token_gender, new_gender): return False
+            if not self._is_trait_valid_for_token(incoming_trait, category_to_swap, temp_token_traits, new_gender): return False
         return True
 
     def _is_trait_valid_for_token(self, trait_to_check: str, category_of_trait: str, token_all_traits: Dict[str,str], token_gender: str, for_adjustment_debug: bool = False) -> bool:
@@ -208,13 +286,15 @@ class Generator:
         `token_all_traits` should be the state *after* the hypothetical assignment of `trait_to_check`.
         Implements "Flexible Unisex": Unisex tokens can be assigned Male/Female traits.
         """
-        trait_config = self.numerology_config['categories'][category_of_trait]['traits'][trait_to_check]
+        trait_id = self.compiled_config.trait_id(category_of_trait, trait_to_check)
+        if trait_id is None:
+            raise KeyError((category_of_trait, trait_to_check))
         
         # Check trait-specific gender if defined (Flexible Unisex)
-        trait_gender_restriction = trait_config.get('gender')
+        trait_gender_restriction = self.compiled_config.trait_gender_name(trait_id)
         if trait_gender_restriction: # Trait has a gender attribute ("Male", "Female", or "Unisex")
             if token_gender == "Unknown": 
-                 if for_adjustment_debug: self._emit_progress(f"      DEBUG_ADJUST_VALIDATE: FAILED (Gender). Trait '{category_of_trait}:{trait_to_check}' (gender: {trait_gender_restriction}) for UNKNOWN token gender.")
+                 if for_adjustment_debug: self._emit_progress(f"      DEBUG_ADJUST_VALIDATE: FAILED (Gender). Trait '{category_of_trait}:{trait_to_check}' (gender: {trait_gender_restriction}) for UNKNOWN token gender.", DEBUG)
                  return False
 
             # If token_gender is "Unisex", it can wear any gendered trait.
@@ -224,190 +304,182 @@ class Generator:
                 # Trait must either be "Unisex" (can be worn by anyone) 
                 # or match the token's specific gender.
                 if trait_gender_restriction.lower() != "unisex" and trait_gender_restriction != token_gender:
-                    if for_adjustment_debug: self._emit_progress(f"      DEBUG_ADJUST_VALIDATE: FAILED (Gender). Trait '{category_of_trait}:{trait_to_check}' (gender: {trait_gender_restriction}) for token gender '{token_gender}'.")
+                    if for_adjustment_debug: self._emit_progress(f"      DEBUG_ADJUST_VALIDATE: FAILED (Gender). Trait '{category_of_trait}:{trait_to_check}' (gender: {trait_gender_restriction}) for token gender '{token_gender}'.", DEBUG)
                     return False
         
         # Check incompatibilities with other traits
-        for cat, assigned_trait in token_all_traits.items():
-            if cat == category_of_trait:
-                continue
-            if not self._check_compatibility(category_of_trait, trait_to_check, cat, assigned_trait, for_adjustment_debug=for_adjustment_debug):
-                if for_adjustment_debug: self._emit_progress(f"      DEBUG_ADJUST_VALIDATE: FAILED (Incompatibility). Trait '{category_of_trait}:{trait_to_check}' vs existing '{cat}:{assigned_trait}'. Rule triggered.")
+        forbidden_mask = self.constraint_masks.forbidden_by(self._assigned_trait_ids(token_all_traits), skip_category=self.compiled_config.trait_category[trait_id])
+        if (forbidden_mask >> trait_id) & 1:
+            if for_adjustment_debug:
+                # Slow path only to name the offending trait in the debug output
+                for cat, assigned_trait in token_all_traits.items():
+                    if cat != category_of_trait and not self._check_compatibility(category_of_trait, trait_to_check, cat, assigned_trait, for_adjustment_debug=True, token_traits=token_all_traits):
+                        self._emit_progress(f"      DEBUG_ADJUST_VALIDATE: FAILED (Incompatibility). Trait '{category_of_trait}:{trait_to_check}' vs existing '{cat}:{assigned_trait}'. Rule triggered.", DEBUG)
+                        break
+            return False
+
+        # Changing a `breakable_by` trait (e.g. a Glyph) can revoke an exemption between two other traits.
+        if category_of_trait in self.compiled_rules.breaker_categories:
+            violation = self.compiled_rules.find_violation(token_all_traits)
+            if violation is not None:
+                if for_adjustment_debug: self._emit_progress(f"      DEBUG_ADJUST_VALIDATE: FAILED (Breakable rule). Trait '{category_of_trait}:{trait_to_check}' leaves '{violation[0]}:{violation[1]}' vs '{violation[2]}:{violation[3]}' unbroken.", DEBUG)
                 return False
         return True
 
     def _execute_swap(self, token1_idx: int, token2_idx: int, category_to_swap: str):
-        """
-        NOTE: This method is currently NOT USED by the main generation logic's adjustment phase.
-        """
+        """Exchanges the `category_to_swap` values of two tokens (check with `_can_swap` first)."""
         token1_data = self.tokens_data[token1_idx]
         token2_data = self.tokens_data[token2_idx]
         trait1_original = token1_data['traits'][category_to_swap]
         trait2_original = token2_data['traits'][category_to_swap]
-        self.trait_counts[(category_to_swap, trait1_original)] -= 1
-        self.trait_counts[(category_to_swap, trait2_original)] -= 1
-        token1_data['traits'][category_to_swap] = trait2_original
-        token2_data['traits'][category_to_swap] = trait1_original
-        self.trait_counts[(category_to_swap, trait2_original)] += 1
-        self.trait_counts[(category_to_swap, trait1_original)] += 1
-
-    def _emit_progress(self, message: str):
+        self._set_token_trait(token1_idx, category_to_swap, trait2_original)
+        self._set_token_trait(token2_idx, category_to_swap, trait1_original)
+        if token1_idx in self.combination_index and token2_idx in self.combination_index:
+            self.combination_index.update_trait(token1_idx, category_to_swap, trait1_original, trait2_original)
+            self.combination_index.update_trait(token2_idx, category_to_swap, trait2_original, trait1_original)
+        # Both traits stay in the collection once each, so trait_counts is unchanged.
+
+    def _substream(self, phase: str, index: Optional[int] = None) -> random.Random:
+        """
+        Independent, reproducible RNG for one phase (and optionally one token or iteration) of this
+        generator, derived from the seed as "{seed}/{phase}[/{index}]". Token i's fill draws do not
+        depend on how many draws earlier tokens made, and generators never share RNG state.
+        """
+        return random.Random(f"{self.seed}/{phase}" if index is None else f"{self.seed}/{phase}/{index}")
+
+    def set_log_level(self, log_level: Union[int, str]):
+        """Sets the minimum level of emitted messages and refreshes the hot-loop guards."""
+        self.log_level = parse_log_level(log_level)
+        # Hot loops test these flags before formatting anything, so disabled messages cost nothing.
+        self._trace_enabled = self.log_level <= TRACE
+        self._debug_enabled = self.log_level <= DEBUG
+
+    def _emit_progress(self, message: str, level: int = INFO):
+        if level < self.log_level:
+            return
         if self.log_callback:
             self.log_callback(message)
         else:
             print(message)
 
     def _get_target_count(self, category_name: str, trait_name: str) -> int:
-        try:
-            return self.numerology_config['categories'][category_name]['traits'][trait_name]['target_count']
-        except KeyError:
-            return 0
+        trait_id = self.compiled_config.trait_id(category_name, trait_name)
+        return self.compiled_config.target_counts[trait_id] if trait_id is not None else 0
 
     def _get_tolerance(self, category_name: str, trait_name: str) -> int:
-        try:
-            return self.numerology_config['categories'][category_name]['traits'][trait_name]['tolerance']
-        except KeyError:
-            return 0
+        trait_id = self.compiled_config.trait_id(category_name, trait_name)
+        return self.compiled_config.tolerances[trait_id] if trait_id is not None else 0
+
+    def _increment_trait_count(self, category_name: str, trait_name: str, delta: int = 1):
+        """Adjusts the count of a trait by name; traits missing from numerology are not counted."""
+        trait_id = self.compiled_config.trait_id(category_name, trait_name)
+        if trait_id is not None:
+            self.trait_counts.counts[trait_id] += delta
 
     def _seed_sovereign_glyphs(self):
         self._emit_progress("Seeding Sovereign Glyphs...")
-        glyph_category_data = self.numerology_config.get('categories', {}).get("Glyph", {})
-        if not glyph_category_data or not glyph_category_data.get('traits'):
-            self._emit_progress("  Warning: Glyph category or its traits not found. Skipping Sovereign seeding.")
+        config = self.compiled_config
+        glyph_trait_ids = config.traits_of("Glyph")
+        if not glyph_trait_ids:
+            self._emit_progress("  Warning: Glyph category or its traits not found. Skipping Sovereign seeding.", WARN)
             return
 
+        # Every copy of each Sovereign glyph (laws 1-7) is placed up front: one each at 420 tokens, more in larger collections.
         sovereign_glyph_names = []
-        for glyph_name, trait_data in glyph_category_data.get('traits', {}).items():
-            law_num = self._parse_glyph_law_number(glyph_name)
-            if law_num is not None and 1 <= law_num <= 7 and trait_data.get("target_count") == 1:
-                sovereign_glyph_names.append(glyph_name)
-        
-        expected_sovereign_count = 7 
-        if len(sovereign_glyph_names) != expected_sovereign_count:
-            self._emit_progress(f"  Warning: Expected {expected_sovereign_count} Sovereign Glyphs with target_count 1, found {len(sovereign_glyph_names)}. Check numerology.")
+        for trait_id in glyph_trait_ids:
+            if glyph_tier(config.law_number(trait_id)) == "Sovereign":
+                sovereign_glyph_names.extend([config.trait_names[trait_id]] * config.target_counts[trait_id])
 
         available_token_indices = list(range(self.target_collection_size))
-        random.shuffle(available_token_indices)
+        self._substream("seed_sovereign").shuffle(available_token_indices)
 
         for glyph_name in sovereign_glyph_names:
             if not available_token_indices:
-                self._emit_progress(f"  Error: Ran out of tokens for Sovereign Glyph {glyph_name}.")
+                self._emit_progress(f"  Error: Ran out of tokens for Sovereign Glyph {glyph_name}.", WARN)
                 continue
             chosen_token_idx = available_token_indices.pop()
             token_id_str = self.tokens_data[chosen_token_idx]['token_id']
             
-            current_token_traits = self.tokens_data[chosen_token_idx]['traits']
-            glyph_law_num = self._parse_glyph_law_number(glyph_name)
-
-            self.tokens_data[chosen_token_idx]['traits']["Glyph"] = glyph_name
-            self.tokens_data[chosen_token_idx]['law_number'] = glyph_law_num
-            self.trait_counts[("Glyph", glyph_name)] = self.trait_counts.get(("Glyph", glyph_name), 0) + 1
+            self._set_token_trait(chosen_token_idx, "Glyph", glyph_name)
+            self._increment_trait_count("Glyph", glyph_name)
             
-            if glyph_law_num == 5: 
-                self.tokens_data[chosen_token_idx]['traits']["Rank"] = "Boss / Don"
-                self.trait_counts[("Rank", "Boss / Don")] = self.trait_counts.get(("Rank", "Boss / Don"), 0) + 1
-                self._emit_progress(f"  Assigned Sovereign Glyph '{glyph_name}' to Token ID {token_id_str} & forced Rank to 'Boss / Don'.")
+            if self.token_states.law_numbers[chosen_token_idx] == 5: 
+                self._set_token_trait(chosen_token_idx, "Rank", "Boss / Don")
+                self._increment_trait_count("Rank", "Boss / Don")
+                self._emit_progress(f"  Assigned Sovereign Glyph '{glyph_name}' to Token ID {token_id_str} & forced Rank to 'Boss / Don'.", DEBUG)
             else:
-                self._emit_progress(f"  Assigned Sovereign Glyph '{glyph_name}' to Token ID {token_id_str}")
+                self._emit_progress(f"  Assigned Sovereign Glyph '{glyph_name}' to Token ID {token_id_str}", DEBUG)
 
     def _seed_special_singletons(self):
         self._emit_progress("Seeding Special Singleton Traits...")
         special_traits_to_assign: List[Tuple[str, str]] = []
         
-        for cat_name, cat_data in self.numerology_config.get('categories', {}).items():
-            for trait_name, trait_config in cat_data.get('traits', {}).items():
-                if trait_config.get('target_count') == 1:
-                    is_sovereign_glyph = False
-                    if cat_name == "Glyph": 
-                        law_num = self._parse_glyph_law_number(trait_name)
-                        if law_num is not None and 1 <= law_num <= 7:
-                            is_sovereign_glyph = True
-                    
-                    if not is_sovereign_glyph:
-                        special_traits_to_assign.append((cat_name, trait_name))
+        config = self.compiled_config
+        for trait_id in range(config.trait_total):
+            if config.target_counts[trait_id] == 1:
+                is_sovereign_glyph = glyph_tier(config.law_number(trait_id)) == "Sovereign"
+                
+                if not is_sovereign_glyph:
+                    special_traits_to_assign.append(config.trait_key(trait_id))
 
         if not special_traits_to_assign:
             self._emit_progress("  No special singleton traits to seed (excluding Sovereign Glyphs).")
             return
 
-        available_token_indices = []
-        for idx, data in enumerate(self.tokens_data):
-            is_sovereign_holder = False
-            glyph_trait = data['traits'].get("Glyph")
-            if glyph_trait:
-                law_num = self._parse_glyph_law_number(glyph_trait)
-                if law_num is not None and 1 <= law_num <=7:
-                    is_sovereign_holder = True
-            if not is_sovereign_holder:
-                available_token_indices.append(idx)
+        is_sovereign_holder = self.token_states.is_sovereign # Set by Sovereign seeding
+        available = TokenPool(idx for idx in range(len(self.tokens_data)) if not is_sovereign_holder[idx])
         
-        if not available_token_indices and self.target_collection_size > 7 : 
-            self._emit_progress("  Warning: All tokens might be Sovereign holders; seeding singletons on any available.")
-            available_token_indices = list(range(self.target_collection_size))
+        if not available and self.target_collection_size > 7 : 
+            self._emit_progress("  Warning: All tokens might be Sovereign holders; seeding singletons on any available.", WARN)
+            available = TokenPool(range(self.target_collection_size))
 
-        random.shuffle(available_token_indices)
-        
-        assigned_tokens_for_category_during_seeding: Dict[str, List[int]] = {} 
+        # Available tokens that already hold a category (Sovereign seeding); a token leaves these once seeded.
+        holders_by_category: Dict[str, Set[int]] = {}
+        for idx in available:
+            for cat_name in self.tokens_data[idx]['traits']:
+                holders_by_category.setdefault(cat_name, set()).add(idx)
+
+        rng = self._substream("seed_singletons")
 
         for cat_name, trait_name in special_traits_to_assign:
             assigned_to_token = False
-            
-            current_candidates = [
-                idx for idx in available_token_indices
-                if cat_name not in self.tokens_data[idx]['traits']
-            ]
-            if not current_candidates: 
-                current_candidates = [
-                    idx for idx in available_token_indices
-                     if not (cat_name in assigned_tokens_for_category_during_seeding and \
-                             idx in assigned_tokens_for_category_during_seeding[cat_name])
-                ]
-            if not current_candidates: 
-                current_candidates = list(available_token_indices)
-
-            random.shuffle(current_candidates)
-
-            for token_idx in current_candidates:
+            # Prefer tokens without the category; if every available token has it, any available token.
+            holders = holders_by_category.get(cat_name, ())
+            skip_holders = len(holders) < len(available)
+
+            for token_idx in available.random_order(rng):
+                if skip_holders and token_idx in holders:
+                    continue
                 current_token_data = self.tokens_data[token_idx]
                 token_id_str = current_token_data['token_id']
                 
-                is_token_sovereign_holder = False
-                token_glyph_trait = current_token_data['traits'].get("Glyph")
-                if token_glyph_trait:
-                    law_n = self._parse_glyph_law_number(token_glyph_trait)
-                    if law_n and 1 <= law_n <= 7: is_token_sovereign_holder = True
-                
-                if cat_name == "Rank" and trait_name == "Joker / Wildcard" and is_token_sovereign_holder:
+                if cat_name == "Rank" and trait_name == "Joker / Wildcard" and is_sovereign_holder[token_idx]:
                     continue
 
-                token_gender_for_check = self._get_token_gender(current_token_data['traits'])
+                token_gender_for_check = self.token_states.genders[token_idx]
                 hypothetical_traits = current_token_data['traits'].copy()
                 hypothetical_traits[cat_name] = trait_name 
                 
                 effective_gender_for_validation = trait_name if cat_name == "Gender" else token_gender_for_check
 
                 if self._is_trait_valid_for_token(trait_name, cat_name, hypothetical_traits, effective_gender_for_validation):
-                    current_token_data['traits'][cat_name] = trait_name
-                    self.trait_counts[(cat_name, trait_name)] = self.trait_counts.get((cat_name, trait_name), 0) + 1
+                    self._set_token_trait(token_idx, cat_name, trait_name)
+                    self._increment_trait_count(cat_name, trait_name)
                     
-                    if cat_name not in assigned_tokens_for_category_during_seeding:
-                        assigned_tokens_for_category_during_seeding[cat_name] = []
-                    assigned_tokens_for_category_during_seeding[cat_name].append(token_idx)
-                    
-                    if cat_name == "Glyph": 
-                        current_token_data['law_number'] = self._parse_glyph_law_number(trait_name)
-                    
-                    self._emit_progress(f"    Assigned singleton '{cat_name}: {trait_name}' to Token ID {token_id_str}")
-                    if token_idx in available_token_indices: 
-                        available_token_indices.remove(token_idx) 
+                    self._emit_progress(f"    Assigned singleton '{cat_name}: {trait_name}' to Token ID {token_id_str}", DEBUG)
                     assigned_to_token = True
                     break 
-            
-            if not assigned_to_token:
-                self._emit_progress(f"  Warning: Could not find a suitable token for special singleton '{cat_name}: {trait_name}'. Trait count for it will be 0.")
+
+            if assigned_to_token:
+                available.remove(token_idx)
+                for held_cat in self.tokens_data[token_idx]['traits']:
+                    if held_cat in holders_by_category:
+                        holders_by_category[held_cat].discard(token_idx)
+            else:
+                self._emit_progress(f"  Warning: Could not find a suitable token for special singleton '{cat_name}: {trait_name}'. Trait count for it will be 0.", WARN)
 
     def _get_category_order(self) -> List[str]:
-        categories = list(self.numerology_config.get('categories', {}).keys())
+        categories = self.compiled_config.category_names
         preferred_order = ["Gender", "Body", "Rank", "Glyph"] 
         
         ordered_categories = [cat for cat in preferred_order if cat in categories]
@@ -417,213 +489,588 @@ class Generator:
         return ordered_categories
 
     def generate_tokens(self) -> List[Token]:
-        self.tokens_data = [] 
+        # All per-token state lives in one columnar store; tokens_data is a view that writes through to it.
         id_padding = len(str(self.target_collection_size))
-        for i in range(self.target_collection_size):
-            self.tokens_data.append({
-                "token_id": str(i + 1).zfill(id_padding),
-                "traits": {},
-                "law_number": None
-            })
+        self.token_store = TokenStore.create(self.compiled_config, self.target_collection_size, id_padding, self.token_store_path)
+        self.tokens_data = self.token_store.rows()
 
-        for key in self.trait_counts: self.trait_counts[key] = 0
+        self.trait_counts.reset()
+        self.combination_index = CombinationIndex(self.compiled_config, self.tokens_data) # Tokens are registered once filled
+        self.token_states = TokenStates(self.compiled_config, self.tokens_data)
 
         self._seed_sovereign_glyphs() 
         self._seed_special_singletons() 
 
+        if self.allocation_mode == "deck":
+            self._run_deck_allocation_phase()
+        else:
+            self._run_weighted_fill_phase()
+
+        if self.adjustment_mode == "flow":
+            self._run_flow_rebalancing_phase()
+        else:
+            self._run_adjustment_phase()
+        if self.swap_repair:
+            self._run_swap_repair_phase()
+
+        self._emit_progress("Final Validation starting...")
+        self._final_validation_checks(CodeMatrix.from_store(self.compiled_config, self.token_store))
+        self.token_store.flush()
+
+        # The returned Tokens are views over the store's rows; no trait dicts are copied.
+        return self.token_store.tokens()
+
+    def _run_weighted_fill_phase(self):
+        """Fills every token's remaining categories by weighted random draws (remaining count + 1)."""
         self._emit_progress(f"Weighted Random Fill Phase starting for {self.target_collection_size} tokens...")
         category_order = self._get_category_order()
+        config = self.compiled_config
+        trait_names = config.trait_names
+        target_counts = config.target_counts
+        tolerances = config.tolerances
+        counts = self.trait_counts.counts
+        masks = self.constraint_masks
+        joker_trait_id = config.trait_id("Rank", "Joker / Wildcard")
+        glyph13_trait_id = config.trait_id("Glyph", "glyph_13")
+        joker_bit = 0 if joker_trait_id is None else 1 << joker_trait_id
+        glyph13_bit = 0 if glyph13_trait_id is None else 1 << glyph13_trait_id
+        # Fenwick trees over the sampling weights; each draw and count update is O(log traits).
+        sampler = MaskedTraitSampler(masks, self._sampling_weight)
+        if self.column_sampling:
+            self._draw_free_category_columns(category_order)
+        dynamic_order = self.category_order == "dynamic"
+        lookahead = self.weighting_mode == "lookahead"
+        supply_genders = self._supply_genders_by_code() if lookahead else None
+        compatible_shares = self._compatible_shares() if lookahead else None
+        self._under_target_mask = 0
+        for trait_id in range(config.trait_total):
+            self._refresh_under_target(trait_id)
+        token_genders = self.token_states.genders
 
         for i in range(self.target_collection_size):
             current_token_data = self.tokens_data[i]
             token_id_str = current_token_data['token_id']
-            self._emit_progress(f"\nDEBUG_FILL: Processing Token ID {token_id_str}")
-
-            token_gender = self._get_token_gender(current_token_data['traits'])
-            self._emit_progress(f"  DEBUG_FILL: Token ID {token_id_str} - Initial Gender for Fill: {token_gender} (Current traits: {current_token_data['traits']})")
-
-            for category_name in category_order:
-                self._emit_progress(f"  DEBUG_FILL: Token ID {token_id_str}, Category: {category_name}")
-                if category_name in current_token_data['traits']:
-                    self._emit_progress(f"    DEBUG_FILL: Skipped (already assigned by seeding/earlier fill): {category_name} = {current_token_data['traits'][category_name]}")
-                    if category_name == "Gender": token_gender = current_token_data['traits']["Gender"]
-                    elif category_name == "Body": token_gender = self._get_token_gender(current_token_data['traits']) 
+            if self._debug_enabled: self._emit_progress(f"\nDEBUG_FILL: Processing Token ID {token_id_str}", DEBUG)
+
+            token_traits = current_token_data['traits'] # Read once; a live view of the token's row
+            token_gender = token_genders[i]
+            if self._debug_enabled: self._emit_progress(f"  DEBUG_FILL: Token ID {token_id_str} - Initial Gender for Fill: {token_gender} (Current traits: {token_traits})", DEBUG)
+            filled_categories = []
+            assigned_ids = self._assigned_trait_ids(token_traits) # Seeded traits; extended as the fill assigns
+            token_rng = self._substream("fill", i)
+
+            pending_categories = list(category_order)
+            while pending_categories:
+                if dynamic_order:
+                    category_name = self._pop_most_constrained_category(pending_categories, token_traits, assigned_ids, token_genders[i])
+                else:
+                    category_name = pending_categories.pop(0)
+                if self._trace_enabled: self._emit_progress(f"  DEBUG_FILL: Token ID {token_id_str}, Category: {category_name}", TRACE)
+                if category_name in token_traits:
+                    if self._trace_enabled: self._emit_progress(f"    DEBUG_FILL: Skipped (already assigned by seeding/earlier fill): {category_name} = {token_traits[category_name]}", TRACE)
                     continue
                 
-                current_processing_gender = self._get_token_gender(current_token_data['traits'])
+                current_processing_gender = token_genders[i]
 
                 if not self._is_category_applicable_by_gender_spec(category_name, current_processing_gender):
-                    self._emit_progress(f"    DEBUG_FILL: Skipped Category '{category_name}' for Token ID {token_id_str}. Reason: Not applicable for gender '{current_processing_gender}'.")
+                    if self._trace_enabled: self._emit_progress(f"    DEBUG_FILL: Skipped Category '{category_name}' for Token ID {token_id_str}. Reason: Not applicable for gender '{current_processing_gender}'.", TRACE)
                     continue
                 
-                valid_traits = self._get_valid_traits_for_category(category_name, current_processing_gender, current_token_data['traits'])
-
-                if valid_traits:
-                    temp_valid_traits = []
-                    for trait_name_check in valid_traits:
-                        keep_trait = True 
-                        if category_name == "Rank" and trait_name_check == "Joker / Wildcard":
-                            joker_target = self._get_target_count("Rank", "Joker / Wildcard")
-                            if self.trait_counts.get(("Rank", "Joker / Wildcard"), 0) >= joker_target:
-                                self._emit_progress(f"  DEBUG_FILL_STRICT: Token ID {token_id_str}, Cat '{category_name}'. Trait '{trait_name_check}' count ({self.trait_counts.get(('Rank', 'Joker / Wildcard'),0)}) met/exceeded target ({joker_target}). Excluding from fill choices.")
-                                keep_trait = False
-                        
-                        elif category_name == "Glyph" and trait_name_check == "glyph_13":
-                            g13_target = self._get_target_count("Glyph", "glyph_13")
-                            g13_tol = self._get_tolerance("Glyph", "glyph_13")
-                            if self.trait_counts.get(("Glyph", "glyph_13"), 0) >= g13_target + g13_tol:
-                                self._emit_progress(f"  DEBUG_FILL_STRICT: Token ID {token_id_str}, Cat '{category_name}'. Trait '{trait_name_check}' count ({self.trait_counts.get(('Glyph', 'glyph_13'),0)}) met/exceeded target+tolerance ({g13_target + g13_tol}). Excluding.")
-                                keep_trait = False
-                        
-                        if keep_trait:
-                            temp_valid_traits.append(trait_name_check)
-                    
-                    valid_traits = temp_valid_traits 
-
-                if not valid_traits:
-                    self._emit_progress(f"  WARNING_FILL: No valid traits left for Token ID {token_id_str}, Category '{category_name}' after STRICT target adherence checks. Gender: '{current_processing_gender}'. Current Traits: {current_token_data['traits']}. Skipping category.")
+                valid_mask = self._valid_trait_mask(category_name, current_processing_gender, token_traits, assigned_ids)
+
+                # Strict caps: tested on the mask, so categories without these traits pay two bit tests.
+                if joker_bit & valid_mask and counts[joker_trait_id] >= target_counts[joker_trait_id]:
+                    if self._debug_enabled: self._emit_progress(f"  DEBUG_FILL_STRICT: Token ID {token_id_str}, Cat '{category_name}'. Trait 'Joker / Wildcard' count ({counts[joker_trait_id]}) met/exceeded target ({target_counts[joker_trait_id]}). Excluding from fill choices.", DEBUG)
+                    valid_mask &= ~joker_bit
+                if glyph13_bit & valid_mask and counts[glyph13_trait_id] >= target_counts[glyph13_trait_id] + tolerances[glyph13_trait_id]:
+                    if self._debug_enabled: self._emit_progress(f"  DEBUG_FILL_STRICT: Token ID {token_id_str}, Cat '{category_name}'. Trait 'glyph_13' count ({counts[glyph13_trait_id]}) met/exceeded target+tolerance ({target_counts[glyph13_trait_id] + tolerances[glyph13_trait_id]}). Excluding.", DEBUG)
+                    valid_mask &= ~glyph13_bit
+
+                if not valid_mask:
+                    self._emit_progress(f"  WARNING_FILL: No valid traits left for Token ID {token_id_str}, Category '{category_name}' after STRICT target adherence checks. Gender: '{current_processing_gender}'. Current Traits: {token_traits}. Skipping category.", WARN)
                     continue
                 
-                weights = self._calculate_weights(category_name, valid_traits, i)
+                if lookahead:
+                    chosen_trait_id = self._draw_lookahead(masks.trait_ids_of(valid_mask), current_processing_gender, supply_genders, compatible_shares, token_rng)
+                else:
+                    chosen_trait_id = sampler.sample(config.category_index[category_name], current_processing_gender, valid_mask, token_rng)
                 
-                chosen_trait = ""
-                if not any(w > 0 for w in weights): 
-                    self._emit_progress(f"    DEBUG_FILL: Token ID {token_id_str}, Category '{category_name}'. All actual weights zero (target=0 traits). Valid traits (if any): {valid_traits}. Attempting random choice if any valid.")
-                    if valid_traits: 
-                        chosen_trait = random.choice(valid_traits)
-                    else: 
-                        self._emit_progress(f"  ERROR_FILL: Token ID {token_id_str}, Category '{category_name}'. No valid traits and all actual weights zero. Cannot assign.")
-                        continue 
-                else: 
-                    chosen_trait = random.choices(valid_traits, weights=weights, k=1)[0]
+                if chosen_trait_id is None: 
+                    valid_trait_ids = masks.trait_ids_of(valid_mask)
+                    if self._debug_enabled: self._emit_progress(f"    DEBUG_FILL: Token ID {token_id_str}, Category '{category_name}'. All actual weights zero (target=0 traits). Valid traits (if any): {[trait_names[t] for t in valid_trait_ids]}. Attempting random choice if any valid.", DEBUG)
+                    chosen_trait_id = token_rng.choice(valid_trait_ids)
+                chosen_trait = trait_names[chosen_trait_id]
                 
                 if chosen_trait:
-                    current_token_data['traits'][category_name] = chosen_trait
-                    self.trait_counts[(category_name, chosen_trait)] = self.trait_counts.get((category_name, chosen_trait), 0) + 1
-                    self._emit_progress(f"    DEBUG_FILL: Assigned to Token ID {token_id_str}: {category_name} = {chosen_trait} (Gender used for selection: {current_processing_gender})")
+                    self._set_token_trait(i, category_name, chosen_trait)
+                    counts[chosen_trait_id] += 1
+                    sampler.refresh(chosen_trait_id)
+                    self._refresh_under_target(chosen_trait_id)
+                    assigned_ids.append(chosen_trait_id)
+                    filled_categories.append(category_name)
+                    if self._debug_enabled: self._emit_progress(f"    DEBUG_FILL: Assigned to Token ID {token_id_str}: {category_name} = {chosen_trait} (Gender used for selection: {current_processing_gender})", DEBUG)
                     
-                    if category_name == "Gender":
-                        token_gender = chosen_trait 
-                        self._emit_progress(f"    DEBUG_FILL: Token ID {token_id_str} - Gender updated to: {token_gender} after assigning Gender trait.")
-                    elif category_name == "Body":
-                        new_gender_after_body = self._get_token_gender(current_token_data['traits'])
-                        if new_gender_after_body != token_gender :
-                            token_gender = new_gender_after_body
-                            self._emit_progress(f"    DEBUG_FILL: Token ID {token_id_str} - Gender updated to: {token_gender} after assigning Body trait.")
+                    if token_genders[i] != token_gender:
+                        token_gender = token_genders[i]
+                        if self._debug_enabled: self._emit_progress(f"    DEBUG_FILL: Token ID {token_id_str} - Gender updated to: {token_gender} after assigning {category_name} trait.", DEBUG)
                 else:
-                    self._emit_progress(f"  ERROR_FILL: Token ID {token_id_str}, Category '{category_name}'. chosen_trait is empty. This shouldn't happen if valid_traits existed. Skipping.")
+                    self._emit_progress(f"  ERROR_FILL: Token ID {token_id_str}, Category '{category_name}'. chosen_trait is empty. This shouldn't happen if valid_traits existed. Skipping.", WARN)
             
-            if "Glyph" in current_token_data['traits'] and current_token_data.get('law_number') is None:
-                 current_token_data['law_number'] = self._parse_glyph_law_number(current_token_data['traits']["Glyph"])
+            duplicate_of = self.combination_index.find_duplicate(token_traits)
+            if duplicate_of is not None:
+                self._resample_duplicate_token(i, filled_categories, duplicate_of, token_rng, sampler)
+            self.combination_index.add(i)
 
             if (i + 1) % (self.target_collection_size // 20 or 1) == 0 or (i+1) == self.target_collection_size :
                 self._emit_progress(f"Weighted Random Fill Phase: {i+1}/{self.target_collection_size} tokens processed.")
 
+    def _pop_most_constrained_category(self, pending_categories: List[str], token_traits: Dict[str, str], assigned_ids: List[int], token_gender: Optional[str] = None) -> str:
+        """
+        Removes and returns the next category for the dynamic order: the pending category with the
+        fewest valid traits still below target for the token, given its assigned traits (ties keep
+        the static order). `token_gender` defaults to the gender of `token_traits`.
+        Gender-deciding categories, categories already assigned and categories not applicable to the
+        token's gender are returned as soon as they are reached; the fill handles or skips them.
+        """
+        config = self.compiled_config
+        masks = self.constraint_masks
+        if token_gender is None:
+            token_gender = self._get_token_gender(token_traits)
+        open_mask = None
+        best_idx, best_size = 0, None
+        for idx, category_name in enumerate(pending_categories):
+            cat_id = config.category_index[category_name]
+            gender_spec = config.category_gender_spec[cat_id] # Inlined `_is_category_applicable_by_gender_spec`
+            if category_name in GENDER_CATEGORIES or category_name in token_traits or (gender_spec and gender_spec != token_gender):
+                return pending_categories.pop(idx)
+            if open_mask is None:
+                open_mask = self._under_target_mask & ~masks.forbidden_by(assigned_ids)
+            size = bin(masks.candidate_mask(cat_id, token_gender) & open_mask).count("1")
+            if best_size is None or size < best_size:
+                best_idx, best_size = idx, size
+        if self._trace_enabled: self._emit_progress(f"    DEBUG_FILL_ORDER: '{pending_categories[best_idx]}' has the fewest valid traits below target ({best_size}) of {len(pending_categories)} pending categories.", TRACE)
+        return pending_categories.pop(best_idx)
+
+    def _supply_genders_by_code(self) -> Dict[int, Tuple[int, ...]]:
+        """
+        For each trait gender code, the Gender traits whose tokens may take such a trait
+        ("Flexible Unisex", see CompiledConfig.is_trait_gender_allowed).
+        """
+        config = self.compiled_config
+        gender_trait_ids = config.traits_of("Gender")
+        supply_genders = {}
+        for code in set(config.trait_genders):
+            probe_trait_id = config.trait_genders.index(code)
+            supply_genders[code] = tuple(g for g in gender_trait_ids if config.is_trait_gender_allowed(probe_trait_id, config.trait_names[g]))
+        return supply_genders
+
+    def _compatible_shares(self) -> List[float]:
+        """
+        Per trait, the expected share of tokens it is compatible with: the product over the other
+        categories of the target share not taken by its forbidden partners (rules treated as independent).
+        """
+        config = self.compiled_config
+        masks = self.constraint_masks
+        size = max(self.target_collection_size, 1)
+        shares = [1.0] * config.trait_total
+        for trait_id in range(config.trait_total):
+            blocked_by_category: Dict[int, int] = {}
+            for partner_id in masks.iter_bits(masks.forbidden[trait_id]):
+                partner_cat = config.trait_category[partner_id]
+                blocked_by_category[partner_cat] = blocked_by_category.get(partner_cat, 0) + config.target_counts[partner_id]
+            for blocked in blocked_by_category.values():
+                shares[trait_id] *= max(1.0 - blocked / size, 1.0 / size)
+        return shares
+
+    def _draw_lookahead(self, trait_ids: Tuple[int, ...], token_gender: str, supply_genders: Dict[int, Tuple[int, ...]], compatible_shares: List[float], rng: random.Random) -> int:
+        """
+        Look-ahead draw: each trait's usual weight is divided by its remaining eligible supply, the
+        tokens still to fill (this one included) that may take it. Supply is the remaining count of
+        the genders allowed to take the trait (plus this token for its own gender), scaled by the
+        trait's `_compatible_shares` entry. Traits whose eligible tokens are running out, because of
+        gender or rules, are drawn more often than open traits with the same remaining count.
+        """
+        config = self.compiled_config
+        counts = self.trait_counts.counts
+        target_counts = config.target_counts
+        trait_genders = config.trait_genders
+        trait_names = config.trait_names
+        supply_by_code = {}
+        weights = self._calculate_weights_by_id(trait_ids)
+        for idx, trait_id in enumerate(trait_ids):
+            code = trait_genders[trait_id]
+            supply = supply_by_code.get(code)
+            if supply is None:
+                supply = sum(max(target_counts[g] - counts[g], 0) + (trait_names[g] == token_gender) for g in supply_genders[code])
+                supply_by_code[code] = supply
+            weights[idx] /= max(supply * compatible_shares[trait_id], 1.0)
+        if any(w > 0 for w in weights):
+            return rng.choices(trait_ids, weights=weights, k=1)[0]
+        return rng.choice(trait_ids)
+
+    def _refresh_under_target(self, trait_id: int):
+        """Updates trait_id's bit in `_under_target_mask` after its count changed."""
+        if self.trait_counts.counts[trait_id] < self.compiled_config.target_counts[trait_id]:
+            self._under_target_mask |= 1 << trait_id
+        else:
+            self._under_target_mask &= ~(1 << trait_id)
+
+    def _draw_free_category_columns(self, category_order: List[str]):
+        """
+        Assigns every free category (see src/column_sampling.py) to all tokens still missing it
+        in one quota draw per category. The per-token fill then skips these like seeded traits.
+        """
+        config = self.compiled_config
+        counts = self.trait_counts.counts
+        target_counts = config.target_counts
+        strict_ids = {config.trait_id("Rank", "Joker / Wildcard"), config.trait_id("Glyph", "glyph_13")}
+        free_ids = set(free_category_ids(config, self.constraint_masks))
+        for category_name in category_order:
+            cat_id = config.category_index[category_name]
+            trait_ids = config.category_trait_ids[cat_id]
+            if cat_id not in free_ids or strict_ids.intersection(trait_ids):
+                continue
+            token_indices = [idx for idx, data in enumerate(self.tokens_data) if category_name not in data['traits']]
+            if not token_indices:
+                continue
+            remaining = [max(target_counts[t] - counts[t], 0) for t in trait_ids]
+            fallback_ids = [t for t in trait_ids if target_counts[t] > 0] or list(trait_ids)
+            column = draw_quota_column(trait_ids, remaining, fallback_ids, len(token_indices), self._substream("column", cat_id).getrandbits(64))
+            trait_names = config.trait_names
+            for token_idx, trait_id in zip(token_indices, column):
+                self._set_token_trait(token_idx, category_name, trait_names[trait_id])
+                counts[trait_id] += 1
+            self._emit_progress(f"  Column draw: '{category_name}' assigned to {len(token_indices)} tokens.", DEBUG)
+
+    def _run_deck_allocation_phase(self):
+        """
+        Deals every category from a deck holding exactly (target - seeded) cards per trait,
+        split over the gender partitions of the tokens that still need the category.
+        Tokens the deal could not serve are repaired locally, then duplicate tokens and
+        rule violations are fixed by count-neutral swaps.
+        """
+        self._emit_progress(f"Deck Allocation Phase starting for {self.target_collection_size} tokens...")
+        config = self.compiled_config
+        masks = self.constraint_masks
+        counts = self.trait_counts.counts
+        tokens_data = self.tokens_data
+        token_genders = self.token_states.genders
+        token_assigned_ids = [self._assigned_trait_ids(data['traits']) for data in tokens_data]
+        rng = self._substream("deal")
+        holders_index: Optional[TraitTokenIndex] = None # Built on the first repair, then kept up to date
+        repaired_total = 0
+        fallback_total = 0
+
+        for category_name in self._get_category_order():
+            cat_id = config.category_index[category_name]
+            trait_ids = config.category_trait_ids[cat_id]
+            partitions: Dict[str, List[int]] = {} # token gender -> tokens still missing this category
+            for token_idx, token_data in enumerate(tokens_data):
+                if category_name in token_data['traits']:
+                    continue
+                token_gender = token_genders[token_idx]
+                if self._is_category_applicable_by_gender_spec(category_name, token_gender):
+                    partitions.setdefault(token_gender, []).append(token_idx)
+            if not partitions:
+                continue
+
+            genders = list(partitions)
+            copies = [max(config.target_counts[trait_id] - counts[trait_id], 0) for trait_id in trait_ids]
+            allowed = [[p for p, gender in enumerate(genders) if (masks.candidate_mask(cat_id, gender) >> trait_id) & 1] for trait_id in trait_ids]
+            placed = split_deck(copies, allowed, [len(partitions[gender]) for gender in genders])
+
+            leftover_cards: List[int] = []
+            undealt: List[int] = []
+            for p, gender in enumerate(genders):
+                cards = [trait_id for offset, trait_id in enumerate(trait_ids) for _ in range(placed[offset][p])]
+                rng.shuffle(cards)
+                dealt, missed = deal(cards, partitions[gender], lambda token_idx: self._valid_trait_mask(
+                    category_name, gender, tokens_data[token_idx]['traits'], token_assigned_ids[token_idx]))
+                for token_idx, trait_id in dealt:
+                    self._assign_dealt_trait(token_idx, category_name, trait_id, token_assigned_ids[token_idx])
+                    if holders_index is not None: holders_index.add(token_idx, trait_id)
+                leftover_cards.extend(cards)
+                undealt.extend(missed)
+            for offset, trait_id in enumerate(trait_ids): # Cards split_deck found no room for
+                leftover_cards.extend([trait_id] * (copies[offset] - sum(placed[offset])))
+
+            if undealt:
+                fallbacks, holders_index = self._repair_undealt_tokens(category_name, undealt, leftover_cards, token_assigned_ids, rng, holders_index)
+                repaired_total += len(undealt) - fallbacks
+                fallback_total += fallbacks
+            if self._debug_enabled: self._emit_progress(f"  DEBUG_DEAL: {category_name}: dealt over {len(genders)} gender partition(s) ({', '.join(f'{g}: {len(partitions[g])}' for g in genders)}), {len(undealt)} token(s) needed repair, {len(leftover_cards)} card(s) left.", DEBUG)
+
+        for token_idx in range(len(tokens_data)):
+            self.combination_index.add(token_idx)
+        message = f"Deck allocation complete: {repaired_total} token(s) repaired after dealing"
+        if fallback_total:
+            self._emit_progress(f"{message}; {fallback_total} drawn by weight because no card fitted (their trait counts may leave target).", WARN)
+        else:
+            self._emit_progress(f"{message}.")
+        self._run_swap_repair_phase() # Duplicates and breakable-rule violations only; counts stay exact
+
+    def _assign_dealt_trait(self, token_idx: int, category_name: str, trait_id: int, assigned_ids: List[int]):
+        self._set_token_trait(token_idx, category_name, self.compiled_config.trait_names[trait_id])
+        self.trait_counts.counts[trait_id] += 1
+        assigned_ids.append(trait_id)
+
+    def _repair_undealt_tokens(self, category_name: str, undealt: List[int], leftover_cards: List[int], token_assigned_ids: List[List[int]], rng: random.Random, holders_index: Optional[TraitTokenIndex]) -> Tuple[int, Optional[TraitTokenIndex]]:
+        """
+        Serves tokens the deal skipped: with a leftover card they can take, else by taking a
+        trait from a holder that can take a leftover card instead (both keep counts exact),
+        else by a weighted draw. Returns the number of weighted draws and the holders index
+        (built here when first needed).
+        """
+        config = self.compiled_config
+        masks = self.constraint_masks
+        fallbacks = 0
+        for token_idx in undealt:
+            token_traits = self.tokens_data[token_idx]['traits']
+            token_gender = self.token_states.genders[token_idx]
+            assigned_ids = token_assigned_ids[token_idx]
+            valid_mask = self._valid_trait_mask(category_name, token_gender, token_traits, assigned_ids)
+
+            position = next((pos for pos, trait_id in enumerate(leftover_cards) if (valid_mask >> trait_id) & 1), None)
+            if position is not None:
+                self._assign_dealt_trait(token_idx, category_name, leftover_cards.pop(position), assigned_ids)
+                if holders_index is not None: holders_index.add(token_idx, assigned_ids[-1])
+                continue
+
+            if leftover_cards and not self._category_sets_gender(category_name, token_traits):
+                if holders_index is None:
+                    holders_index = TraitTokenIndex(config, self.tokens_data)
+                if self._exchange_with_holder(token_idx, category_name, valid_mask, leftover_cards, holders_index, token_assigned_ids):
+                    continue
+
+            valid_trait_ids = masks.trait_ids_of(valid_mask)
+            if not valid_trait_ids:
+                self._emit_progress(f"  WARNING_DEAL: No valid traits for Token ID {self.tokens_data[token_idx]['token_id']}, Category '{category_name}'. Gender: '{token_gender}'. Current Traits: {token_traits}. Skipping category.", WARN)
+                continue
+            weights = self._calculate_weights_by_id(valid_trait_ids)
+            trait_id = rng.choices(valid_trait_ids, weights=weights, k=1)[0] if any(w > 0 for w in weights) else rng.choice(valid_trait_ids)
+            self._assign_dealt_trait(token_idx, category_name, trait_id, assigned_ids)
+            if holders_index is not None: holders_index.add(token_idx, trait_id)
+            fallbacks += 1
+        return fallbacks, holders_index
+
+    def _exchange_with_holder(self, token_idx: int, category_name: str, valid_mask: int, leftover_cards: List[int], holders_index: TraitTokenIndex, token_assigned_ids: List[List[int]]) -> bool:
+        """
+        Gives the token a trait it can take from a holder that can take a leftover card instead.
+        The given trait's count is unchanged and the leftover card is used, so counts stay exact.
+        """
+        config = self.compiled_config
+        counts = self.trait_counts.counts
+        for card in dict.fromkeys(leftover_cards): # Each distinct leftover trait once
+            card_name = config.trait_names[card]
+            for trait_id in self.constraint_masks.trait_ids_of(valid_mask):
+                for checked, holder_idx in enumerate(holders_index.tokens_with(trait_id)):
+                    if checked >= EXCHANGE_HOLDER_LIMIT:
+                        break
+                    holder_traits = self.tokens_data[holder_idx]['traits']
+                    hypothetical_traits = holder_traits.copy()
+                    hypothetical_traits[category_name] = card_name
+                    if not self._is_trait_valid_for_token(card_name, category_name, hypothetical_traits, self.token_states.genders[holder_idx]):
+                        continue
+                    self._set_token_trait(holder_idx, category_name, card_name)
+                    counts[trait_id] -= 1
+                    counts[card] += 1
+                    holder_ids = token_assigned_ids[holder_idx]
+                    holder_ids[holder_ids.index(trait_id)] = card
+                    holders_index.move(holder_idx, trait_id, card)
+                    leftover_cards.remove(card)
+                    self._assign_dealt_trait(token_idx, category_name, trait_id, token_assigned_ids[token_idx])
+                    holders_index.add(token_idx, trait_id)
+                    if self._debug_enabled: self._emit_progress(f"  DEBUG_DEAL: Token ID {self.tokens_data[token_idx]['token_id']} took {category_name} '{config.trait_names[trait_id]}' from Token ID {self.tokens_data[holder_idx]['token_id']}, which took leftover '{card_name}'.", DEBUG)
+                    return True
+        return False
+
+    def _resample_duplicate_token(self, token_idx: int, filled_categories: List[str], duplicate_of: int, rng: random.Random, sampler: Optional[MaskedTraitSampler] = None) -> bool:
+        """
+        Called when a freshly filled token has the same traits as an earlier token. Redraws one
+        category that was filled by weighted fill, latest first, picking a valid trait that makes
+        the token unique. Seeded traits and gender-setting categories are left alone.
+        `sampler` is told about the two count changes.
+        """
+        config = self.compiled_config
+        counts = self.trait_counts.counts
+        target_counts = config.target_counts
+        tolerances = config.tolerances
+        strict_ids = {config.trait_id("Rank", "Joker / Wildcard"), config.trait_id("Glyph", "glyph_13")}
+        token_data = self.tokens_data[token_idx]
+        token_traits = token_data['traits']
+        if self._debug_enabled: self._emit_progress(f"  DEBUG_FILL_UNIQUE: Token ID {token_data['token_id']} duplicates Token ID {self.tokens_data[duplicate_of]['token_id']}. Resampling.", DEBUG)
+
+        for category_name in reversed(filled_categories):
+            if self._category_sets_gender(category_name, token_traits):
+                continue
+            current_trait_id = config.trait_id(category_name, token_traits[category_name])
+            other_traits = {cat: trait for cat, trait in token_traits.items() if cat != category_name}
+            token_gender = self.token_states.genders[token_idx] # Gender-setting categories are skipped, so dropping this one keeps it
+            candidate_ids = [t for t in self._get_valid_trait_ids_for_category(category_name, token_gender, other_traits) if t != current_trait_id]
+            # Prefer traits that still have room; fall back to any valid trait except the strictly capped ones
+            # (Joker / Wildcard, glyph_13), which the fill never pushes past their caps.
+            candidate_ids = ([t for t in candidate_ids if counts[t] < target_counts[t] + tolerances[t]]
+                             or [t for t in candidate_ids if t not in strict_ids])
+            while candidate_ids:
+                weights = self._calculate_weights_by_id(candidate_ids)
+                if any(w > 0 for w in weights):
+                    chosen_trait_id = rng.choices(candidate_ids, weights=weights, k=1)[0]
+                else:
+                    chosen_trait_id = rng.choice(candidate_ids)
+                candidate_ids.remove(chosen_trait_id)
+                hypothetical_traits = token_traits.copy()
+                hypothetical_traits[category_name] = config.trait_names[chosen_trait_id]
+                if category_name in self.compiled_rules.breaker_categories and self.compiled_rules.find_violation(hypothetical_traits) is not None:
+                    continue
+                if self.combination_index.find_duplicate(hypothetical_traits) is not None:
+                    continue
+                self._set_token_trait(token_idx, category_name, config.trait_names[chosen_trait_id])
+                counts[current_trait_id] -= 1
+                counts[chosen_trait_id] += 1
+                if sampler is not None:
+                    sampler.refresh(current_trait_id)
+                    sampler.refresh(chosen_trait_id)
+                self._refresh_under_target(current_trait_id)
+                self._refresh_under_target(chosen_trait_id)
+                if self._debug_enabled: self._emit_progress(f"    DEBUG_FILL_UNIQUE: Token ID {token_data['token_id']}: {category_name} {config.trait_names[current_trait_id]} -> {config.trait_names[chosen_trait_id]}", DEBUG)
+                return True
+
+        self._emit_progress(f"  WARNING_FILL: Token ID {token_data['token_id']} duplicates Token ID {self.tokens_data[duplicate_of]['token_id']} and no unique resample was found.", WARN)
+        return False
+
+    def _run_adjustment_phase(self):
+        """
+        Moves tokens from over-assigned traits to under-assigned traits of the same category
+        until every trait count is within its configured tolerance.
+
+        Each iteration handles over-assigned traits from the largest excess down, and for each one
+        tries the under-assigned traits of its category from the largest deficit down. Holders come
+        from a TraitTokenIndex, and over/under traits come from DeviationQueues. Both are updated
+        on every reassignment. When an iteration makes no moves, the working tolerance is relaxed
+        by one, up to the cap.
+        """
         self._emit_progress("Adjustment Phase starting...")
+        config = self.compiled_config
+        trait_names = config.trait_names
+        trait_category = config.trait_category
+        target_counts = config.target_counts
+        tolerances = config.tolerances
+        counts = self.trait_counts.counts
         max_iterations = self.numerology_config.get("adjustment_max_iterations", 1000) 
         current_iteration = 0
-        all_tolerances = [cfg.get('tolerance', 0) for cat_data in self.numerology_config['categories'].values() for cfg in cat_data['traits'].values() if isinstance(cfg, dict)]
-        max_config_tolerance = max(all_tolerances) if all_tolerances else 0
+        max_config_tolerance = max(tolerances) if len(tolerances) else 0
         adjustment_tolerance_cap = max_config_tolerance + 8 # Increased cap slightly
         current_adjustment_tolerance = 0
 
+        holders_index = TraitTokenIndex(config, self.tokens_data)
+        combination_index = self.combination_index
+        token_genders = self.token_states.genders
+        over_queue = DeviationQueue() # Keyed by count - target
+        under_queues = [DeviationQueue() for _ in config.category_names] # Keyed by target - count, only traits with target > 0
+        outside_final_tolerance = set()
+
+        def refresh(trait_id: int):
+            deviation = counts[trait_id] - target_counts[trait_id]
+            over_queue.update(trait_id, deviation)
+            if target_counts[trait_id] > 0:
+                under_queues[trait_category[trait_id]].update(trait_id, -deviation)
+            if -tolerances[trait_id] <= deviation <= tolerances[trait_id]:
+                outside_final_tolerance.discard(trait_id)
+            else:
+                outside_final_tolerance.add(trait_id)
+
+        for trait_id in range(config.trait_total):
+            refresh(trait_id)
+
+        problematic_traits_for_debug = {
+            ("Hair Style", "Straight Center-Part"),
+            ("Outfit", "Fur Coat"),
+            ("Outfit", "Techwear")
+        }
+
         while current_iteration < max_iterations:
-            traits_still_outside_final_tolerance = []
-            for (cat, trait_name), current_count in self.trait_counts.items():
-                trait_config = self.numerology_config['categories'][cat]['traits'][trait_name]
-                target = trait_config['target_count']
-                final_tol = trait_config['tolerance']
-                if not (target - final_tol <= current_count <= target + final_tol):
-                    traits_still_outside_final_tolerance.append({
-                        'category': cat, 'trait': trait_name, 
-                        'current': current_count, 'target': target, 'final_tol': final_tol
-                    })
-
-            if not traits_still_outside_final_tolerance:
+            if not outside_final_tolerance:
                 self._emit_progress(f"Adjustment successful: All traits within final configured tolerances after {current_iteration} iterations.")
                 break
             
-            self._emit_progress(
+            if self._debug_enabled: self._emit_progress(
                 f"Adjustment Iter: {current_iteration + 1}, Current Adj. Tol: {current_adjustment_tolerance}, "
-                f"Traits outside FINAL tol: {len(traits_still_outside_final_tolerance)}"
+                f"Traits outside FINAL tol: {len(outside_final_tolerance)}", DEBUG
             )
 
-            over_assigned_for_current_tol = []
-            under_assigned_for_current_tol = []
-            for (cat, trait_name), current_count in self.trait_counts.items():
-                trait_config = self.numerology_config['categories'][cat]['traits'][trait_name]
-                target = trait_config['target_count']
-                if current_count > target + current_adjustment_tolerance:
-                    over_assigned_for_current_tol.append({'category': cat, 'trait': trait_name, 'current': current_count, 'target': target})
-                elif current_count < target - current_adjustment_tolerance and target > 0 : 
-                    under_assigned_for_current_tol.append({'category': cat, 'trait': trait_name, 'current': current_count, 'target': target})
-
             swaps_made_this_iteration = 0
-            random.shuffle(over_assigned_for_current_tol)
-
-            problematic_traits_for_debug = [
-                ("Hair Style", "Straight Center-Part"),
-                ("Outfit", "Fur Coat"),
-                ("Outfit", "Techwear")
-            ]
-
-            for over_info in over_assigned_for_current_tol:
-                cat_to_adjust = over_info['category']
-                over_trait = over_info['trait']
-                tokens_with_over_trait = [
-                    idx for idx, t_data in enumerate(self.tokens_data)
-                    if t_data['traits'].get(cat_to_adjust) == over_trait
-                ]
-                random.shuffle(tokens_with_over_trait)
-
-                for under_info in sorted(under_assigned_for_current_tol, key=lambda x: (x['target'] - x['current']), reverse=True): 
-                    if under_info['category'] != cat_to_adjust: continue
-                    under_trait = under_info['trait']
-                    if over_trait == under_trait: continue
+            attempted_over_ids = []
+            iteration_rng = self._substream("adjust", current_iteration)
+            while True:
+                # A popped over-assigned trait leaves the queue until refresh() requeues it after one of its
+                # moves, so a trait that keeps moving can be popped again this iteration; one that moves
+                # nothing stays out and is requeued (with any repeats in attempted_over_ids) below.
+                over_entry = over_queue.pop()
+                if over_entry is None: break
+                if over_entry[0] <= current_adjustment_tolerance:
+                    over_queue.update(over_entry[1], over_entry[0])
+                    break
+                over_trait_id = over_entry[1]
+                attempted_over_ids.append(over_trait_id)
+                cat_id = trait_category[over_trait_id]
+                cat_to_adjust = config.category_names[cat_id]
+                over_trait = trait_names[over_trait_id]
+                over_limit = target_counts[over_trait_id] + current_adjustment_tolerance
+
+                tokens_with_over_trait = list(holders_index.tokens_with(over_trait_id))
+                iteration_rng.shuffle(tokens_with_over_trait)
+                under_queue = under_queues[cat_id]
+                under_entries = under_queue.pop_above(current_adjustment_tolerance)
+
+                for _, under_trait_id in under_entries:
+                    if counts[over_trait_id] <= over_limit: break
+                    under_trait = trait_names[under_trait_id]
+                    under_limit = target_counts[under_trait_id] - current_adjustment_tolerance
+                    current_for_adjustment_debug = self._debug_enabled and (
+                        (cat_to_adjust, over_trait) in problematic_traits_for_debug or
+                        (cat_to_adjust, under_trait) in problematic_traits_for_debug)
 
                     for token_idx_to_change in tokens_with_over_trait:
+                        if token_idx_to_change not in holders_index.tokens_with(over_trait_id): continue # Already moved
+                        if combination_index.would_duplicate(token_idx_to_change, cat_to_adjust, under_trait): continue
                         token_data_to_change = self.tokens_data[token_idx_to_change]
-                        original_traits = token_data_to_change['traits'].copy()
-                        token_gender = self._get_token_gender(original_traits)
-                        
+                        token_gender = token_genders[token_idx_to_change]
+
                         # Create hypothetical traits *after* the swap for validation
-                        hypothetical_traits_for_validation = original_traits.copy()
+                        hypothetical_traits_for_validation = token_data_to_change['traits'].copy()
                         hypothetical_traits_for_validation[cat_to_adjust] = under_trait # Test with the new trait
-                        
-                        current_for_adjustment_debug = False
-                        if (cat_to_adjust, over_trait) in problematic_traits_for_debug or \
-                           (cat_to_adjust, under_trait) in problematic_traits_for_debug:
-                            current_for_adjustment_debug = True
 
                         if self._is_trait_valid_for_token(under_trait, cat_to_adjust, hypothetical_traits_for_validation, token_gender, for_adjustment_debug=current_for_adjustment_debug):
-                            token_data_to_change['traits'][cat_to_adjust] = under_trait
-                            self.trait_counts[(cat_to_adjust, over_trait)] -= 1
-                            self.trait_counts[(cat_to_adjust, under_trait)] = self.trait_counts.get((cat_to_adjust, under_trait),0) + 1
-                            if cat_to_adjust == "Glyph":
-                                token_data_to_change['law_number'] = self._parse_glyph_law_number(under_trait)
+                            self._set_token_trait(token_idx_to_change, cat_to_adjust, under_trait)
+                            combination_index.update_trait(token_idx_to_change, cat_to_adjust, over_trait, under_trait)
+                            counts[over_trait_id] -= 1
+                            counts[under_trait_id] += 1
+                            holders_index.move(token_idx_to_change, over_trait_id, under_trait_id)
+                            refresh(over_trait_id)
+                            refresh(under_trait_id)
                             swaps_made_this_iteration += 1
-                            
-                            tokens_with_over_trait.remove(token_idx_to_change) 
 
-                            over_still_needs_fixing = self.trait_counts[(cat_to_adjust, over_trait)] > over_info['target'] + current_adjustment_tolerance
-                            if not over_still_needs_fixing: break 
-                    
-                    if not (self.trait_counts[(cat_to_adjust, over_trait)] > over_info['target'] + current_adjustment_tolerance): break
-            
+                            if counts[over_trait_id] <= over_limit or counts[under_trait_id] >= under_limit: break
+
+                # Put the popped under-assigned traits back with their current deficits.
+                for _, under_trait_id in under_entries:
+                    under_queue.update(under_trait_id, target_counts[under_trait_id] - counts[under_trait_id])
+
+            for over_trait_id in attempted_over_ids:
+                over_queue.update(over_trait_id, counts[over_trait_id] - target_counts[over_trait_id])
+
             current_iteration += 1
             if swaps_made_this_iteration == 0:
                 current_adjustment_tolerance += 1
                 if current_adjustment_tolerance > adjustment_tolerance_cap:
-                    self._emit_progress(f"  Max adjustment tolerance ({adjustment_tolerance_cap}) reached.")
-                    final_check_traits_outside = [
-                        f"{cat}-{tn}: {cc} (target {tc['target_count']} ±{tc['tolerance']})"
-                        for (cat, tn), cc in self.trait_counts.items()
-                        for tc in [self.numerology_config['categories'][cat]['traits'][tn]]
-                        if not (tc['target_count'] - tc['tolerance'] <= cc <= tc['target_count'] + tc['tolerance'])
-                    ]
-                    if final_check_traits_outside:
-                        self._emit_progress(f"CONSTRAINT VIOLATION (post-max-adj-tol): {len(final_check_traits_outside)} traits outside final tolerance.")
-                        for violation in final_check_traits_outside[:10]: self._emit_progress(f"    - {violation}")
+                    self._emit_progress(f"  Max adjustment tolerance ({adjustment_tolerance_cap}) reached.", WARN)
+                    if outside_final_tolerance:
+                        final_check_traits_outside = [
+                            f"{config.category_names[trait_category[trait_id]]}-{trait_names[trait_id]}: {counts[trait_id]} (target {target_counts[trait_id]} ±{tolerances[trait_id]})"
+                            for trait_id in sorted(outside_final_tolerance)
+                        ]
+                        self._emit_progress(f"CONSTRAINT VIOLATION (post-max-adj-tol): {len(final_check_traits_outside)} traits outside final tolerance.", WARN)
+                        for violation in final_check_traits_outside[:10]: self._emit_progress(f"    - {violation}", WARN)
                         self._print_problematic_trait_counts_debug()
                         # raise RuntimeError("Cannot satisfy trait count constraints even after max adjustment tolerance strategy.") # Keep this commented for now to see if it passes with flexible unisex
                         break # Exit loop if max tolerance reached and still violations
@@ -631,104 +1078,243 @@ class Generator:
                         self._emit_progress("All traits within final configured tolerances after exhausting adjustment tolerance strategy.")
                         break 
         
-        if current_iteration >= max_iterations and traits_still_outside_final_tolerance: 
-            self._emit_progress(f"Max iterations ({max_iterations}) reached. {len(traits_still_outside_final_tolerance)} traits still outside final tolerance.")
-            for t_info in traits_still_outside_final_tolerance[:10]: self._emit_progress(f"    - MaxIter Violation: {t_info['category']}:{t_info['trait']} (Count: {t_info['current']}, Target: {t_info['target']} ±{t_info['final_tol']})")
+        if current_iteration >= max_iterations and outside_final_tolerance: 
+            self._emit_progress(f"Max iterations ({max_iterations}) reached. {len(outside_final_tolerance)} traits still outside final tolerance.", WARN)
+            for trait_id in sorted(outside_final_tolerance)[:10]: self._emit_progress(f"    - MaxIter Violation: {config.category_names[trait_category[trait_id]]}:{trait_names[trait_id]} (Count: {counts[trait_id]}, Target: {target_counts[trait_id]} ±{tolerances[trait_id]})", WARN)
             self._print_problematic_trait_counts_debug()
             # raise RuntimeError("Max iterations reached, and constraints not met.") # Keep this commented for now
         elif current_iteration >= max_iterations:
              self._emit_progress(f"Max iterations ({max_iterations}) reached; all traits appear to be within final tolerance.")
 
-        self._emit_progress("Final Validation starting...")
-        self._final_validation_checks() 
-
-        final_tokens_list: List[Token] = []
-        for token_dict_data in self.tokens_data:
-            final_tokens_list.append(
-                Token(
-                    token_id=token_dict_data["token_id"],
-                    traits=token_dict_data["traits"],
-                    law_number=token_dict_data.get("law_number") 
-                )
+    def _run_flow_rebalancing_phase(self):
+        """
+        Alternative to `_run_adjustment_phase`: solves each category's counts as a transportation
+        problem (see CategoryFlowNetwork) in one pass, starting from the filled assignment.
+        A token may move to a trait only if its gender allows it and the trait is compatible
+        with the token's traits in the other categories. Categories are solved one at a time
+        with the others held fixed, so counts that are already fixed stay fixed.
+        """
+        self._emit_progress("Flow Rebalancing Phase starting...")
+        config = self.compiled_config
+        trait_names = config.trait_names
+        target_counts = config.target_counts
+        tolerances = config.tolerances
+        counts = self.trait_counts.counts
+        total_moves = 0
+        unresolved_trait_ids = []
+
+        for cat_id, category_name in enumerate(config.category_names):
+            trait_ids = config.category_trait_ids[cat_id]
+            if not trait_ids or all(config.within_tolerance(t, counts[t]) for t in trait_ids):
+                continue # Nothing to move (e.g. after deck allocation)
+            network = CategoryFlowNetwork(
+                trait_ids,
+                [max(0, target_counts[t] - tolerances[t]) for t in trait_ids],
+                [target_counts[t] + tolerances[t] for t in trait_ids],
             )
-        return final_tokens_list
+            for token_idx, token_data in enumerate(self.tokens_data):
+                trait_id = config.trait_id(category_name, token_data['traits'].get(category_name, ""))
+                if trait_id is None:
+                    continue # Category not assigned on this token (e.g. not applicable by gender)
+                network.add_token(token_idx, trait_id, self._flow_allowed_mask(token_data['traits'], cat_id, category_name, self.token_states.genders[token_idx]))
+
+            moves, unresolved = network.rebalance()
+            for token_idx, from_trait_id, to_trait_id in moves:
+                token_data = self.tokens_data[token_idx]
+                self._set_token_trait(token_idx, category_name, trait_names[to_trait_id])
+                self.combination_index.update_trait(token_idx, category_name, trait_names[from_trait_id], trait_names[to_trait_id])
+                counts[from_trait_id] -= 1
+                counts[to_trait_id] += 1
+                if self._trace_enabled: self._emit_progress(f"    DEBUG_FLOW: Token ID {token_data['token_id']}: {category_name} {trait_names[from_trait_id]} -> {trait_names[to_trait_id]}", TRACE)
+            total_moves += len(moves)
+            unresolved_trait_ids.extend(unresolved)
+            if self._debug_enabled: self._emit_progress(f"  DEBUG_FLOW: Category '{category_name}': {len(moves)} reassignment(s), {len(unresolved)} trait(s) left outside tolerance.", DEBUG)
+
+        # Uniqueness is not a per-category constraint, so any duplicates the moves created are
+        # repaired afterwards with count-neutral swaps.
+        duplicate_token_idxs = self.combination_index.duplicate_tokens()
+        if duplicate_token_idxs:
+            holders_index = TraitTokenIndex(config, self.tokens_data)
+            unrepaired = 0
+            for token_idx in duplicate_token_idxs:
+                if self.combination_index.is_duplicate(token_idx) and not self._repair_token_by_swap(token_idx, list(self.tokens_data[token_idx]['traits']), holders_index):
+                    unrepaired += 1
+            self._emit_progress(f"  Flow rebalancing created {len(duplicate_token_idxs)} duplicate token(s); {len(duplicate_token_idxs) - unrepaired} repaired by swaps.", WARN if unrepaired else INFO)
+
+        if unresolved_trait_ids:
+            self._emit_progress(f"CONSTRAINT VIOLATION (flow rebalancing): {len(unresolved_trait_ids)} traits outside final tolerance; no eligible reassignment path remains.", WARN)
+            for trait_id in unresolved_trait_ids[:10]:
+                self._emit_progress(f"    - {config.category_names[config.trait_category[trait_id]]}-{trait_names[trait_id]}: {counts[trait_id]} (target {target_counts[trait_id]} ±{tolerances[trait_id]})", WARN)
+            self._print_problematic_trait_counts_debug()
+        else:
+            self._emit_progress(f"Flow rebalancing successful: All traits within final configured tolerances after {total_moves} reassignments.")
+
+    def _flow_allowed_mask(self, token_traits: Dict[str, str], cat_id: int, category_name: str, token_gender: Optional[str] = None) -> int:
+        """
+        Bitmask of the traits of `category_name` this token could hold, given its other traits.
+        `token_gender` defaults to the gender of `token_traits`.
+        """
+        config = self.compiled_config
+        masks = self.constraint_masks
+        if token_gender is None:
+            token_gender = self._get_token_gender(token_traits)
+        trait_index = config.trait_index
+        other_ids = [trait_index[cat_val] for cat_val in token_traits.items() if cat_val[0] != category_name and cat_val in trait_index]
+
+        if self._category_sets_gender(category_name, token_traits):
+            # The new trait may change the token's gender, which all other traits must still accept.
+            allowed_mask = 0
+            for trait_id in config.category_trait_ids[cat_id]:
+                hypothetical_traits = token_traits.copy()
+                hypothetical_traits[category_name] = config.trait_names[trait_id]
+                new_gender = self._get_token_gender(hypothetical_traits)
+                if new_gender != token_gender and not self._gender_change_keeps_token_valid(hypothetical_traits, category_name, token_gender, new_gender):
+                    continue
+                if self._is_trait_valid_for_token(config.trait_names[trait_id], category_name, hypothetical_traits, new_gender):
+                    allowed_mask |= 1 << trait_id
+            return allowed_mask
+
+        allowed_mask = masks.candidate_mask(cat_id, token_gender) & ~masks.forbidden_by(other_ids)
+        if category_name in self.compiled_rules.breaker_categories:
+            other_bits = 0
+            for trait_id in other_ids:
+                other_bits |= 1 << trait_id
+            if any(masks.forbidden[trait_id] & other_bits for trait_id in other_ids):
+                # The token relies on a `breakable_by` exemption; check each candidate breaker.
+                for trait_id in masks.iter_bits(allowed_mask):
+                    hypothetical_traits = token_traits.copy()
+                    hypothetical_traits[category_name] = config.trait_names[trait_id]
+                    if self.compiled_rules.find_violation(hypothetical_traits) is not None:
+                        allowed_mask &= ~(1 << trait_id)
+        return allowed_mask
+
+    def _gender_change_keeps_token_valid(self, token_traits: Dict[str, str], changed_category: str, old_gender: str, new_gender: str) -> bool:
+        """True if every other trait, and every category's applicability, still holds under `new_gender`."""
+        config = self.compiled_config
+        for category_name in config.category_names:
+            if category_name == changed_category:
+                continue
+            if category_name not in token_traits:
+                if self._is_category_applicable_by_gender_spec(category_name, new_gender) != self._is_category_applicable_by_gender_spec(category_name, old_gender):
+                    return False
+                continue
+            if not self._is_category_applicable_by_gender_spec(category_name, new_gender):
+                return False
+            trait_id = config.trait_id(category_name, token_traits[category_name])
+            if trait_id is not None and not config.is_trait_gender_allowed(trait_id, new_gender):
+                return False
+        return True
+
+    def _run_swap_repair_phase(self):
+        """
+        Repairs tokens that break an incompatibility rule or duplicate another token by swapping
+        one category value with a partner token. Swaps never change trait counts, so the
+        distribution reached by the adjustment phase is kept.
+        """
+        self._emit_progress("Swap Repair Phase starting...")
+        holders_index = TraitTokenIndex(self.compiled_config, self.tokens_data)
+
+        repaired = 0
+        unresolved = []
+        for token_idx, token_data in enumerate(self.tokens_data):
+            violation = self.compiled_rules.find_violation(token_data['traits'])
+            if violation is not None:
+                categories_to_try = [violation[0], violation[2]]
+            elif self.combination_index.is_duplicate(token_idx):
+                categories_to_try = list(token_data['traits'])
+            else:
+                continue
+            if self._repair_token_by_swap(token_idx, categories_to_try, holders_index):
+                repaired += 1
+            else:
+                unresolved.append(token_data['token_id'])
+
+        if unresolved:
+            self._emit_progress(f"  Swap repair: {repaired} token(s) repaired, {len(unresolved)} without a valid swap partner (Token IDs: {', '.join(unresolved[:10])}).", WARN)
+        else:
+            self._emit_progress(f"Swap repair complete: {repaired} token(s) repaired.")
+
+    def _repair_token_by_swap(self, token_idx: int, categories_to_try: List[str], holders_index: TraitTokenIndex) -> bool:
+        """
+        Finds and executes a swap that leaves the token free of rule violations and unique,
+        without making its partner a duplicate. Partners are drawn from the holders of the
+        traits the token could validly take (its candidate mask minus forbidden partners),
+        so only compatible pairs are examined.
+        """
+        config = self.compiled_config
+        masks = self.constraint_masks
+        combination_index = self.combination_index
+        token_traits = self.tokens_data[token_idx]['traits']
+        token_gender = self.token_states.genders[token_idx]
+        assigned_ids = self._assigned_trait_ids(token_traits)
+
+        for category_name in categories_to_try:
+            cat_id = config.category_index.get(category_name)
+            current_trait_id = config.trait_id(category_name, token_traits.get(category_name, ""))
+            if cat_id is None or current_trait_id is None:
+                continue
+            other_ids = [trait_id for trait_id in assigned_ids if trait_id != current_trait_id]
+            candidate_mask = masks.candidate_mask(cat_id, token_gender) & ~masks.forbidden_by(other_ids)
+            candidate_mask &= ~(1 << current_trait_id)
+            if self._category_sets_gender(category_name, token_traits):
+                candidate_mask = masks.category_masks[cat_id] & ~(1 << current_trait_id) # Gender may change; _can_swap decides
+
+            for candidate_trait_id in masks.iter_bits(candidate_mask):
+                for partner_idx in holders_index.tokens_with(candidate_trait_id):
+                    if not self._can_swap(token_idx, partner_idx, category_name):
+                        continue
+                    # Swap tentatively; the combination index follows, so uniqueness is checked on the result.
+                    self._execute_swap(token_idx, partner_idx, category_name)
+                    if (self.compiled_rules.find_violation(token_traits) is not None or
+                            combination_index.is_duplicate(token_idx) or combination_index.is_duplicate(partner_idx)):
+                        self._execute_swap(token_idx, partner_idx, category_name)
+                        continue
+                    if self._debug_enabled: self._emit_progress(f"  DEBUG_SWAP: Token ID {self.tokens_data[token_idx]['token_id']} <-> {self.tokens_data[partner_idx]['token_id']}: {category_name} {config.trait_names[current_trait_id]} <-> {config.trait_names[candidate_trait_id]}", DEBUG)
+                    holders_index.move(token_idx, current_trait_id, candidate_trait_id)
+                    holders_index.move(partner_idx, candidate_trait_id, current_trait_id)
+                    return True
+        return False
+
+    def _category_sets_gender(self, category_name: str, token_traits: Dict[str, str]) -> bool:
+        """True if changing this category can change the token's gender (see `_get_token_gender`)."""
+        return category_name == "Gender" or (category_name == "Body" and "Gender" not in token_traits)
 
     def _print_problematic_trait_counts_debug(self):
-        self._emit_progress("\n=== DEBUG: Problematic Trait Counts (vs Final Tolerance) ===")
+        self._emit_progress("\n=== DEBUG: Problematic Trait Counts (vs Final Tolerance) ===", WARN)
         found_problems = False
+        config = self.compiled_config
         for (cat, trait_name), current_count in sorted(self.trait_counts.items()):
-            try:
-                trait_config = self.numerology_config['categories'][cat]['traits'][trait_name]
-                target = trait_config['target_count']
-                final_tol = trait_config['tolerance']
-                if not (target - final_tol <= current_count <= target + final_tol):
-                    found_problems = True
-                    self._emit_progress(f"  VIOLATION: {cat}-{trait_name}: {current_count} (Target: {target} ±{final_tol})")
-            except KeyError:
-                self._emit_progress(f"  ERROR_DEBUG: Could not find config for {cat}-{trait_name} during debug print.")
+            trait_id = config.trait_index[(cat, trait_name)]
+            if not config.within_tolerance(trait_id, current_count):
+                found_problems = True
+                self._emit_progress(f"  VIOLATION: {cat}-{trait_name}: {current_count} (Target: {config.target_counts[trait_id]} ±{config.tolerances[trait_id]})", WARN)
         if not found_problems:
             self._emit_progress("  No problematic counts found in this debug check.")
 
-    def _final_validation_checks(self):
-        violations = []
-        for (cat, trait_name), count in self.trait_counts.items():
-            cfg = self.numerology_config['categories'][cat]['traits'][trait_name]
-            if not (cfg['target_count'] - cfg['tolerance'] <= count <= cfg['target_count'] + cfg['tolerance']):
-                violations.append(f"Trait {cat}-{trait_name} count {count} is outside target {cfg['target_count']} +/- {cfg['tolerance']}.")
-        if violations:
-            self._emit_progress(f"Validation Error (Counts): {len(violations)} violations found.")
-            for v in violations[:5]: self._emit_progress(f"  - {v}")
+    def _final_validation_checks(self, matrix: Optional[CodeMatrix] = None):
+        """
+        Validates the finished collection in one pass (see src/validation.py) and keeps the full
+        report in `self.validation_report`. `matrix` is the collection's CodeMatrix if already built. Count violations are warnings; if there are duplicate
+        tokens, rule violations or missing categories, raises ValueError for the first of them.
+        """
+        report = validate_collection(self.compiled_config, self.constraint_masks, self.compiled_rules, self.tokens_data, self.trait_counts.counts, matrix)
+        self.validation_report = report
+        if report.counts:
+            self._emit_progress(f"Validation Error (Counts): {len(report.counts)} violations found.", WARN)
+            for v in report.counts[:5]: self._emit_progress(f"  - Trait {v.category}-{v.trait} count {v.count} is outside target {v.target} +/- {v.tolerance}.", WARN)
             self._print_problematic_trait_counts_debug()
             # raise ValueError("Trait count validation failed.") # Keep commented for now
         else: # Only print if no violations
             self._emit_progress("  ✓ Trait counts within tolerance.")
 
-        temp_token_hashes = set()
-        for i, token_dict_data in enumerate(self.tokens_data):
-            trait_items = sorted(token_dict_data['traits'].items())
-            stable_traits = {k: str(v) if v is not None else "None" for k, v in trait_items}
-            trait_string = json.dumps(stable_traits, sort_keys=True)
-            
-            if trait_string in temp_token_hashes:
-                original_token_id_str = "N/A (could not find original)"
-                for prev_idx in range(i):
-                    prev_trait_items = sorted(self.tokens_data[prev_idx]['traits'].items())
-                    prev_stable_traits = {k: str(v) if v is not None else "None" for k, v in prev_trait_items}
-                    if json.dumps(prev_stable_traits, sort_keys=True) == trait_string:
-                        original_token_id_str = self.tokens_data[prev_idx]['token_id']
-                        break
-                raise ValueError(f"Validation Error (Uniqueness): Duplicate token. Token ID {token_dict_data['token_id']} (idx {i}) is same as {original_token_id_str}. Traits: {token_dict_data['traits']}")
-            temp_token_hashes.add(trait_string)
-        if len(temp_token_hashes) != self.target_collection_size:
-             raise ValueError(f"Validation Error (Uniqueness): Number of unique tokens ({len(temp_token_hashes)}) does not match target ({self.target_collection_size}).")
+        if not report.is_valid:
+            self._emit_progress(f"Validation Errors: {len(report.duplicates)} duplicate token(s), {len(report.incompatibilities)} rule violation(s), {len(report.missing_categories)} missing category assignment(s).", WARN)
+            more = f" ({report.error_count - 1} more error(s) in the validation report)" if report.error_count > 1 else ""
+            raise ValueError(report.first_error() + more)
         self._emit_progress(f"  ✓ All {len(self.tokens_data)} tokens have unique trait combinations.")
-
-        for i, token_dict_data in enumerate(self.tokens_data):
-            assigned_traits = token_dict_data['traits']
-            trait_list = list(assigned_traits.items())
-            for j1_idx in range(len(trait_list)):
-                for j2_idx in range(j1_idx + 1, len(trait_list)):
-                    cat1, val1 = trait_list[j1_idx]
-                    cat2, val2 = trait_list[j2_idx]
-                    if not self._check_compatibility(cat1, val1, cat2, val2):
-                        raise ValueError(f"Validation Error (Incompatibility): Token {token_dict_data.get('token_id', i)} violates rule between {cat1}:{val1} and {cat2}:{val2}.")
         self._emit_progress("  ✓ No incompatibility rules violated.")
-
-        for i, token_dict_data in enumerate(self.tokens_data):
-            token_traits = token_dict_data['traits']
-            token_gender_val = self._get_token_gender(token_traits)
-            
-            for category_name, category_data_cfg in self.numerology_config.get('categories', {}).items():
-                if self._is_category_applicable_by_gender_spec(category_name, token_gender_val):
-                    if category_name not in token_traits:
-                        if not category_data_cfg.get('traits'):
-                            continue 
-                        possible_traits_for_cat = self._get_valid_traits_for_category(category_name, token_gender_val, {}) 
-                        if possible_traits_for_cat: 
-                            raise ValueError(f"Validation Error (Missing Category): Token {token_dict_data.get('token_id', i)} (Gender: {token_gender_val}) is missing assignable category '{category_name}'.")
         self._emit_progress("  ✓ All required and assignable categories appear to be assigned.")
 
-
 if __name__ == '__main__':
     print("Generator module direct execution (for basic testing).")
     dummy_numerology_prd_like = {
@@ -7,7 +7,6 @@ import itertools # For checking incompatibility pairs
 import json
 import csv
 import io
-import hashlib
 from typing import Tuple, Optional # Added for type hinting
 
 # Ensure src directory is in path for imports if running streamlit from project root
@@ -15,8 +14,9 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')
 
 try:
     from src.generator import Generator
-    from src.models import Token # Assuming Token might be useful later
+    from src.models import Token, hash_tokens # Assuming Token might be useful later
     from src.pre_validator import PreValidator
+    from src.quotas import resolve_numerology
 except ImportError as e:
     st.error(f"Failed to import necessary modules. Ensure you are in the project root and src is in PYTHONPATH: {e}")
     st.stop()
@@ -168,12 +168,11 @@ st.sidebar.markdown("---")
 def prepare_json_data(tokens_list):
     # ... (content remains the same)
     output_data = []
-    for token in tokens_list:
-        sorted_traits_str = json.dumps(sorted(token.traits.items()), sort_keys=True)
-        hash_id = hashlib.md5(sorted_traits_str.encode('utf-8')).hexdigest()
+    # Same hash as the CLI export; cached on the tokens, so reruns do not rehash
+    for token, hash_id in zip(tokens_list, hash_tokens(tokens_list)):
         output_data.append({
             "token_id": token.token_id, "hash_id": hash_id, "traits": token.traits,
-            "metadata": {"trait_count": len(token.traits)}
+            "metadata": {"trait_count": token.trait_count}
         })
     return output_data
 
@@ -189,11 +188,10 @@ def prepare_csv_data(tokens_list, numerology_config):
     headers.extend(category_names)
     headers.append("Trait Count") # Keep Trait Count
     output = io.StringIO(); writer = csv.DictWriter(output, fieldnames=headers); writer.writeheader()
-    for token in tokens_list:
-        sorted_traits_str = json.dumps(sorted(token.traits.items()), sort_keys=True)
-        hash_id = hashlib.md5(sorted_traits_str.encode('utf-8')).hexdigest()
-        row = {"Token ID": token.token_id, "Hash ID": hash_id, "Trait Count": len(token.traits)}
-        for cat_name in category_names: row[cat_name] = token.traits.get(cat_name, "")
+    for token, hash_id in zip(tokens_list, hash_tokens(tokens_list)):
+        traits = token.traits
+        row = {"Token ID": token.token_id, "Hash ID": hash_id, "Trait Count": len(traits)}
+        for cat_name in category_names: row[cat_name] = traits.get(cat_name, "")
         writer.writerow(row)
     return output.getvalue()
 
@@ -407,11 +405,10 @@ if st.sidebar.button("Generate NFTs"):
         log_message_to_ui(rules_source_msg)
         if rules_config is None: err_msg = "Rules config is empty/failed to load."; log_message_to_ui(f"ERROR: {err_msg}"); st.error(err_msg); st.stop()
 
+        numerology_config = resolve_numerology(numerology_config, target_count=target_size) # Apply UI target size, scaling trait targets
         st.session_state.numerology_config_loaded = numerology_config # Store the actually used config
         status_text.info(f"Using: {numerology_source_msg} & {rules_source_msg}")
         progress_bar.progress(10)
-        
-        numerology_config['target_count'] = target_size # Apply UI target size
 
         log_message_to_ui("Instantiating generator..."); status_text.info("Instantiating generator...")
         generator_instance = Generator(numerology_config, rules_config, seed=st.session_state.ui_seed, log_callback=log_message_to_ui)
@@ -514,7 +511,7 @@ if 'generated_tokens' in st.session_state and st.session_state.generated_tokens:
                 assigned_traits_list_val = list(token_obj_val.traits.items())
                 for trait_pair in itertools.combinations(assigned_traits_list_val, 2):
                     (cat1, trait1_val) = trait_pair[0]; (cat2, trait2_val) = trait_pair[1]
-                    if not gen_instance_val._check_compatibility(cat1, trait1_val, cat2, trait2_val):
+                    if not gen_instance_val._check_compatibility(cat1, trait1_val, cat2, trait2_val, token_traits=token_obj_val.traits):
                         incompatibility_violations.append({"Token ID": token_obj_val.token_id, "Conflicting Trait 1": f"{cat1}: {trait1_val}", "Conflicting Trait 2": f"{cat2}: {trait2_val}"})
             if incompatibility_violations: st.warning(f"Found {len(incompatibility_violations)} incompatibility violation(s):"); st.dataframe(incompatibility_violations)
             else: st.success("✅ No incompatibility rule violations found.")
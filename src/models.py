@@ -1,56 +1,144 @@
 # src/models.py
 """
-Data models for the NFT Metadata Generator, including the Token dataclass.
+Data models for the NFT Metadata Generator, including the Token class.
 """
 
-from dataclasses import dataclass, field
-from typing import Dict, List, Optional, Any # Added List, Optional, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Any, Sequence, Tuple # Added List, Optional, Any
 import hashlib
 import json
+import os
+
+HASH_BATCH_SIZE = 2048 # Tokens per task of hash_tokens
+
+
+def trait_hash(traits: Dict[str, str]) -> str:
+    """
+    The canonical token hash: SHA-1 of the traits as JSON with sorted keys.
+    Shared by Token.hash_id, the exporter, the CLI and the GUI so every output names a token the same way.
+    """
+    if not traits:
+        return hashlib.sha1("".encode('utf-8')).hexdigest()
+    # Sort traits by category name (key) to ensure consistent order for hashing
+    canonical_string = json.dumps(dict(sorted(traits.items())), sort_keys=True)
+    return hashlib.sha1(canonical_string.encode('utf-8')).hexdigest()
+
 
-@dataclass
 class Token:
     """
     Represents a single NFT token with its ID, traits, and metadata.
+
+    A token either owns its `traits` dict or is a view over one row of a shared TokenStore
+    (see src/token_store.py), as the Generator returns them. A view stores no trait strings:
+    `traits` builds a fresh dict from the store's trait codes on each access, so edits to that
+    dict are not kept; assigning `traits` gives the token its own dict instead.
     """
-    token_id: str  # Example: "001" to "420"
-    traits: Dict[str, str]  # Example: {"CategoryName": "TraitValue", ...}
-
-    # Metadata fields from PRD json_schema.exporter
-    # Defaults are set here. Generator will be responsible for populating them.
-    power_tier: str = "Common"
-    power_score: int = 0
-    law_number: Optional[int] = None # Can be int or null
-    # trait_count is a property now
-    special_abilities: List[str] = field(default_factory=list)
-    set_bonuses: List[str] = field(default_factory=list)
-    # Internal/helper attributes, not directly part of PRD export schema but useful
-    # gender_identity: Optional[str] = None # Could store the determined gender more explicitly
+    __slots__ = ("token_id", "_traits", "_table", "_row", "power_tier", "power_score", "law_number",
+                 "_special_abilities", "_set_bonuses", "_hash_cache")
+
+    def __init__(self, token_id: str, traits: Optional[Dict[str, str]] = None, power_tier: str = "Common",
+                 power_score: int = 0, law_number: Optional[int] = None, special_abilities: Optional[List[str]] = None,
+                 set_bonuses: Optional[List[str]] = None):
+        self.token_id = token_id  # Example: "001" to "420"
+        self._traits = traits if traits is not None else {}  # Example: {"CategoryName": "TraitValue", ...}
+        self._table = None
+        self._row = -1
+        # Metadata fields from PRD json_schema.exporter
+        # Defaults are set here. Generator will be responsible for populating them.
+        self.power_tier = power_tier
+        self.power_score = power_score
+        self.law_number = law_number # Can be int or null
+        self._special_abilities = special_abilities # None until used, so tokens without any carry no list
+        self._set_bonuses = set_bonuses
+        # (traits snapshot, hash) of the last hash_id computation; a snapshot unequal to `traits` means stale.
+        # Table views store None as the snapshot: their row does not change.
+        self._hash_cache: Optional[Tuple[Optional[Dict[str, str]], str]] = None
+
+    @classmethod
+    def from_table(cls, table, row: int) -> "Token":
+        """View of row `row` of a TokenStore (any table with token_ids, law_numbers and row_traits)."""
+        token = cls(table.token_ids[row], law_number=table.law_numbers[row])
+        token._traits = None
+        token._table = table
+        token._row = row
+        return token
+
+    @property
+    def traits(self) -> Dict[str, str]:
+        if self._traits is None:
+            return self._table.row_traits(self._row)
+        return self._traits
+
+    @traits.setter
+    def traits(self, traits: Dict[str, str]):
+        self._traits = traits
+        self._table = None
+        self._hash_cache = None
+
+    @property
+    def special_abilities(self) -> List[str]:
+        if self._special_abilities is None:
+            self._special_abilities = []
+        return self._special_abilities
+
+    @special_abilities.setter
+    def special_abilities(self, abilities: List[str]):
+        self._special_abilities = abilities
+
+    @property
+    def set_bonuses(self) -> List[str]:
+        if self._set_bonuses is None:
+            self._set_bonuses = []
+        return self._set_bonuses
+
+    @set_bonuses.setter
+    def set_bonuses(self, bonuses: List[str]):
+        self._set_bonuses = bonuses
+
+    def _fields(self) -> Tuple[Any, ...]:
+        return (self.token_id, self.traits, self.power_tier, self.power_score, self.law_number,
+                self._special_abilities or [], self._set_bonuses or [])
+
+    def __eq__(self, other: object) -> bool:
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return self._fields() == other._fields()
+
+    __hash__ = None # Mutable, like the dataclass it replaces
+
+    def __repr__(self) -> str:
+        return (f"Token(token_id={self.token_id!r}, traits={self.traits!r}, power_tier={self.power_tier!r}, "
+                f"power_score={self.power_score!r}, law_number={self.law_number!r}, "
+                f"special_abilities={self.special_abilities!r}, set_bonuses={self.set_bonuses!r})")
 
     @property
     def trait_count(self) -> int:
         """Calculates the number of traits assigned to this token."""
-        return len(self.traits)
+        if self._traits is None:
+            return self._table.row_trait_count(self._row)
+        return len(self._traits)
+
+    def _cached_hash(self) -> Optional[str]:
+        """The cached hash_id if it is still current, else None."""
+        cached = self._hash_cache
+        if cached is not None and cached[0] == self._traits:
+            return cached[1]
+        return None
+
+    def _store_hash(self, hash_id: str):
+        self._hash_cache = (None if self._traits is None else dict(self._traits), hash_id)
 
     @property
     def hash_id(self) -> str:
         """
-        Generates a SHA-1 hash of the token's traits.
-        The hash is based on a canonical string representation of the sorted traits.
+        SHA-1 hash of the token's traits (see `trait_hash`), computed once and cached.
+        The cache is keyed on a copy of the traits, so assigning or mutating `traits` invalidates it.
         """
-        if not self.traits:
-            return hashlib.sha1("".encode('utf-8')).hexdigest()
-
-        # Sort traits by category name (key) to ensure consistent order for hashing
-        sorted_trait_items = sorted(self.traits.items())
-
-        # Create a canonical string representation using JSON dump
-        # Using dict(sorted_trait_items) ensures the dictionary itself is ordered before dumping,
-        # and sort_keys=True in json.dumps provides an additional layer of canonical representation
-        # for the structure if traits were more complex (e.g. nested).
-        canonical_string = json.dumps(dict(sorted_trait_items), sort_keys=True)
-
-        return hashlib.sha1(canonical_string.encode('utf-8')).hexdigest()
+        hash_id = self._cached_hash()
+        if hash_id is None:
+            hash_id = trait_hash(self.traits)
+            self._store_hash(hash_id)
+        return hash_id
 
     @property
     def gender(self) -> str:
@@ -85,6 +173,23 @@ class Token:
 
         return "Unknown"
 
+
+def hash_tokens(tokens: Sequence[Token], max_workers: Optional[int] = None) -> List[str]:
+    """
+    Hash IDs of `tokens` in order, filling each token's cache. Tokens whose cache is current are
+    not rehashed; the rest are hashed in batches on a thread pool (hashlib releases the GIL while
+    digesting). `max_workers` defaults to the CPU count; 1 hashes in the calling thread.
+    """
+    stale = [token for token in tokens if token._cached_hash() is None]
+    workers = max_workers or os.cpu_count() or 1
+    if workers > 1 and len(stale) > HASH_BATCH_SIZE:
+        batches = [stale[start:start + HASH_BATCH_SIZE] for start in range(0, len(stale), HASH_BATCH_SIZE)]
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for batch, hash_ids in zip(batches, executor.map(lambda batch: [trait_hash(token.traits) for token in batch], batches)):
+                for token, hash_id in zip(batch, hash_ids):
+                    token._store_hash(hash_id)
+    return [token.hash_id for token in tokens]
+
 if __name__ == '__main__':
     # Example Usage:
     token1_traits = {"Background": "Alleyway", "Body": "Human Male", "Eyes": "Blue"}
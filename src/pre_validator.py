@@ -3,11 +3,21 @@
 New Pre-Validation Module based on PRD v2.3 (prdv2.md)
 """
 import yaml
+import sys
+import os
 from typing import List, Dict, Any, Tuple, Optional
 from collections import Counter
 
+try:
+    from src.compiled_config import CompiledConfig, parse_glyph_law_number, glyph_tier
+    from src.quotas import resolve_numerology, SHARE_KEYS
+except ImportError:
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+    from src.compiled_config import CompiledConfig, parse_glyph_law_number, glyph_tier
+    from src.quotas import resolve_numerology, SHARE_KEYS
+
 # Constants derived from prdv2.md or commonly used
-COLLECTION_SIZE = 420
+COLLECTION_SIZE = 420 # Size the glyph tier counts below are defined for; other sizes scale them
 
 # Glyph Tiers and Law Ranges from prdv2.md power_system.glyph_tiers
 GLYPH_TIER_DEFINITIONS = {
@@ -49,6 +59,9 @@ class PreValidator:
         
         self._all_defined_traits: Dict[Tuple[str, str], Dict[str, Any]] = {} 
         self._parsed_glyph_details: Dict[str, Dict[str, Any]] = {}
+        self.resolved_config: Optional[Dict[str, Any]] = None # Numerology with percent/ratio targets resolved to counts
+        self.compiled_config: Optional[CompiledConfig] = None # Built once the basic structure is known to be valid
+        self.collection_size: int = COLLECTION_SIZE
 
 
     def _log_error(self, message: str):
@@ -56,35 +69,22 @@ class PreValidator:
 
     def _parse_glyph_name(self, glyph_name: str) -> Optional[int]:
         """Extracts law number from glyph_name, returns None if not parsable or 'blank'."""
-        if glyph_name.lower() == "blank":
-            return None 
-        if glyph_name.startswith("glyph_") and len(glyph_name) > 6 and glyph_name[6:].isdigit():
-            return int(glyph_name[6:])
-        return None 
+        return parse_glyph_law_number(glyph_name)
 
     def _get_glyph_tier_by_law(self, law_number: Optional[int]) -> Optional[str]:
         """Determines glyph tier based on law number."""
-        if law_number is None:
-            return "Blank" 
-        if GLYPH_TIER_DEFINITIONS["Sovereign"]["laws"][0] <= law_number <= GLYPH_TIER_DEFINITIONS["Sovereign"]["laws"][1]:
-            return "Sovereign"
-        if GLYPH_TIER_DEFINITIONS["Capo"]["laws"][0] <= law_number <= GLYPH_TIER_DEFINITIONS["Capo"]["laws"][1]:
-            return "Capo"
-        if GLYPH_TIER_DEFINITIONS["Soldier"]["laws"][0] <= law_number <= GLYPH_TIER_DEFINITIONS["Soldier"]["laws"][1]:
-            return "Soldier"
-        if STREET_TIER_LAW_MIN <= law_number <= STREET_TIER_LAW_MAX:
-            return "Street"
-        return None
+        return glyph_tier(law_number)
 
     def _validate_numerology_structure_and_basic_values(self):
         if not isinstance(self.numerology_config, dict):
             self._log_error("Numerology: numerology.yaml content is not a valid dictionary.")
             return
 
-        if self.numerology_config.get('target_count') != COLLECTION_SIZE:
+        root_target_count = self.numerology_config.get('target_count')
+        if not isinstance(root_target_count, int) or isinstance(root_target_count, bool) or root_target_count <= 0:
             self._log_error(
-                f"Numerology: Root 'target_count' must be {COLLECTION_SIZE}, "
-                f"found {self.numerology_config.get('target_count')}.")
+                f"Numerology: Root 'target_count' must be a positive integer, "
+                f"found {root_target_count}.")
 
         categories = self.numerology_config.get('categories')
         if not isinstance(categories, dict):
@@ -106,12 +106,21 @@ class PreValidator:
                     self._log_error(f"Numerology: Trait '{trait_name}' in Category '{cat_name}' is not a dictionary.")
                     continue
 
-                if 'tolerance' not in trait_data:
+                if 'tolerance_percent' in trait_data:
+                    if not self._is_non_negative_number(trait_data['tolerance_percent']):
+                        self._log_error(f"Numerology (tolerance_field_missing_or_non_int): Trait '{trait_name}' in Category '{cat_name}' has 'tolerance_percent' that is not a non-negative number.")
+                elif 'tolerance' not in trait_data:
                     self._log_error(f"Numerology (tolerance_field_missing_or_non_int): Trait '{trait_name}' in Category '{cat_name}' is missing 'tolerance' field.")
                 elif not isinstance(trait_data['tolerance'], int):
                     self._log_error(f"Numerology (tolerance_field_missing_or_non_int): Trait '{trait_name}' in Category '{cat_name}' has 'tolerance' that is not an integer.")
 
-                if 'target_count' not in trait_data:
+                share_keys = [key for key in SHARE_KEYS if key in trait_data]
+                if share_keys:
+                    if len(share_keys) > 1 or 'target_count' in trait_data:
+                        self._log_error(f"Numerology: Trait '{trait_name}' in Category '{cat_name}' must set only one of 'target_count', {', '.join(repr(key) for key in SHARE_KEYS)}.")
+                    elif not self._is_non_negative_number(trait_data[share_keys[0]]):
+                        self._log_error(f"Numerology: Trait '{trait_name}' in Category '{cat_name}' has '{share_keys[0]}' that is not a non-negative number.")
+                elif 'target_count' not in trait_data:
                      self._log_error(f"Numerology: Trait '{trait_name}' in Category '{cat_name}' is missing 'target_count' field.")
                 elif not isinstance(trait_data['target_count'], int):
                      self._log_error(f"Numerology: Trait '{trait_name}' in Category '{cat_name}' has 'target_count' that is not an integer.")
@@ -132,30 +141,44 @@ class PreValidator:
                         'trait_data': trait_data
                     }
 
+    @staticmethod
+    def _is_non_negative_number(value: Any) -> bool:
+        return isinstance(value, (int, float)) and not isinstance(value, bool) and value >= 0
+
+    def _scaled_count_range(self, base_count: int) -> Tuple[int, int]:
+        """Floor and ceiling of a count defined for COLLECTION_SIZE, scaled to this collection's size."""
+        scaled = base_count * self.collection_size
+        return scaled // COLLECTION_SIZE, -(-scaled // COLLECTION_SIZE)
+
+    @staticmethod
+    def _format_range(count_range: Tuple[int, int]) -> str:
+        low, high = count_range
+        return str(low) if low == high else f"{low}-{high}"
+
+    def _expected_tier_range(self, tier: str) -> Tuple[int, int]:
+        """
+        Allowed sum of a tier's target_counts. Each glyph's count is apportioned independently,
+        so the tier sum lies between the sum of the per-glyph floors and the sum of the ceilings.
+        """
+        definition = GLYPH_TIER_DEFINITIONS[tier]
+        if tier == "Street":
+            glyph_counts = [10] * STREET_TIER_GLYPHS_AT_COUNT_10 + [11] * STREET_TIER_GLYPHS_AT_COUNT_11
+        elif tier == "Blank":
+            glyph_counts = [definition["count_per_glyph"]]
+        else:
+            glyph_counts = [definition["count_per_glyph"]] * (definition["laws"][1] - definition["laws"][0] + 1)
+        ranges = [self._scaled_count_range(count) for count in glyph_counts]
+        return sum(low for low, _ in ranges), sum(high for _, high in ranges)
+
     def _check_numerology_invariant_category_sums(self):
-        categories = self.numerology_config.get('categories', {})
-        for cat_name, cat_data in categories.items():
-            if not isinstance(cat_data, dict) or not isinstance(cat_data.get('traits'), dict):
-                continue 
-            
-            current_category_sum = 0
-            valid_category = True
-            for trait_name, trait_data in cat_data['traits'].items():
-                if isinstance(trait_data, dict) and isinstance(trait_data.get('target_count'), int):
-                    current_category_sum += trait_data['target_count']
-                else:
-                    # Error already logged by _validate_numerology_structure_and_basic_values
-                    valid_category = False
-                    break 
-            
-            if not valid_category:
-                self._log_error(f"Numerology Invariant (category_sum_mismatch): Cannot calculate sum for category '{cat_name}' due to invalid/missing trait target_counts.")
-                continue
+        config = self.compiled_config
+        for cat_id, cat_name in enumerate(config.category_names):
+            current_category_sum = sum(config.target_counts[trait_id] for trait_id in config.category_trait_ids[cat_id])
 
-            if current_category_sum != COLLECTION_SIZE:
+            if current_category_sum != self.collection_size:
                 self._log_error(
                     f"Numerology Invariant (category_sum_mismatch): Category '{cat_name}' sum of trait target_counts is {current_category_sum}, "
-                    f"but must be {COLLECTION_SIZE}.")
+                    f"but must be {self.collection_size}.")
 
     def _check_glyph_distribution(self):
         if "Glyph" not in self.numerology_config.get('categories', {}):
@@ -175,19 +198,12 @@ class PreValidator:
                 continue
             actual_tier_counts[tier] += target_count
         
-        expected_distribution = {
-            "Sovereign": GLYPH_TIER_DEFINITIONS["Sovereign"]["total_tier_count"],
-            "Capo": GLYPH_TIER_DEFINITIONS["Capo"]["total_tier_count"],
-            "Soldier": GLYPH_TIER_DEFINITIONS["Soldier"]["total_tier_count"],
-            "Street": GLYPH_TIER_DEFINITIONS["Street"]["total_tier_count"],
-            "Blank": GLYPH_TIER_DEFINITIONS["Blank"]["total_tier_count"]
-        }
-
-        for tier_name, expected_total_count in expected_distribution.items():
-            if actual_tier_counts.get(tier_name, 0) != expected_total_count:
+        for tier_name in ("Sovereign", "Capo", "Soldier", "Street", "Blank"):
+            low, high = self._expected_tier_range(tier_name)
+            if not low <= actual_tier_counts.get(tier_name, 0) <= high:
                 self._log_error(
                     f"Numerology Invariant (glyph_distribution): Tier '{tier_name}' sum of target_counts is "
-                    f"{actual_tier_counts.get(tier_name, 0)}, expected {expected_total_count}.")
+                    f"{actual_tier_counts.get(tier_name, 0)}, expected {self._format_range((low, high))}.")
 
         for glyph_name, details in self._parsed_glyph_details.items():
             tier = details.get('tier')
@@ -195,16 +211,17 @@ class PreValidator:
             if not isinstance(target_count, int): continue # Already caught
 
             if tier in ["Sovereign", "Capo", "Soldier"]:
-                expected_glyph_tc = GLYPH_TIER_DEFINITIONS[tier]["count_per_glyph"]
-                if target_count != expected_glyph_tc:
+                low, high = self._scaled_count_range(GLYPH_TIER_DEFINITIONS[tier]["count_per_glyph"])
+                if not low <= target_count <= high:
                     self._log_error(
                         f"Numerology Invariant (glyph_distribution): Glyph '{glyph_name}' (Tier: {tier}) "
-                        f"has target_count {target_count}, expected {expected_glyph_tc}.")
+                        f"has target_count {target_count}, expected {self._format_range((low, high))}.")
             elif tier == "Blank" and glyph_name == "blank":
-                 if target_count != GLYPH_TIER_DEFINITIONS["Blank"]["count_per_glyph"]:
+                 low, high = self._scaled_count_range(GLYPH_TIER_DEFINITIONS["Blank"]["count_per_glyph"])
+                 if not low <= target_count <= high:
                      self._log_error(
                         f"Numerology Invariant (glyph_distribution): Glyph 'blank' "
-                        f"has target_count {target_count}, expected {GLYPH_TIER_DEFINITIONS['Blank']['count_per_glyph']}.")
+                        f"has target_count {target_count}, expected {self._format_range((low, high))}.")
 
 
     def _check_street_tier_split(self):
@@ -214,21 +231,26 @@ class PreValidator:
         street_glyphs_tc10 = 0
         street_glyphs_tc11 = 0
         other_street_counts = []
+        range_10, range_11 = self._scaled_count_range(10), self._scaled_count_range(11)
 
-        num_street_glyphs_defined = 0
+        street_glyphs = []
         for glyph_name, details in self._parsed_glyph_details.items():
             if details.get('tier') == "Street":
-                num_street_glyphs_defined +=1
                 target_count = details.get('target_count')
                 if not isinstance(target_count, int):
                     self._log_error(f"Numerology Invariant (street_tier_split_incorrect): Invalid target_count for Street glyph '{glyph_name}'.")
                     return 
-                if target_count == 10:
-                    street_glyphs_tc10 += 1
-                elif target_count == 11:
-                    street_glyphs_tc11 += 1
-                else:
-                    other_street_counts.append(f"'{glyph_name}' (count: {target_count})")
+                street_glyphs.append((target_count, glyph_name))
+        num_street_glyphs_defined = len(street_glyphs)
+
+        # In small collections the two scaled ranges can overlap; lower counts fill the "10" group first.
+        for target_count, glyph_name in sorted(street_glyphs):
+            if range_10[0] <= target_count <= range_10[1] and street_glyphs_tc10 < STREET_TIER_GLYPHS_AT_COUNT_10:
+                street_glyphs_tc10 += 1
+            elif range_11[0] <= target_count <= range_11[1]:
+                street_glyphs_tc11 += 1
+            else:
+                other_street_counts.append(f"'{glyph_name}' (count: {target_count})")
         
         expected_total_street_glyphs = STREET_TIER_LAW_MAX - STREET_TIER_LAW_MIN + 1
         if num_street_glyphs_defined != expected_total_street_glyphs:
@@ -240,14 +262,15 @@ class PreValidator:
         if street_glyphs_tc10 != STREET_TIER_GLYPHS_AT_COUNT_10:
             self._log_error(
                 f"Numerology Invariant (street_tier_split_incorrect): Found {street_glyphs_tc10} Street glyphs "
-                f"with target_count 10, expected {STREET_TIER_GLYPHS_AT_COUNT_10}.")
+                f"with target_count {self._format_range(range_10)}, expected {STREET_TIER_GLYPHS_AT_COUNT_10}.")
         if street_glyphs_tc11 != STREET_TIER_GLYPHS_AT_COUNT_11:
             self._log_error(
                 f"Numerology Invariant (street_tier_split_incorrect): Found {street_glyphs_tc11} Street glyphs "
-                f"with target_count 11, expected {STREET_TIER_GLYPHS_AT_COUNT_11}.")
+                f"with target_count {self._format_range(range_11)}, expected {STREET_TIER_GLYPHS_AT_COUNT_11}.")
         if other_street_counts:
             self._log_error(
-                f"Numerology Invariant (street_tier_split_incorrect): Street glyphs found with counts other than 10 or 11: {', '.join(other_street_counts)}.")
+                f"Numerology Invariant (street_tier_split_incorrect): Street glyphs found with counts other than "
+                f"{self._format_range(range_10)} or {self._format_range(range_11)}: {', '.join(other_street_counts)}.")
 
     def _validate_rules_structure_and_references(self):
         if not isinstance(self.rules_config, dict):
@@ -305,40 +328,32 @@ class PreValidator:
             self._log_error("Gender Overflow: 'Gender' category has no traits.")
             return
 
+        config = self.compiled_config
         gender_supply_min = {}
-        for g_name, g_data in gcats.items():
-            if not (isinstance(g_data, dict) and isinstance(g_data.get('target_count'), int) and isinstance(g_data.get('tolerance'), int)):
-                self._log_error(f"Gender Overflow: Invalid config for Gender trait '{g_name}'.")
-                continue
-            gender_supply_min[g_name] = max(0, g_data['target_count'] - g_data['tolerance'])
+        for trait_id in config.traits_of("Gender"):
+            g_name = config.trait_names[trait_id]
+            gender_supply_min[g_name] = max(0, config.target_counts[trait_id] - config.tolerances[trait_id])
 
-        for cat_name, cat_data in self.numerology_config.get('categories', {}).items():
-            if cat_name == "Gender" or not isinstance(cat_data, dict): continue
+        for cat_id, cat_name in enumerate(config.category_names):
+            if cat_name == "Gender": continue
 
             cat_gender_demand = Counter()
-            cat_gender_specific_to = cat_data.get('gender_specific_to')
+            cat_gender_specific_to = config.category_gender_spec[cat_id]
+            cat_trait_ids = config.category_trait_ids[cat_id]
 
             # --- TEMPORARY ADJUSTMENT for Gender Overflow ---
             # Check if the category is "fully unisex" (no category-level gender spec, and no trait-level gender specs within it)
-            is_fully_unisex_category = not cat_gender_specific_to
-            if is_fully_unisex_category:
-                for _, trait_data_check in cat_data.get('traits', {}).items():
-                    if isinstance(trait_data_check, dict) and 'gender' in trait_data_check:
-                        is_fully_unisex_category = False # Found a trait with specific gender, so not "fully unisex"
-                        break
+            is_fully_unisex_category = not cat_gender_specific_to and \
+                all(config.trait_gender_name(trait_id) is None for trait_id in cat_trait_ids)
             
             if is_fully_unisex_category:
-                # print(f"Skipping gender overflow check for fully unisex category: {cat_name}") # Optional debug
                 continue # Skip gender overflow check for this category
             # --- END TEMPORARY ADJUSTMENT ---
 
-            for trait_name, trait_data in cat_data.get('traits', {}).items():
-                if not (isinstance(trait_data, dict) and isinstance(trait_data.get('target_count'), int) and isinstance(trait_data.get('tolerance'), int)):
-                    continue
-                
-                min_demand = max(0, trait_data['target_count'] - trait_data['tolerance'])
+            for trait_id in cat_trait_ids:
+                min_demand = max(0, config.target_counts[trait_id] - config.tolerances[trait_id])
                 applies_to_genders = set()
-                trait_level_gender = trait_data.get('gender')
+                trait_level_gender = config.trait_gender_name(trait_id)
 
                 if cat_gender_specific_to == "Gender": # Category's traits are linked to the main Gender category
                     if trait_level_gender:
@@ -375,11 +390,20 @@ class PreValidator:
         self.errors = [] 
         self._all_defined_traits = {}
         self._parsed_glyph_details = {}
+        self.resolved_config = None
+        self.compiled_config = None
+        self.collection_size = COLLECTION_SIZE
 
         self._validate_numerology_structure_and_basic_values()
         
         # Only proceed with deeper checks if basic structure and parsing were okay
         if not self.errors: # Or a threshold of errors
+            self.resolved_config = resolve_numerology(self.numerology_config)
+            self.collection_size = self.resolved_config['target_count']
+            resolved_glyphs = self.resolved_config['categories'].get("Glyph", {}).get('traits', {})
+            for glyph_name, details in self._parsed_glyph_details.items():
+                details['target_count'] = resolved_glyphs[glyph_name].get('target_count')
+            self.compiled_config = CompiledConfig(self.resolved_config)
             self._check_numerology_invariant_category_sums()
             if "Glyph" in self.numerology_config.get('categories', {}): # Only if Glyph category exists
                 self._check_glyph_distribution() 
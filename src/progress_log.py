@@ -0,0 +1,27 @@
+# src/progress_log.py
+"""
+Log levels for the generator's progress output.
+
+Levels are plain integers so that hot loops can test a precomputed boolean
+(e.g. `if self._trace_enabled:`) before building any message; a disabled
+message then costs a single attribute check and no string formatting.
+"""
+
+from typing import Union
+
+TRACE = 5   # Per-trait / per-category decisions inside the fill and adjustment loops
+DEBUG = 10  # Per-token assignments and adjustment iterations
+INFO = 20   # Phase starts, progress and validation results
+WARN = 30   # Problems that do not stop generation
+
+LOG_LEVEL_NAMES = {"TRACE": TRACE, "DEBUG": DEBUG, "INFO": INFO, "WARN": WARN}
+DEFAULT_LOG_LEVEL = INFO
+
+
+def parse_log_level(level: Union[int, str]) -> int:
+    """Accepts a level number or name ("trace", "DEBUG", ...) and returns the level number."""
+    if isinstance(level, int) and not isinstance(level, bool):
+        return level
+    if isinstance(level, str) and level.upper() in LOG_LEVEL_NAMES:
+        return LOG_LEVEL_NAMES[level.upper()]
+    raise ValueError(f"Unknown log level: {level!r}. Expected one of {', '.join(LOG_LEVEL_NAMES)}.")
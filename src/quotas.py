@@ -0,0 +1,151 @@
+# src/quotas.py
+"""
+Resolves numerology trait targets for any collection size.
+
+A trait's target may be given as
+    target_count:   an absolute number of tokens (as before),
+    target_percent: a share of the collection in percent, or
+    target_ratio:   a share of the collection as a fraction,
+and its tolerance as `tolerance` (absolute) or `tolerance_percent` (percent of the
+trait's own resolved target, rounded up).
+
+Within a category, absolute counts are reserved first. The remaining tokens are
+split between the share-based traits with the largest remainder (Hamilton)
+method, so every category sums to exactly the collection size. The split is made
+per gender group first (traits sharing a `gender` tag), then within each group,
+so categories whose gender groups match in the source (e.g. 60 Unisex hair
+styles for 60 Unisex tokens) still match after resolution.
+
+`resolve_numerology(config, target_count=N)` also rescales a numerology written
+with absolute counts for another size (e.g. the 420-token design to 42,000):
+all counts of each category are apportioned to N, and tolerances scale with them
+(rounded up).
+"""
+
+import copy
+import math
+from typing import List, Dict, Any, Optional
+
+SHARE_KEYS = ("target_percent", "target_ratio")
+
+
+def apportion_largest_remainder(weights: List[float], total: int) -> List[int]:
+    """
+    Splits `total` into integers proportional to `weights` (largest remainder method).
+    Every result is the floor or ceiling of its exact quota, and the results sum to `total`.
+    Ties in the remainder go to the earlier weight. Returns zeros if the weights sum to zero.
+    """
+    if total < 0:
+        raise ValueError(f"Cannot apportion a negative total ({total}).")
+    weight_sum = sum(weights)
+    if weight_sum <= 0:
+        return [0] * len(weights)
+    quotas = [total * weight / weight_sum for weight in weights]
+    counts = [int(quota) for quota in quotas]
+    remaining = total - sum(counts)
+    by_remainder = sorted(range(len(weights)), key=lambda i: (-(quotas[i] - counts[i]), i))
+    for i in by_remainder[:remaining]:
+        counts[i] += 1
+    return counts
+
+
+def apportion_grouped(weights: List[float], groups: List[Any], total: int) -> List[int]:
+    """
+    Largest remainder apportionment in two levels: `total` is split between the groups by
+    their summed weights, then each group's count between its members.
+    """
+    group_order: List[Any] = []
+    members: Dict[Any, List[int]] = {}
+    for i, group in enumerate(groups):
+        if group not in members:
+            group_order.append(group)
+            members[group] = []
+        members[group].append(i)
+    group_totals = apportion_largest_remainder([sum(weights[i] for i in members[group]) for group in group_order], total)
+    counts = [0] * len(weights)
+    for group, group_total in zip(group_order, group_totals):
+        for i, count in zip(members[group], apportion_largest_remainder([weights[i] for i in members[group]], group_total)):
+            counts[i] = count
+    return counts
+
+
+def trait_share(trait_data: Dict[str, Any]) -> Optional[float]:
+    """The trait's share of the collection as a fraction, or None if it has an absolute target."""
+    if 'target_percent' in trait_data:
+        return trait_data['target_percent'] / 100.0
+    if 'target_ratio' in trait_data:
+        return float(trait_data['target_ratio'])
+    return None
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _needs_resolution(numerology_config: Dict[str, Any]) -> bool:
+    for cat_data in (numerology_config.get('categories') or {}).values():
+        if not isinstance(cat_data, dict) or not isinstance(cat_data.get('traits'), dict):
+            continue
+        for trait_data in cat_data['traits'].values():
+            if isinstance(trait_data, dict) and ('tolerance_percent' in trait_data or any(key in trait_data for key in SHARE_KEYS)):
+                return True
+    return False
+
+
+def resolve_numerology(numerology_config: Dict[str, Any], target_count: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Returns a numerology config in which every trait has an integer `target_count` and `tolerance`.
+    If `target_count` is given and differs from the config's own, absolute counts are rescaled to it.
+    A config with nothing to resolve is returned as is; otherwise the input is not modified.
+    Malformed entries are left untouched for PreValidator to report.
+    """
+    if not isinstance(numerology_config, dict):
+        return numerology_config
+    source_size = numerology_config.get('target_count')
+    size = source_size if target_count is None else target_count
+    rescale = (target_count is not None and isinstance(source_size, int) and source_size > 0
+               and target_count != source_size)
+    if not rescale and target_count is None and not _needs_resolution(numerology_config):
+        return numerology_config
+    if not isinstance(size, int) or isinstance(size, bool) or size < 0:
+        return numerology_config
+
+    resolved = copy.deepcopy(numerology_config)
+    resolved['target_count'] = size
+    categories = resolved.get('categories')
+    if not isinstance(categories, dict):
+        return resolved
+
+    for cat_data in categories.values():
+        traits = cat_data.get('traits') if isinstance(cat_data, dict) else None
+        if not isinstance(traits, dict):
+            continue
+        share_names: List[str] = []
+        share_weights: List[float] = []
+        share_groups: List[Any] = []
+        fixed_total = 0
+        for trait_name, trait_data in traits.items():
+            if not isinstance(trait_data, dict):
+                continue
+            share = trait_share(trait_data) if all(_is_number(trait_data.get(key, 0)) for key in SHARE_KEYS) else None
+            count = trait_data.get('target_count')
+            if share is None and rescale and isinstance(count, int):
+                share = count / source_size
+                tolerance = trait_data.get('tolerance')
+                if isinstance(tolerance, int) and 'tolerance_percent' not in trait_data:
+                    # Rounded up, so a category's summed slack never drops below a matching Gender tolerance.
+                    trait_data['tolerance'] = -(-tolerance * size // source_size)
+            if share is not None:
+                share_names.append(trait_name)
+                share_weights.append(max(share, 0.0))
+                share_groups.append(trait_data.get('gender'))
+            elif isinstance(count, int):
+                fixed_total += count
+
+        for trait_name, count in zip(share_names, apportion_grouped(share_weights, share_groups, max(size - fixed_total, 0))):
+            traits[trait_name]['target_count'] = count
+
+        for trait_data in traits.values():
+            if isinstance(trait_data, dict) and _is_number(trait_data.get('tolerance_percent')) and isinstance(trait_data.get('target_count'), int):
+                trait_data['tolerance'] = math.ceil(trait_data['target_count'] * trait_data['tolerance_percent'] / 100.0)
+    return resolved
@@ -0,0 +1,243 @@
+# src/rules_compiler.py
+"""
+Compiles the incompatibility rules from rules.yaml into a symmetric lookup index.
+
+The generator asks "are these two traits compatible?" many times per token, so
+the rule list is turned into a dictionary keyed by trait pair once, up front.
+"""
+
+from typing import List, Dict, Any, Tuple, Optional, FrozenSet
+
+TraitRef = Tuple[str, str]  # (CategoryName, TraitName)
+
+
+class CompiledIncompatibility:
+    """
+    All rules.yaml entries that make one pair of traits incompatible, merged into one record.
+
+    A pair is allowed on a token only if every merged rule is broken, i.e. no rule is
+    unbreakable and every `breakable_by` trait is present on the token.
+    """
+    __slots__ = ("trait_a", "trait_b", "unbreakable", "breakers", "rule_indices", "descriptions")
+
+    def __init__(self, trait_a: TraitRef, trait_b: TraitRef):
+        self.trait_a = trait_a
+        self.trait_b = trait_b
+        self.unbreakable = False
+        self.breakers: FrozenSet[TraitRef] = frozenset()
+        self.rule_indices: Tuple[int, ...] = ()
+        self.descriptions: Tuple[str, ...] = ()
+
+    def _merge_rule(self, rule_idx: int, breaker: Optional[TraitRef], description: str):
+        if breaker is None:
+            self.unbreakable = True
+        else:
+            self.breakers = self.breakers | {breaker}
+        self.rule_indices = self.rule_indices + (rule_idx,)
+        self.descriptions = self.descriptions + (description,)
+
+    def is_broken_by(self, token_traits: Optional[Dict[str, str]]) -> bool:
+        """True if the token's traits lift this incompatibility (via `breakable_by`)."""
+        if self.unbreakable or not token_traits:
+            return False
+        for breaker_cat, breaker_trait in self.breakers:
+            if token_traits.get(breaker_cat) != breaker_trait:
+                return False
+        return True
+
+
+class CompiledRules:
+    """
+    Symmetric, deduplicated index of the incompatibility rules.
+
+    Each unordered trait pair is stored once and registered under both orderings,
+    so a compatibility query is a single dictionary lookup regardless of rule count.
+    """
+
+    def __init__(self, rules_config: Optional[Dict[str, Any]]):
+        self._pairs: Dict[Tuple[TraitRef, TraitRef], CompiledIncompatibility] = {}
+        self._partners: Dict[TraitRef, Dict[TraitRef, CompiledIncompatibility]] = {}
+        self.source_rule_count = 0
+
+        incompatibilities = (rules_config or {}).get('incompatibilities') or []
+        if isinstance(incompatibilities, list):
+            self._compile(incompatibilities)
+
+        self.breaker_categories: FrozenSet[str] = frozenset(
+            breaker_cat for entry in self.unique_pairs() for breaker_cat, _ in entry.breakers
+        )
+
+    @staticmethod
+    def _as_trait_ref(ref: Any) -> Optional[TraitRef]:
+        if isinstance(ref, (list, tuple)) and len(ref) == 2 and isinstance(ref[0], str) and isinstance(ref[1], str):
+            return (ref[0], ref[1])
+        return None
+
+    def _compile(self, incompatibilities: List[Any]):
+        # Malformed entries are skipped here; PreValidator is responsible for reporting them.
+        for rule_idx, rule in enumerate(incompatibilities):
+            if not isinstance(rule, dict):
+                continue
+            trait_a = self._as_trait_ref(rule.get('trait_a'))
+            trait_b = self._as_trait_ref(rule.get('trait_b'))
+            if trait_a is None or trait_b is None or trait_a == trait_b:
+                continue
+            self.source_rule_count += 1
+
+            breaker = None
+            if 'breakable_by' in rule:
+                breaker = self._as_trait_ref(rule['breakable_by'])
+
+            entry = self._pairs.get((trait_a, trait_b))
+            if entry is None:
+                entry = CompiledIncompatibility(trait_a, trait_b)
+                self._pairs[(trait_a, trait_b)] = entry
+                self._pairs[(trait_b, trait_a)] = entry
+                self._partners.setdefault(trait_a, {})[trait_b] = entry
+                self._partners.setdefault(trait_b, {})[trait_a] = entry
+            entry._merge_rule(rule_idx, breaker, rule.get('description', 'No description'))
+
+    def __len__(self) -> int:
+        """Number of unique incompatible pairs."""
+        return len(self._pairs) // 2
+
+    def unique_pairs(self) -> List[CompiledIncompatibility]:
+        """Each compiled pair exactly once, in rules.yaml order of first appearance."""
+        seen = set()
+        unique = []
+        for entry in self._pairs.values():
+            if id(entry) not in seen:
+                seen.add(id(entry))
+                unique.append(entry)
+        return unique
+
+    def lookup(self, cat1: str, trait1: str, cat2: str, trait2: str) -> Optional[CompiledIncompatibility]:
+        """Returns the compiled incompatibility between two traits, or None if there is none."""
+        return self._pairs.get(((cat1, trait1), (cat2, trait2)))
+
+    def partners_of(self, cat: str, trait: str) -> Dict[TraitRef, CompiledIncompatibility]:
+        """All traits that have an incompatibility with (cat, trait)."""
+        return self._partners.get((cat, trait), {})
+
+    def is_compatible(self, cat1: str, trait1: str, cat2: str, trait2: str,
+                      token_traits: Optional[Dict[str, str]] = None) -> bool:
+        """
+        Checks a trait pair against the compiled rules.
+        `token_traits` is the token the pair lives on; it is used to honour `breakable_by`.
+        Without it, breakable rules are treated as in force.
+        """
+        entry = self._pairs.get(((cat1, trait1), (cat2, trait2)))
+        if entry is None:
+            return True
+        return entry.is_broken_by(token_traits)
+
+    def find_violation(self, token_traits: Dict[str, str]) -> Optional[Tuple[str, str, str, str]]:
+        """Returns the first incompatible (cat1, trait1, cat2, trait2) pair on a token, or None."""
+        trait_list = list(token_traits.items())
+        for j1_idx in range(len(trait_list)):
+            cat1, val1 = trait_list[j1_idx]
+            partners = self._partners.get((cat1, val1))
+            if not partners:
+                continue
+            for j2_idx in range(j1_idx + 1, len(trait_list)):
+                cat2, val2 = trait_list[j2_idx]
+                entry = partners.get((cat2, val2))
+                if entry is not None and not entry.is_broken_by(token_traits):
+                    return (cat1, val1, cat2, val2)
+        return None
+
+
+class ConstraintMasks:
+    """
+    Bitset form of the compiled rules over a CompiledConfig's dense trait IDs.
+
+    Bit `t` of a mask stands for trait ID `t`. Per-(category, gender) candidate masks
+    and per-trait "forbidden partner" masks let a token's valid set for a category be
+    computed with a handful of bitwise operations, independent of the number of rules.
+    """
+
+    def __init__(self, config, compiled_rules: CompiledRules):
+        self.config = config
+        trait_total = config.trait_total
+        self.category_masks: List[int] = [
+            ((1 << len(trait_ids)) - 1) << trait_ids.start if trait_ids else 0
+            for trait_ids in config.category_trait_ids
+        ]
+        self.forbidden: List[int] = [0] * trait_total
+        # trait_id -> [(breaker trait IDs, mask of partners unlocked when all breakers are on the token)]
+        self.unlockable: List[List[Tuple[Tuple[int, ...], int]]] = [[] for _ in range(trait_total)]
+        self._gender_masks: Dict[Tuple[int, str], int] = {}
+        self._trait_ids_cache: Dict[int, Tuple[int, ...]] = {}
+
+        for entry in compiled_rules.unique_pairs():
+            id_a = config.trait_id(*entry.trait_a)
+            id_b = config.trait_id(*entry.trait_b)
+            if id_a is None or id_b is None:
+                continue # Rule references a trait that numerology does not define
+            self.forbidden[id_a] |= 1 << id_b
+            self.forbidden[id_b] |= 1 << id_a
+            if entry.unbreakable or not entry.breakers:
+                continue
+            breaker_ids = tuple(config.trait_id(*breaker) for breaker in sorted(entry.breakers))
+            if None in breaker_ids:
+                continue # Undefined breaker can never be on a token
+            self._add_unlock(id_a, breaker_ids, id_b)
+            self._add_unlock(id_b, breaker_ids, id_a)
+
+    def _add_unlock(self, trait_id: int, breaker_ids: Tuple[int, ...], partner_id: int):
+        groups = self.unlockable[trait_id]
+        for group_idx, (group_breakers, mask) in enumerate(groups):
+            if group_breakers == breaker_ids:
+                groups[group_idx] = (group_breakers, mask | (1 << partner_id))
+                return
+        groups.append((breaker_ids, 1 << partner_id))
+
+    def candidate_mask(self, cat_id: int, token_gender: str) -> int:
+        """Traits of a category that pass the trait-level gender check for `token_gender` (cached)."""
+        key = (cat_id, token_gender)
+        mask = self._gender_masks.get(key)
+        if mask is None:
+            mask = 0
+            for trait_id in self.config.category_trait_ids[cat_id]:
+                if self.config.is_trait_gender_allowed(trait_id, token_gender):
+                    mask |= 1 << trait_id
+            self._gender_masks[key] = mask
+        return mask
+
+    def forbidden_by(self, assigned_ids: List[int], skip_category: int = -1) -> int:
+        """
+        Union of the partners forbidden by the assigned traits, with `breakable_by` exemptions
+        applied for breakers present among `assigned_ids`. Traits of `skip_category` do not forbid.
+        """
+        forbidden = self.forbidden
+        unlockable = self.unlockable
+        trait_category = self.config.trait_category
+        result = 0
+        for trait_id in assigned_ids:
+            if trait_category[trait_id] == skip_category:
+                continue
+            mask = forbidden[trait_id]
+            if mask and unlockable[trait_id]:
+                for breaker_ids, unlocked in unlockable[trait_id]:
+                    if all(breaker_id in assigned_ids for breaker_id in breaker_ids):
+                        mask &= ~unlocked
+            result |= mask
+        return result
+
+    def trait_ids_of(self, mask: int) -> Tuple[int, ...]:
+        """`iter_bits` as a cached tuple; the weighted fill decodes the same few masks over and over."""
+        trait_ids = self._trait_ids_cache.get(mask)
+        if trait_ids is None:
+            trait_ids = tuple(self.iter_bits(mask))
+            self._trait_ids_cache[mask] = trait_ids
+        return trait_ids
+
+    @staticmethod
+    def iter_bits(mask: int) -> List[int]:
+        """Trait IDs set in `mask`, ascending."""
+        trait_ids = []
+        while mask:
+            low_bit = mask & -mask
+            trait_ids.append(low_bit.bit_length() - 1)
+            mask ^= low_bit
+        return trait_ids
@@ -0,0 +1,134 @@
+# src/sampling.py
+"""
+Dynamic weighted sampling for the weighted fill phase.
+
+The fill draws one trait per (token, category) with weight "remaining count + 1", and
+after each draw exactly one trait's weight changes. Rebuilding the weight list and its
+cumulative sums for every draw costs O(traits in category); a Fenwick (binary indexed)
+tree over the weights makes both the update and the draw O(log traits).
+
+Weights are kept as integers so prefix sums are exact. A draw of x = random() * total
+returns the first trait whose inclusive prefix sum exceeds x, which is the same trait
+`random.choices` picks from the same weights in the same order.
+"""
+
+import random
+from typing import List, Dict, Tuple, Callable, Optional, NamedTuple
+
+
+class FenwickSampler:
+    """Weighted sampler over positions 0..size-1 with O(log size) weight updates and draws."""
+
+    def __init__(self, weights: List[int]):
+        self.size = len(weights)
+        self.weights = list(weights)
+        self.tree = [0] * (self.size + 1)
+        for i in range(1, self.size + 1): # O(size) build: push each node into its parent
+            self.tree[i] += self.weights[i - 1]
+            parent = i + (i & -i)
+            if parent <= self.size:
+                self.tree[parent] += self.tree[i]
+        self.total = sum(self.weights)
+        self._top_step = 1 << (self.size.bit_length() - 1) if self.size else 0
+
+    def update(self, position: int, weight: int):
+        """Sets the weight at `position`."""
+        delta = weight - self.weights[position]
+        if not delta:
+            return
+        self.weights[position] = weight
+        self.total += delta
+        i = position + 1
+        while i <= self.size:
+            self.tree[i] += delta
+            i += i & -i
+
+    def prefix_sum(self, end: int) -> int:
+        """Sum of the weights at positions 0..end-1."""
+        result = 0
+        while end > 0:
+            result += self.tree[end]
+            end -= end & -end
+        return result
+
+    def find(self, target: float) -> int:
+        """First position whose inclusive prefix sum exceeds `target` (0 <= target < total)."""
+        position = 0
+        remaining = target
+        step = self._top_step
+        tree = self.tree
+        while step:
+            next_position = position + step
+            if next_position <= self.size and tree[next_position] <= remaining:
+                position = next_position
+                remaining -= tree[next_position]
+            step >>= 1
+        return min(position, self.size - 1)
+
+    def sample(self, rng: random.Random) -> int:
+        return self.find(rng.random() * self.total)
+
+
+class MaskedTraitSampler:
+    """
+    One FenwickSampler per (category, gender) candidate set, over trait IDs in ascending order.
+
+    `weight_of(trait_id)` gives a trait's current integer weight; call `refresh(trait_id)` after
+    its count changes. A draw takes the token's valid mask: valid traits outside it (forbidden
+    partners, strict caps) are zeroed for the draw and restored afterwards, so the cost is
+    O((excluded + 1) * log traits) rather than O(traits).
+    """
+
+    def __init__(self, masks, weight_of: Callable[[int], int]):
+        self.masks = masks
+        self.weight_of = weight_of
+        self._samplers: Dict[Tuple[int, str], _CandidateSampler] = {}
+        self._positions: Dict[int, List[Tuple[FenwickSampler, int]]] = {} # trait_id -> [(sampler, position)]
+
+    def _sampler_for(self, cat_id: int, token_gender: str) -> "_CandidateSampler":
+        key = (cat_id, token_gender)
+        entry = self._samplers.get(key)
+        if entry is None:
+            candidate_mask = self.masks.candidate_mask(cat_id, token_gender)
+            trait_ids = tuple(self.masks.iter_bits(candidate_mask))
+            sampler = FenwickSampler([self.weight_of(trait_id) for trait_id in trait_ids])
+            for position, trait_id in enumerate(trait_ids):
+                self._positions.setdefault(trait_id, []).append((sampler, position))
+            entry = _CandidateSampler(sampler, trait_ids, candidate_mask, {trait_id: position for position, trait_id in enumerate(trait_ids)})
+            self._samplers[key] = entry
+        return entry
+
+    def refresh(self, trait_id: int):
+        """Re-reads the weight of `trait_id` in every sampler that contains it."""
+        positions = self._positions.get(trait_id)
+        if positions:
+            weight = self.weight_of(trait_id)
+            for sampler, position in positions:
+                sampler.update(position, weight)
+
+    def sample(self, cat_id: int, token_gender: str, valid_mask: int, rng: random.Random) -> Optional[int]:
+        """
+        Draws a trait ID from `valid_mask` (a subset of the category's candidates for the gender)
+        by weight. Returns None if every valid trait has weight 0; the caller picks uniformly then.
+        """
+        entry = self._sampler_for(cat_id, token_gender)
+        sampler = entry.sampler
+        excluded = []
+        for trait_id in self.masks.trait_ids_of(entry.candidate_mask & ~valid_mask):
+            position = entry.position_of[trait_id]
+            weight = sampler.weights[position]
+            if weight:
+                excluded.append((position, weight))
+                sampler.update(position, 0)
+        try:
+            return entry.trait_ids[sampler.sample(rng)] if sampler.total > 0 else None
+        finally:
+            for position, weight in excluded:
+                sampler.update(position, weight)
+
+
+class _CandidateSampler(NamedTuple):
+    sampler: FenwickSampler
+    trait_ids: Tuple[int, ...]    # Ascending; position i of the sampler is trait_ids[i]
+    candidate_mask: int
+    position_of: Dict[int, int]
@@ -0,0 +1,166 @@
+# src/seed_search.py
+"""
+Multi-seed search: runs the Generator for many seeds across a process pool and picks
+the seed whose collection is closest to every target_count ± tolerance.
+
+Each seed is scored in a worker process; only the score travels back, and the caller
+regenerates the winning seed (generation is deterministic per seed) for export.
+As soon as a seed satisfies every constraint, seeds after it that have not started are
+cancelled (running ones finish and are discarded before the search returns). Seeds
+before it still run to completion, so the winner is always the first perfect seed
+in the requested order, independent of worker count and scheduling.
+"""
+
+import time
+import json
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass, field, asdict
+from typing import List, Dict, Any, Tuple, Optional, Callable
+import sys
+import os
+
+try:
+    from src.generator import Generator
+except ImportError:
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+    from src.generator import Generator
+
+
+@dataclass
+class SeedResult:
+    """Outcome of generating one seed. Lower `score` is better."""
+    seed: int
+    violation_count: int = 0   # Traits outside target ± tolerance
+    violation_total: int = 0   # Sum of how far those traits are outside their band
+    error: Optional[str] = None  # Final validation failure (duplicate, incompatibility, missing category)
+    elapsed: float = 0.0
+
+    @property
+    def is_perfect(self) -> bool:
+        return self.error is None and self.violation_count == 0
+
+    @property
+    def score(self) -> Tuple[int, int, int]:
+        return (0 if self.error is None else 1, self.violation_count, self.violation_total)
+
+
+@dataclass
+class SeedSearchResult:
+    best: SeedResult
+    results: List[SeedResult] = field(default_factory=list)  # Completed seeds, in requested order
+    cancelled: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "winning_seed": self.best.seed,
+            "best": asdict(self.best),
+            "seeds_completed": len(self.results),
+            "seeds_cancelled": self.cancelled,
+            "results": [asdict(result) for result in self.results],
+        }
+
+
+def parse_seed_range(text: str) -> List[int]:
+    """Parses "100-199" (inclusive), "1,5,9" or "7" (ranges and lists can be mixed)."""
+    seeds = []
+    for part in text.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        start, sep, end = part.partition("-")
+        if sep and start.strip():
+            first, last = int(start), int(end)
+            if last < first:
+                raise ValueError(f"Invalid seed range '{part}': end is before start.")
+            seeds.extend(range(first, last + 1))
+        else:
+            seeds.append(int(part))
+    if not seeds:
+        raise ValueError(f"No seeds in '{text}'.")
+    return seeds
+
+
+def score_seed(numerology_config: Dict[str, Any], rules_config: Dict[str, Any], seed: int,
+               generator_kwargs: Optional[Dict[str, Any]] = None) -> SeedResult:
+    """Generates one seed silently and scores its trait counts. Runs in a worker process."""
+    started = time.perf_counter()
+    result = SeedResult(seed=seed)
+    generator = None
+    try:
+        generator = Generator(numerology_config, rules_config, seed=seed, log_callback=lambda message: None, **(generator_kwargs or {}))
+        generator.generate_tokens()
+    except Exception as e: # One failing seed is recorded as failed; it does not abort the search
+        result.error = str(e) if isinstance(e, (ValueError, RuntimeError)) else f"{type(e).__name__}: {e}"
+    if generator is None: # Could not be set up: no counts to score
+        result.elapsed = time.perf_counter() - started
+        return result
+
+    config = generator.compiled_config
+    for trait_id, count in enumerate(generator.trait_counts.counts):
+        target, tol = config.target_counts[trait_id], config.tolerances[trait_id]
+        distance = max(target - tol - count, count - target - tol, 0)
+        if distance:
+            result.violation_count += 1
+            result.violation_total += distance
+    result.elapsed = time.perf_counter() - started
+    return result
+
+
+def search_seeds(numerology_config: Dict[str, Any], rules_config: Dict[str, Any], seeds: List[int],
+                 workers: Optional[int] = None, generator_kwargs: Optional[Dict[str, Any]] = None,
+                 stop_on_perfect: bool = True,
+                 progress_callback: Optional[Callable[[SeedResult], None]] = None) -> SeedSearchResult:
+    """
+    Scores `seeds` (in order of preference) with up to `workers` processes (default: CPU count)
+    and returns the best one; ties go to the earlier seed. `workers=1` runs in this process.
+    """
+    if not seeds:
+        raise ValueError("Seed search needs at least one seed.")
+    results: Dict[int, SeedResult] = {}  # position in `seeds` -> result
+    cancelled = 0
+
+    if workers == 1:
+        for position, seed in enumerate(seeds):
+            result = score_seed(numerology_config, rules_config, seed, generator_kwargs)
+            results[position] = result
+            if progress_callback: progress_callback(result)
+            if stop_on_perfect and result.is_perfect:
+                cancelled = len(seeds) - position - 1
+                break
+    else:
+        executor = ProcessPoolExecutor(max_workers=workers)
+        try:
+            pending = {
+                executor.submit(score_seed, numerology_config, rules_config, seed, generator_kwargs): position
+                for position, seed in enumerate(seeds)
+            }
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    position = pending.pop(future, None)
+                    if position is None or future.cancelled():
+                        continue
+                    result = future.result()
+                    results[position] = result
+                    if progress_callback: progress_callback(result)
+                    if stop_on_perfect and result.is_perfect:
+                        # Later seeds can no longer win; earlier ones still might.
+                        # Seeds already running cannot be cancelled; they finish and are discarded.
+                        for later_future, later_position in list(pending.items()):
+                            if later_position > position:
+                                if later_future.cancel():
+                                    cancelled += 1
+                                del pending[later_future]
+        finally:
+            # Wait for discarded seeds still running, so they do not compete with whatever the caller runs next.
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    ordered = [results[position] for position in sorted(results)]
+    best = min(ordered, key=lambda result: result.score)  # min() keeps the first of equal scores
+    return SeedSearchResult(best=best, results=ordered, cancelled=cancelled)
+
+
+def write_search_report(search_result: SeedSearchResult, path: str):
+    """Writes the winning seed and every completed seed's score as JSON."""
+    with open(path, 'w') as f:
+        json.dump(search_result.to_dict(), f, indent=4)
@@ -0,0 +1,67 @@
+# src/token_pool.py
+"""
+Indexed set of token indices for seeding.
+
+Singleton seeding repeatedly picks a random valid token from the tokens still
+available and then takes that token out of the pool. With a plain list, each pick
+meant copying and shuffling every available token and each removal was an O(N)
+`list.remove`, so seeding S singletons over N tokens cost O(S x N). TokenPool keeps
+the members in a list plus a member -> position map: membership, removal and a
+uniform random pick are O(1), and `random_order` shuffles lazily, so a pick costs
+only as many steps as the candidates it has to examine.
+"""
+
+import random
+from typing import List, Dict, Iterable, Iterator
+
+
+class TokenPool:
+    """Set of token indices with O(1) membership, removal and random picks."""
+
+    def __init__(self, token_indices: Iterable[int] = ()):
+        self._members: List[int] = []
+        self._positions: Dict[int, int] = {}
+        for token_idx in token_indices:
+            self.add(token_idx)
+
+    def __len__(self) -> int:
+        return len(self._members)
+
+    def __contains__(self, token_idx: object) -> bool:
+        return token_idx in self._positions
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(list(self._members))
+
+    def add(self, token_idx: int):
+        if token_idx not in self._positions:
+            self._positions[token_idx] = len(self._members)
+            self._members.append(token_idx)
+
+    def remove(self, token_idx: int):
+        """Removes a member by moving the last member into its slot."""
+        position = self._positions.pop(token_idx)
+        last = self._members.pop()
+        if last != token_idx:
+            self._members[position] = last
+            self._positions[last] = position
+
+    def discard(self, token_idx: int):
+        if token_idx in self._positions:
+            self.remove(token_idx)
+
+    def random_order(self, rng: random.Random) -> Iterator[int]:
+        """
+        Yields every member once in uniformly random order (an in-place Fisher-Yates shuffle run
+        one step per item). The pool must not change while the iterator is in use, so stop
+        iterating before removing the member picked.
+        """
+        members = self._members
+        positions = self._positions
+        for position in range(len(members)):
+            swap = position + rng.randrange(len(members) - position)
+            if swap != position:
+                members[position], members[swap] = members[swap], members[position]
+                positions[members[position]] = position
+                positions[members[swap]] = swap
+            yield members[position]
@@ -0,0 +1,91 @@
+# src/token_state.py
+"""
+Derived per-token state kept alongside the trait dicts during generation.
+
+A token's gender follows from its Gender and Body traits, and its glyph law number,
+glyph tier and Sovereign flag follow from its Glyph. The generator used to recompute
+these from the trait dict (gender lookups through the trait index, law numbers by
+parsing the glyph name) for every category of every token in the fill, for every
+adjustment candidate and in every swap check. TokenStates stores them per token and
+recomputes them only when one of those three categories changes, so hot loops read a
+list entry instead.
+"""
+
+from typing import List, Dict, Any, Optional
+import sys
+import os
+
+try:
+    from src.compiled_config import parse_glyph_law_number, glyph_tier
+except ImportError:
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+    from src.compiled_config import parse_glyph_law_number, glyph_tier
+
+DERIVED_CATEGORIES = ("Gender", "Body", "Glyph") # The only categories the derived state depends on
+
+
+class TokenStates:
+    """
+    Gender, law number, glyph tier and Sovereign flag of every token of `tokens_data`.
+
+    Call `update(token_idx, category_name)` after changing a token's trait; it is a no-op
+    unless the category is in DERIVED_CATEGORIES. A Glyph change also writes the token's
+    'law_number' entry, so `tokens_data` always carries the law number of its glyph.
+    Tokens without a Glyph have tier None; 'blank' and unnumbered glyphs are "Blank".
+    """
+
+    def __init__(self, config, tokens_data: List[Dict[str, Any]]):
+        self.config = config
+        self.tokens_data = tokens_data
+        token_total = len(tokens_data)
+        self.genders: List[str] = ["Unknown"] * token_total
+        self.law_numbers: List[Optional[int]] = [None] * token_total
+        self.tiers: List[Optional[str]] = [None] * token_total
+        self.is_sovereign = bytearray(token_total)
+        for token_idx in range(token_total):
+            self.refresh(token_idx)
+
+    def __len__(self) -> int:
+        return len(self.genders)
+
+    def gender_of(self, token_traits: Dict[str, str]) -> str:
+        """
+        Gender of a token with these traits: its 'Gender' trait, else its Body trait's gender tag, else "Unknown".
+        Use this for hypothetical trait dicts; registered tokens read `genders`.
+        """
+        if "Gender" in token_traits:
+            return token_traits["Gender"]
+        body_trait_value = token_traits.get("Body")
+        if body_trait_value:
+            body_trait_id = self.config.trait_id("Body", body_trait_value)
+            if body_trait_id is not None:
+                body_gender = self.config.trait_gender_name(body_trait_id)
+                if body_gender: # Body trait has a 'gender' tag
+                    return body_gender
+        return "Unknown"
+
+    def refresh(self, token_idx: int):
+        """Recomputes every derived field of a token from its traits."""
+        self.genders[token_idx] = self.gender_of(self.tokens_data[token_idx]['traits'])
+        self._refresh_glyph(token_idx)
+
+    def update(self, token_idx: int, category_name: str):
+        """Recomputes what depends on `category_name` after the token's trait in it changed."""
+        if category_name == "Glyph":
+            self._refresh_glyph(token_idx)
+        elif category_name == "Gender" or category_name == "Body":
+            self.genders[token_idx] = self.gender_of(self.tokens_data[token_idx]['traits'])
+
+    def _refresh_glyph(self, token_idx: int):
+        token_data = self.tokens_data[token_idx]
+        glyph_name = token_data['traits'].get("Glyph")
+        if glyph_name is None:
+            law_number, tier = None, None
+        else:
+            glyph_id = self.config.trait_id("Glyph", glyph_name)
+            law_number = self.config.law_number(glyph_id) if glyph_id is not None else parse_glyph_law_number(glyph_name)
+            tier = glyph_tier(law_number)
+        self.law_numbers[token_idx] = law_number
+        self.tiers[token_idx] = tier
+        self.is_sovereign[token_idx] = tier == "Sovereign"
+        token_data['law_number'] = law_number
@@ -0,0 +1,395 @@
+# src/token_store.py
+"""
+Columnar token store: the generator's per-token state in one flat buffer.
+
+Every token is a row of uint16 trait codes, one per category (the code of a defined
+trait is its CompiledConfig trait ID; trait names numerology does not define get extra
+codes above those), plus an int16 law number and a uint8 glyph tier. The buffer is a
+bytearray, or a memory-mapped file when the store is given a path, so a collection
+larger than RAM can be generated, validated and exported from disk, and a finished run
+can be reopened by another process with `TokenStore.open` without parsing anything.
+
+    header   32 bytes: magic, format version, token total, category total, token ID padding
+    codes    token_total x category_total uint16, row-major; MISSING (0xFFFF) = unassigned
+    laws     token_total int16; NO_LAW (-1) = no law number
+    tiers    token_total uint8; index into TIER_NAMES (0 = no Glyph)
+    trailer  UTF-8 JSON: category names and the string table (code -> category, trait name)
+
+Numbers are stored in native byte order, which must be little-endian.
+
+The generator's existing dict-based code keeps working on top of the store:
+`rows()` returns a `tokens_data`-shaped sequence whose entries are views, so
+`tokens_data[i]['traits'][category] = trait` writes the code straight into the buffer.
+Validation reads the code matrix as a NumPy array without copying (`code_array`), and
+the returned Tokens are views over rows (Token.from_table).
+"""
+
+import json
+import mmap
+import struct
+import sys
+import os
+from collections.abc import Mapping, MutableMapping, Sequence
+from typing import List, Dict, Tuple, Optional, Iterator
+
+try:
+    import numpy as np
+except ImportError: # NumPy is optional; only code_array() needs it
+    np = None
+
+try:
+    from src.models import Token
+    from src.compiled_config import glyph_tier
+except ImportError:
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+    from src.models import Token
+    from src.compiled_config import glyph_tier
+
+MAGIC = b"NFTSTORE"
+FORMAT_VERSION = 1
+_HEADER = struct.Struct("<8sIIII8x") # magic, version, token_total, category_total, id_padding; padded to 32 bytes
+MISSING = 0xFFFF  # Code of an unassigned category
+NO_LAW = -1
+TIER_NAMES = (None, "Sovereign", "Capo", "Soldier", "Street", "Blank") # Tier code -> name; None: the token has no Glyph
+_TIER_CODES = {name: code for code, name in enumerate(TIER_NAMES)}
+
+
+class TokenStore:
+    """Trait codes, law numbers and glyph tiers of a collection. Build with `create` or `open`."""
+
+    def __init__(self, buffer, token_total: int, category_names: List[str], names: List[str], code_categories: List[int],
+                 id_padding: int, mapped_file=None):
+        if sys.byteorder != "little":
+            raise ValueError("TokenStore buffers are little-endian; this platform is not.")
+        self.buffer = buffer
+        self.token_total = token_total
+        self.category_total = len(category_names)
+        self.category_names = category_names
+        self.category_index = {name: cat_id for cat_id, name in enumerate(category_names)}
+        self.names = names                       # Code -> trait name (the string table)
+        self.code_categories = code_categories   # Code -> category ID
+        self.id_padding = id_padding
+        self._mapped_file = mapped_file
+        self._codes_by_name: List[Dict[str, int]] = [{} for _ in category_names] # Per category: trait name -> code
+        for code, cat_id in enumerate(code_categories):
+            self._codes_by_name[cat_id].setdefault(names[code], code)
+
+        codes_end = _HEADER.size + 2 * token_total * self.category_total
+        laws_end = codes_end + 2 * token_total
+        self.data_end = laws_end + token_total
+        view = memoryview(buffer)
+        self.codes = view[_HEADER.size:codes_end].cast('H')
+        self.laws = view[codes_end:laws_end].cast('h')
+        self.tiers = view[laws_end:self.data_end]
+        self.token_ids = _TokenIds(token_total, id_padding)
+        self.law_numbers = _LawNumbers(self.laws)
+        self._glyph_cat_id = self.category_index.get("Glyph")
+
+    @classmethod
+    def create(cls, config, token_total: int, id_padding: int, path: Optional[str] = None) -> "TokenStore":
+        """
+        Empty store for `token_total` tokens of the CompiledConfig `config` (every category unassigned).
+        With `path`, the store is a memory-mapped file there (replacing any existing file).
+        """
+        if config.trait_total >= MISSING:
+            raise ValueError(f"TokenStore codes are 16-bit; {config.trait_total} traits do not fit.")
+        category_total = len(config.category_names)
+        data_end = _HEADER.size + 2 * token_total * category_total + 3 * token_total
+        laws_end = data_end - token_total
+        if path is None:
+            buffer = bytearray(data_end)
+            mapped_file = None
+        else:
+            mapped_file = open(path, "w+b")
+            mapped_file.truncate(data_end)
+            buffer = mmap.mmap(mapped_file.fileno(), data_end) if data_end else bytearray()
+        _HEADER.pack_into(buffer, 0, MAGIC, FORMAT_VERSION, token_total, category_total, id_padding)
+        buffer[_HEADER.size:laws_end] = b"\xff" * (laws_end - _HEADER.size) # MISSING codes and NO_LAW law numbers
+        store = cls(buffer, token_total, list(config.category_names), list(config.trait_names), list(config.trait_category),
+                    id_padding, mapped_file)
+        store.flush()
+        return store
+
+    @classmethod
+    def open(cls, path: str, writable: bool = False) -> "TokenStore":
+        """Maps a store file written by a finished run (read-only unless `writable`)."""
+        mapped_file = open(path, "r+b" if writable else "rb")
+        try:
+            magic, version, token_total, category_total, id_padding = _HEADER.unpack(mapped_file.read(_HEADER.size))
+            if magic != MAGIC or version != FORMAT_VERSION:
+                raise ValueError(f"{path} is not a version {FORMAT_VERSION} token store.")
+            data_end = _HEADER.size + 2 * token_total * category_total + 3 * token_total
+            mapped_file.seek(data_end)
+            trailer = json.loads(mapped_file.read().decode("utf-8"))
+            buffer = mmap.mmap(mapped_file.fileno(), data_end, access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ)
+        except Exception:
+            mapped_file.close()
+            raise
+        return cls(buffer, token_total, trailer["category_names"], trailer["names"], trailer["code_categories"], id_padding, mapped_file)
+
+    def flush(self):
+        """Writes the string table and syncs a file-backed store to disk (no-op in memory)."""
+        if self._mapped_file is None or self._mapped_file.mode == "rb":
+            return
+        trailer = {"category_names": self.category_names, "names": self.names, "code_categories": self.code_categories}
+        self._mapped_file.seek(self.data_end)
+        self._mapped_file.write(json.dumps(trailer).encode("utf-8"))
+        self._mapped_file.truncate()
+        self._mapped_file.flush()
+        if isinstance(self.buffer, mmap.mmap):
+            self.buffer.flush()
+
+    def close(self):
+        self.flush()
+        self.codes.release()
+        self.laws.release()
+        self.tiers.release()
+        if isinstance(self.buffer, mmap.mmap):
+            self.buffer.close()
+        if self._mapped_file is not None:
+            self._mapped_file.close()
+            self._mapped_file = None
+
+    def __enter__(self) -> "TokenStore":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self) -> int:
+        return self.token_total
+
+    # --- Codes ---
+
+    def code_for(self, cat_id: int, trait_name: str) -> int:
+        """Code of a trait name in a category; names numerology does not define get a new extra code."""
+        code = self._codes_by_name[cat_id].get(trait_name)
+        if code is None:
+            code = len(self.names)
+            if code >= MISSING:
+                raise ValueError("TokenStore string table is full (16-bit codes).")
+            self.names.append(trait_name)
+            self.code_categories.append(cat_id)
+            self._codes_by_name[cat_id][trait_name] = code
+        return code
+
+    def trait(self, row: int, cat_id: int) -> Optional[str]:
+        code = self.codes[row * self.category_total + cat_id]
+        return None if code == MISSING else self.names[code]
+
+    def set_trait(self, row: int, cat_id: int, trait_name: Optional[str]):
+        """Assigns a trait (None unassigns the category)."""
+        if trait_name is None:
+            code = MISSING
+        else:
+            code = self._codes_by_name[cat_id].get(trait_name)
+            if code is None:
+                code = self.code_for(cat_id, trait_name)
+        self.codes[row * self.category_total + cat_id] = code
+
+    def row_traits(self, row: int) -> Dict[str, str]:
+        """The token's traits as a dict, in category order."""
+        base = row * self.category_total
+        names = self.names
+        return {cat_name: names[code] for cat_name, code in zip(self.category_names, self.codes[base:base + self.category_total].tolist())
+                if code != MISSING}
+
+    def row_trait_count(self, row: int) -> int:
+        base = row * self.category_total
+        return self.category_total - self.codes[base:base + self.category_total].tolist().count(MISSING)
+
+    def code_array(self):
+        """The codes as a token x category NumPy array sharing the store's buffer (requires NumPy)."""
+        if np is None:
+            raise ImportError("TokenStore.code_array requires NumPy.")
+        return np.frombuffer(self.buffer, dtype="<u2", count=self.token_total * self.category_total,
+                             offset=_HEADER.size).reshape(self.token_total, self.category_total)
+
+    # --- Law numbers and tiers ---
+
+    def set_law_number(self, row: int, law_number: Optional[int]):
+        """Sets the token's law number and, from it, its glyph tier (no tier without a Glyph)."""
+        self.laws[row] = NO_LAW if law_number is None else law_number
+        has_glyph = self._glyph_cat_id is not None and self.codes[row * self.category_total + self._glyph_cat_id] != MISSING
+        self.tiers[row] = _TIER_CODES.get(glyph_tier(law_number), 0) if has_glyph else 0
+
+    def tier(self, row: int) -> Optional[str]:
+        return TIER_NAMES[self.tiers[row]]
+
+    # --- Views ---
+
+    def rows(self) -> "TokenRows":
+        """A `tokens_data`-shaped view: entry i maps 'token_id', 'traits' and 'law_number' onto row i."""
+        return TokenRows(self)
+
+    def tokens(self) -> List[Token]:
+        """A Token view of every row, in row order."""
+        return [Token.from_table(self, row) for row in range(self.token_total)]
+
+
+class TokenRows(Sequence):
+    """Sequence of TokenRecord views over a store's rows; stands in for the list of token dicts."""
+
+    def __init__(self, store: TokenStore):
+        self.store = store
+
+    def __len__(self) -> int:
+        return self.store.token_total
+
+    def __getitem__(self, row):
+        if row.__class__ is int and 0 <= row < self.store.token_total:
+            return TokenRecord(self.store, row)
+        if isinstance(row, slice):
+            return [TokenRecord(self.store, r) for r in range(*row.indices(self.store.token_total))]
+        if -self.store.token_total <= row < 0:
+            return TokenRecord(self.store, row + self.store.token_total)
+        raise IndexError("token row out of range")
+
+    def __iter__(self) -> Iterator["TokenRecord"]:
+        store = self.store
+        return (TokenRecord(store, row) for row in range(store.token_total))
+
+
+class TokenRecord(MutableMapping):
+    """One token as the dict {'token_id', 'traits', 'law_number'} the generator works on, backed by the store."""
+    __slots__ = ("store", "row")
+    _KEYS = ("token_id", "traits", "law_number")
+
+    def __init__(self, store: TokenStore, row: int):
+        self.store = store
+        self.row = row
+
+    def __getitem__(self, key: str):
+        if key == "traits":
+            return TraitRow(self.store, self.row)
+        if key == "token_id":
+            return self.store.token_ids[self.row]
+        if key == "law_number":
+            return self.store.law_numbers[self.row]
+        raise KeyError(key)
+
+    def __setitem__(self, key: str, value):
+        if key == "law_number":
+            self.store.set_law_number(self.row, value)
+        elif key == "traits":
+            trait_row = TraitRow(self.store, self.row)
+            trait_row.clear()
+            trait_row.update(value)
+        else:
+            raise KeyError(f"{key!r} cannot be set on a stored token")
+
+    def __delitem__(self, key: str):
+        raise KeyError(f"{key!r} cannot be deleted from a stored token")
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._KEYS)
+
+    def __len__(self) -> int:
+        return len(self._KEYS)
+
+    def __repr__(self) -> str:
+        return repr(dict(self))
+
+
+class TraitRow(MutableMapping):
+    """A token's traits as a mutable mapping over its row of codes (categories iterate in category order)."""
+    __slots__ = ("store", "row", "base")
+
+    def __init__(self, store: TokenStore, row: int):
+        self.store = store
+        self.row = row
+        self.base = row * store.category_total
+
+    def __getitem__(self, category_name: str) -> str:
+        cat_id = self.store.category_index.get(category_name)
+        code = MISSING if cat_id is None else self.store.codes[self.base + cat_id]
+        if code == MISSING:
+            raise KeyError(category_name)
+        return self.store.names[code]
+
+    def get(self, category_name: str, default=None):
+        cat_id = self.store.category_index.get(category_name)
+        if cat_id is None:
+            return default
+        code = self.store.codes[self.base + cat_id]
+        return default if code == MISSING else self.store.names[code]
+
+    def __contains__(self, category_name: object) -> bool:
+        store = self.store
+        cat_id = store.category_index.get(category_name)
+        return cat_id is not None and store.codes[self.base + cat_id] != MISSING
+
+    def __setitem__(self, category_name: str, trait_name: str):
+        cat_id = self.store.category_index.get(category_name)
+        if cat_id is None:
+            raise KeyError(f"Category {category_name!r} is not in the token store")
+        self.store.set_trait(self.row, cat_id, trait_name)
+
+    def __delitem__(self, category_name: str):
+        if category_name not in self:
+            raise KeyError(category_name)
+        self.store.set_trait(self.row, self.store.category_index[category_name], None)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.store.row_traits(self.row))
+
+    def __len__(self) -> int:
+        return self.store.row_trait_count(self.row)
+
+    def copy(self) -> Dict[str, str]:
+        return self.store.row_traits(self.row)
+
+    def items(self) -> List[Tuple[str, str]]:
+        store = self.store
+        names = store.names
+        return [(cat_name, names[code]) for cat_name, code in zip(store.category_names, store.codes[self.base:self.base + store.category_total].tolist())
+                if code != MISSING]
+
+    def keys(self) -> List[str]:
+        return list(self.store.row_traits(self.row))
+
+    def values(self) -> List[str]:
+        return list(self.store.row_traits(self.row).values())
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, TraitRow) and other.store is self.store:
+            width = self.store.category_total
+            return self.store.codes[self.base:self.base + width] == other.store.codes[other.base:other.base + width]
+        if isinstance(other, Mapping):
+            return self.store.row_traits(self.row) == dict(other.items())
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return repr(self.store.row_traits(self.row))
+
+
+class _TokenIds(Sequence):
+    """Token IDs "1".."N", zero-padded to `id_padding` digits, computed on access."""
+
+    def __init__(self, token_total: int, id_padding: int):
+        self.token_total = token_total
+        self.id_padding = id_padding
+
+    def __len__(self) -> int:
+        return self.token_total
+
+    def __getitem__(self, row: int) -> str:
+        if not 0 <= row < self.token_total:
+            raise IndexError("token row out of range")
+        return str(row + 1).zfill(self.id_padding)
+
+
+class _LawNumbers(Sequence):
+    """Law numbers by row, None where the column holds NO_LAW."""
+
+    def __init__(self, laws):
+        self.laws = laws
+
+    def __len__(self) -> int:
+        return len(self.laws)
+
+    def __getitem__(self, row: int) -> Optional[int]:
+        law_number = self.laws[row]
+        return None if law_number == NO_LAW else law_number
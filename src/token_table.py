@@ -0,0 +1,105 @@
+# src/token_table.py
+"""
+Column access to a collection's trait codes, for final validation.
+
+CodeMatrix presents the tokens as a token x category matrix of trait codes (one
+column per category; MISSING where a token has no trait in a category). A code
+indexes the string table `names`: the numerology trait names by trait ID, followed
+by any trait names numerology does not define, so no information is lost.
+
+A matrix is either built from trait dicts (one array('i') per column) or laid over
+a TokenStore (`from_store`), whose columns are strided views of the store's buffer:
+validation then reads the generator's own state without copying it.
+"""
+
+from array import array
+from typing import List, Dict, Any, Tuple, Optional
+import sys
+import os
+
+try:
+    import numpy as np
+except ImportError: # NumPy is optional; only code_array() needs it
+    np = None
+
+try:
+    from src.token_store import MISSING
+except ImportError:
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+    from src.token_store import MISSING
+
+
+class CodeMatrix:
+    """Token x category trait codes, stored as one column per category."""
+
+    def __init__(self, config, tokens_data: List[Dict[str, Any]]):
+        self.config = config
+        self.store = None
+        self.token_total = len(tokens_data)
+        self.extra_names: List[Tuple[str, str]] = []  # Code trait_total + i -> (category, undefined trait name)
+        self._extra_codes: Dict[Tuple[str, str], int] = {}
+        all_traits = [token_data['traits'] for token_data in tokens_data]
+        self.columns: List[array] = []
+        for cat_id, cat_name in enumerate(config.category_names):
+            name_to_code = {config.trait_names[t]: t for t in config.category_trait_ids[cat_id]}
+            column = list(map(name_to_code.get, [traits.get(cat_name) for traits in all_traits]))
+            if None in column: # Unassigned categories and undefined trait names
+                for token_idx, code in enumerate(column):
+                    if code is None:
+                        trait_name = all_traits[token_idx].get(cat_name)
+                        column[token_idx] = MISSING if trait_name is None else self._extra_code(cat_name, trait_name)
+            self.columns.append(array('i', column))
+        self.names: List[str] = list(config.trait_names) + [trait_name for _, trait_name in self.extra_names] # Code -> trait name
+        self._named_columns = list(zip(config.category_names, self.columns))
+
+    @classmethod
+    def from_store(cls, config, store) -> "CodeMatrix":
+        """Matrix over the codes of a TokenStore built for `config` (shares the store's buffer)."""
+        matrix = cls.__new__(cls)
+        matrix.config = config
+        matrix.store = store
+        matrix.token_total = store.token_total
+        matrix.extra_names = [(store.category_names[store.code_categories[code]], store.names[code])
+                              for code in range(config.trait_total, len(store.names))]
+        matrix._extra_codes = {key: config.trait_total + i for i, key in enumerate(matrix.extra_names)}
+        width = store.category_total
+        matrix.columns = [store.codes[cat_id::width] for cat_id in range(width)]
+        matrix.names = store.names
+        matrix._named_columns = list(zip(config.category_names, matrix.columns))
+        return matrix
+
+    def code_array(self):
+        """The codes as a category x token NumPy array; a view of the store's buffer when there is one."""
+        if self.store is not None:
+            return self.store.code_array().T
+        return np.array(self.columns, dtype=np.int64)
+
+    def _extra_code(self, cat_name: str, trait_name: str) -> int:
+        code = self._extra_codes.get((cat_name, trait_name))
+        if code is None:
+            code = self.config.trait_total + len(self.extra_names)
+            self.extra_names.append((cat_name, trait_name))
+            self._extra_codes[(cat_name, trait_name)] = code
+        return code
+
+    def code_of(self, cat_name: str, trait_name: str) -> Optional[int]:
+        """Code of a trait, or None if it is neither defined nor on any token."""
+        trait_id = self.config.trait_id(cat_name, trait_name)
+        return trait_id if trait_id is not None else self._extra_codes.get((cat_name, trait_name))
+
+    def trait_name(self, code: int) -> str:
+        return self.names[code]
+
+    def row_traits(self, token_idx: int) -> Dict[str, str]:
+        """The token's traits, in category order."""
+        names = self.names
+        traits = {}
+        for cat_name, column in self._named_columns:
+            code = column[token_idx]
+            if code != MISSING:
+                traits[cat_name] = names[code]
+        return traits
+
+    def row_trait_count(self, token_idx: int) -> int:
+        return sum(1 for column in self.columns if column[token_idx] != MISSING)
+
@@ -0,0 +1,338 @@
+# src/validation.py
+"""
+Final validation of a generated collection in one pass.
+
+The collection is first encoded as a token x category code matrix (see
+src/token_table.py; over the generator's TokenStore it is the store's own buffer): column c holds,
+for every token, the trait ID of its category-c trait (MISSING if unassigned). Trait
+names that numerology does not define get extra codes above the trait IDs, so no
+information is lost. All checks then run on the columns:
+
+    counts          trait counts outside target +/- tolerance
+    uniqueness      tokens whose code row equals an earlier token's row
+    incompatibility per rule pair, tokens holding both traits and not every breaker
+    missing         tokens without a category their gender could be assigned
+
+Per-(category, gender) availability comes from the constraint masks once, up front.
+With NumPy installed the checks are array operations over the matrix; without it
+they run on the same columns in plain Python (the incompatibility check then only
+looks at tokens whose trait bitmask meets their forbidden-partner bitmask).
+Every violation is collected into a ValidationReport instead of stopping at the first.
+"""
+
+from dataclasses import dataclass, field, asdict
+from typing import List, Dict, Any, Tuple, Optional
+import sys
+import os
+
+try:
+    import numpy as np
+except ImportError: # NumPy is optional; the checks then run in plain Python
+    np = None
+
+try:
+    from src.token_table import CodeMatrix, MISSING
+except ImportError:
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+    from src.token_table import CodeMatrix, MISSING
+
+
+@dataclass
+class CountViolation:
+    category: str
+    trait: str
+    count: int
+    target: int
+    tolerance: int
+
+
+@dataclass
+class DuplicateViolation:
+    token_id: str
+    duplicate_of: str  # Token ID of the first token with the same traits
+    traits: Dict[str, str]
+
+
+@dataclass
+class IncompatibilityViolation:
+    token_id: str
+    category_a: str
+    trait_a: str
+    category_b: str
+    trait_b: str
+
+
+@dataclass
+class MissingCategoryViolation:
+    token_id: str
+    gender: str
+    category: str
+
+
+@dataclass
+class ValidationReport:
+    """All violations found by `validate_collection`, each list in token (or trait) order."""
+    token_total: int
+    target_total: int
+    unique_tokens: int
+    counts: List[CountViolation] = field(default_factory=list)
+    duplicates: List[DuplicateViolation] = field(default_factory=list)
+    incompatibilities: List[IncompatibilityViolation] = field(default_factory=list)
+    missing_categories: List[MissingCategoryViolation] = field(default_factory=list)
+
+    @property
+    def error_count(self) -> int:
+        """Violations that make the collection invalid (count violations are only warnings)."""
+        size_mismatch = 0 if self.unique_tokens == self.target_total or self.duplicates else 1
+        return len(self.duplicates) + len(self.incompatibilities) + len(self.missing_categories) + size_mismatch
+
+    @property
+    def is_valid(self) -> bool:
+        return self.error_count == 0
+
+    def first_error(self) -> Optional[str]:
+        """Message for the first error, in the order uniqueness, incompatibility, missing category."""
+        if self.duplicates:
+            v = self.duplicates[0]
+            return f"Validation Error (Uniqueness): Duplicate token. Token ID {v.token_id} is same as {v.duplicate_of}. Traits: {v.traits}"
+        if self.unique_tokens != self.target_total:
+            return f"Validation Error (Uniqueness): Number of unique tokens ({self.unique_tokens}) does not match target ({self.target_total})."
+        if self.incompatibilities:
+            v = self.incompatibilities[0]
+            return f"Validation Error (Incompatibility): Token {v.token_id} violates rule between {v.category_a}:{v.trait_a} and {v.category_b}:{v.trait_b}."
+        if self.missing_categories:
+            v = self.missing_categories[0]
+            return f"Validation Error (Missing Category): Token {v.token_id} (Gender: {v.gender}) is missing assignable category '{v.category}'."
+        return None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "valid": self.is_valid,
+            "token_total": self.token_total,
+            "target_total": self.target_total,
+            "unique_tokens": self.unique_tokens,
+            "counts": [asdict(v) for v in self.counts],
+            "duplicates": [asdict(v) for v in self.duplicates],
+            "incompatibilities": [asdict(v) for v in self.incompatibilities],
+            "missing_categories": [asdict(v) for v in self.missing_categories],
+        }
+
+
+def validate_collection(config, masks, compiled_rules, tokens_data: List[Dict[str, Any]], counts, matrix: Optional[CodeMatrix] = None) -> ValidationReport:
+    """
+    Runs every final check over `tokens_data` and returns the full ValidationReport.
+    `counts` is the trait count array indexed by trait ID (TraitCounts.counts). `matrix` is the
+    collection's CodeMatrix if the caller already built one.
+    """
+    if matrix is None:
+        matrix = CodeMatrix(config, tokens_data)
+    token_ids = [token_data['token_id'] for token_data in tokens_data]
+    report = ValidationReport(token_total=len(tokens_data), target_total=config.target_collection_size, unique_tokens=0)
+
+    for trait_id, count in enumerate(counts):
+        if not config.within_tolerance(trait_id, count):
+            cat, trait_name = config.trait_key(trait_id)
+            report.counts.append(CountViolation(cat, trait_name, count, config.target_counts[trait_id], config.tolerances[trait_id]))
+
+    if np is not None and matrix.columns and matrix.token_total:
+        codes = matrix.code_array() # category x token
+        first_of, report.unique_tokens = _find_duplicates_numpy(codes)
+        incompatible = _find_incompatibilities_numpy(codes, matrix, compiled_rules)
+        gender_of, gender_names = _token_genders_numpy(codes, matrix)
+        missing = _find_missing_numpy(codes, matrix, masks, gender_of, gender_names)
+    else:
+        first_of, report.unique_tokens = _find_duplicates(matrix)
+        incompatible = _find_incompatibilities(matrix, masks, compiled_rules)
+        gender_of, gender_names = _token_genders(matrix)
+        missing = _find_missing(matrix, masks, gender_of, gender_names)
+
+    for token_idx, original_idx in first_of:
+        report.duplicates.append(DuplicateViolation(token_ids[token_idx], token_ids[original_idx], dict(tokens_data[token_idx]['traits'])))
+    for token_idx, code_a, cat_a, code_b, cat_b in incompatible:
+        report.incompatibilities.append(IncompatibilityViolation(
+            token_ids[token_idx], config.category_names[cat_a], matrix.trait_name(code_a), config.category_names[cat_b], matrix.trait_name(code_b)))
+    for token_idx, cat_id in missing:
+        report.missing_categories.append(MissingCategoryViolation(token_ids[token_idx], gender_names[gender_of[token_idx]], config.category_names[cat_id]))
+    return report
+
+
+def _checked_pairs(matrix: CodeMatrix, compiled_rules) -> List[Tuple[int, int, int, int, Optional[List[Tuple[int, int]]]]]:
+    """
+    Rule pairs that can occur on a token, as (cat_a, code_a, cat_b, code_b, breakers) with cat_a < cat_b.
+    `breakers` is None for pairs no token can break, else the (category, code) of every breaker.
+    """
+    config = matrix.config
+    pairs = []
+    for entry in compiled_rules.unique_pairs():
+        code_a, code_b = matrix.code_of(*entry.trait_a), matrix.code_of(*entry.trait_b)
+        cat_a, cat_b = config.category_index.get(entry.trait_a[0]), config.category_index.get(entry.trait_b[0])
+        if code_a is None or code_b is None or cat_a is None or cat_b is None or cat_a == cat_b:
+            continue # Undefined on every token, or both in one category (never on the same token)
+        breakers = None
+        if not entry.unbreakable and entry.breakers:
+            breakers = [(config.category_index.get(cat), matrix.code_of(cat, trait)) for cat, trait in sorted(entry.breakers)]
+            if any(cat is None or code is None for cat, code in breakers):
+                breakers = None
+        if cat_a > cat_b:
+            cat_a, code_a, cat_b, code_b = cat_b, code_b, cat_a, code_a
+        pairs.append((cat_a, code_a, cat_b, code_b, breakers))
+    return pairs
+
+
+def _find_duplicates(matrix: CodeMatrix) -> Tuple[List[Tuple[int, int]], int]:
+    first_with_row: Dict[Tuple[int, ...], int] = {}
+    duplicates = []
+    for token_idx, row in enumerate(zip(*matrix.columns) if matrix.columns else ((),) * matrix.token_total):
+        original_idx = first_with_row.setdefault(row, token_idx)
+        if original_idx != token_idx:
+            duplicates.append((token_idx, original_idx))
+    return duplicates, len(first_with_row)
+
+
+def _find_incompatibilities(matrix: CodeMatrix, masks, compiled_rules) -> List[Tuple[int, int, int, int, int]]:
+    """Pure-Python check: only tokens whose traits meet their forbidden partners are examined pair by pair."""
+    pairs_by_codes = {(code_a, code_b): breakers for cat_a, code_a, cat_b, code_b, breakers in _checked_pairs(matrix, compiled_rules)}
+    trait_total = matrix.config.trait_total
+    # Rules on undefined traits are not in the masks; only then must every token be examined.
+    check_all = any(code_a >= trait_total or code_b >= trait_total for code_a, code_b in pairs_by_codes)
+    forbidden = masks.forbidden
+    found = []
+    for token_idx, row in enumerate(zip(*matrix.columns)):
+        row_mask = 0
+        forbidden_mask = 0
+        for code in row:
+            if 0 <= code < trait_total:
+                row_mask |= 1 << code
+                forbidden_mask |= forbidden[code]
+        if not forbidden_mask & row_mask and not check_all:
+            continue
+        for cat_a in range(len(row)):
+            for cat_b in range(cat_a + 1, len(row)):
+                key = (row[cat_a], row[cat_b])
+                if key not in pairs_by_codes:
+                    continue
+                breakers = pairs_by_codes[key]
+                if breakers is not None and all(row[cat] == code for cat, code in breakers):
+                    continue
+                found.append((token_idx, row[cat_a], cat_a, row[cat_b], cat_b))
+    return found
+
+
+def _token_genders(matrix: CodeMatrix) -> Tuple[List[int], List[str]]:
+    """Gender index per token (the Generator's rule: Gender trait, else Body's gender tag, else Unknown)."""
+    gender_names, gender_codes = _gender_tables(matrix)
+    config = matrix.config
+    gender_column = matrix.columns[config.category_index["Gender"]] if "Gender" in config.category_index else None
+    body_column = matrix.columns[config.category_index["Body"]] if "Body" in config.category_index else None
+    unknown = gender_names.index("Unknown")
+    gender_of = []
+    for token_idx in range(matrix.token_total):
+        if gender_column is not None and gender_column[token_idx] != MISSING:
+            gender_of.append(gender_codes[gender_column[token_idx]])
+        elif body_column is not None and body_column[token_idx] != MISSING:
+            gender_of.append(gender_codes[body_column[token_idx]])
+        else:
+            gender_of.append(unknown)
+    return gender_of, gender_names
+
+
+def _gender_tables(matrix: CodeMatrix) -> Tuple[List[str], Dict[int, int]]:
+    """Gender names in use and, for each Gender and Body code, the index of the gender it gives a token."""
+    config = matrix.config
+    gender_names = ["Unknown"]
+    gender_codes: Dict[int, int] = {}
+
+    def gender_index(name: str) -> int:
+        if name not in gender_names:
+            gender_names.append(name)
+        return gender_names.index(name)
+
+    for cat_name in ("Gender", "Body"):
+        cat_id = config.category_index.get(cat_name)
+        if cat_id is None:
+            continue
+        codes = list(config.category_trait_ids[cat_id]) + [code for code in range(config.trait_total, config.trait_total + len(matrix.extra_names))
+                                                             if matrix.extra_names[code - config.trait_total][0] == cat_name]
+        for code in codes:
+            if cat_name == "Gender":
+                gender_codes[code] = gender_index(matrix.trait_name(code))
+            else:
+                body_gender = config.trait_gender_name(code) if code < config.trait_total else None
+                gender_codes[code] = gender_index(body_gender or "Unknown")
+    return gender_names, gender_codes
+
+
+def _required_categories(matrix: CodeMatrix, masks, gender_names: List[str]) -> List[List[bool]]:
+    """required[cat_id][gender] is True if a token of that gender must have the category."""
+    config = matrix.config
+    required = []
+    for cat_id, spec in enumerate(config.category_gender_spec):
+        required.append([
+            bool(config.category_trait_ids[cat_id]) and (not spec or (gender != "Unknown" and gender == spec))
+            and masks.candidate_mask(cat_id, gender) != 0
+            for gender in gender_names
+        ])
+    return required
+
+
+def _find_missing(matrix: CodeMatrix, masks, gender_of: List[int], gender_names: List[str]) -> List[Tuple[int, int]]:
+    required = _required_categories(matrix, masks, gender_names)
+    missing = []
+    for cat_id, column in enumerate(matrix.columns):
+        if MISSING in column:
+            missing.extend((token_idx, cat_id) for token_idx, code in enumerate(column) if code == MISSING and required[cat_id][gender_of[token_idx]])
+    missing.sort()
+    return missing
+
+
+def _find_duplicates_numpy(codes) -> Tuple[List[Tuple[int, int]], int]:
+    # Stable lexicographic sort of the rows: equal rows end up adjacent, earliest token first.
+    order = np.lexsort(codes[::-1])
+    sorted_codes = codes[:, order]
+    starts_group = np.ones(len(order), dtype=bool)
+    starts_group[1:] = (sorted_codes[:, 1:] != sorted_codes[:, :-1]).any(axis=0)
+    group_first = order[starts_group][np.cumsum(starts_group) - 1]
+    duplicates = sorted(zip(order[~starts_group].tolist(), group_first[~starts_group].tolist()))
+    return duplicates, int(starts_group.sum())
+
+
+def _find_incompatibilities_numpy(codes, matrix: CodeMatrix, compiled_rules) -> List[Tuple[int, int, int, int, int]]:
+    found = []
+    for cat_a, code_a, cat_b, code_b, breakers in _checked_pairs(matrix, compiled_rules):
+        hits = (codes[cat_a] == code_a) & (codes[cat_b] == code_b)
+        if breakers is not None and hits.any():
+            broken = np.ones_like(hits)
+            for cat, code in breakers:
+                broken &= codes[cat] == code
+            hits &= ~broken
+        found.extend((token_idx, code_a, cat_a, code_b, cat_b) for token_idx in np.nonzero(hits)[0].tolist())
+    found.sort(key=lambda v: (v[0], v[2], v[4]))
+    return found
+
+
+def _token_genders_numpy(codes, matrix: CodeMatrix) -> Tuple[List[int], List[str]]:
+    gender_names, gender_codes = _gender_tables(matrix)
+    config = matrix.config
+    gender_of = np.zeros(matrix.token_total, dtype=np.int64) # 0 is "Unknown"
+    assigned = np.zeros(matrix.token_total, dtype=bool)
+    for cat_name in ("Gender", "Body"):
+        cat_id = config.category_index.get(cat_name)
+        if cat_id is None:
+            continue
+        lookup = np.zeros(config.trait_total + len(matrix.extra_names), dtype=np.int64) # Indexed only where the code is not MISSING
+        for code, gender in gender_codes.items():
+            if code in config.category_trait_ids[cat_id] or (code >= config.trait_total and matrix.extra_names[code - config.trait_total][0] == cat_name):
+                lookup[code] = gender
+        column = codes[cat_id]
+        present = (column != MISSING) & ~assigned
+        gender_of[present] = lookup[column[present]]
+        assigned |= present
+    return gender_of.tolist(), gender_names
+
+
+def _find_missing_numpy(codes, matrix: CodeMatrix, masks, gender_of: List[int], gender_names: List[str]) -> List[Tuple[int, int]]:
+    required = np.array(_required_categories(matrix, masks, gender_names), dtype=bool) # category x gender
+    genders = np.asarray(gender_of, dtype=np.int64)
+    missing_mask = (codes == MISSING) & required[:, genders]
+    cat_ids, token_indices = np.nonzero(missing_mask)
+    return sorted(zip(token_indices.tolist(), cat_ids.tolist()))
@@ -0,0 +1,48 @@
+# tests/test_adjustment_index.py
+"""
+Unit tests for the inverted trait index and deviation queues used by the adjustment phase.
+"""
+
+try:
+    from src.adjustment_index import TraitTokenIndex, DeviationQueue
+    from src.compiled_config import CompiledConfig
+except ImportError:
+    import sys
+    import os
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+    from src.adjustment_index import TraitTokenIndex, DeviationQueue
+    from src.compiled_config import CompiledConfig
+
+
+def test_trait_token_index_tracks_moves():
+    config = CompiledConfig({"target_count": 3, "categories": {
+        "Hat": {"traits": {"Cap": {"target_count": 1, "tolerance": 0}, "Fedora": {"target_count": 2, "tolerance": 0}}},
+    }})
+    tokens_data = [{"traits": {"Hat": "Cap"}}, {"traits": {"Hat": "Cap"}}, {"traits": {"Hat": "Fedora", "Unknown": "x"}}]
+    index = TraitTokenIndex(config, tokens_data)
+    cap, fedora = config.trait_id("Hat", "Cap"), config.trait_id("Hat", "Fedora")
+    assert index.tokens_with(cap) == {0, 1}
+    index.move(1, cap, fedora)
+    assert index.tokens_with(cap) == {0}
+    assert index.tokens_with(fedora) == {1, 2}
+
+
+def test_deviation_queue_orders_and_invalidates():
+    queue = DeviationQueue()
+    queue.update(0, 3)
+    queue.update(1, 5)
+    queue.update(2, -1) # Not queued
+    queue.update(1, 2)  # Supersedes the earlier entry for trait 1
+    assert queue.peek() == (3, 0)
+    assert queue.pop_above(1) == [(3, 0), (2, 1)]
+    assert queue.pop() is None
+
+
+def test_deviation_queue_pop_above_leaves_lower_entries():
+    queue = DeviationQueue()
+    for trait_id, deviation in [(4, 1), (5, 4), (6, 2)]:
+        queue.update(trait_id, deviation)
+    assert queue.pop_above(1) == [(4, 5), (2, 6)]
+    assert queue.pop() == (1, 4)
+    queue.update(4, 0)
+    assert queue.peek() is None
@@ -0,0 +1,65 @@
+# tests/test_bundle.py
+"""
+Tests for the packed metadata bundle: BundleWriter, the mmap BundleReader and lossless unpacking.
+"""
+import json
+import os
+import pytest
+
+try:
+    from src.bundle import BundleWriter, BundleReader, BUNDLE_NAME
+    from src.exporter import Exporter, unpack_bundle
+    from src.models import Token
+except ImportError:
+    import sys
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+    from src.bundle import BundleWriter, BundleReader, BUNDLE_NAME
+    from src.exporter import Exporter, unpack_bundle
+    from src.models import Token
+
+
+def test_reader_returns_any_token_without_parsing_the_rest(tmp_path):
+    path = str(tmp_path / "tokens.bundle")
+    documents = [(str(i).zfill(2 if i < 50 else 3), json.dumps({"token_id": str(i), "name": "Quéen" * (i % 3)})) for i in range(120)]
+    with BundleWriter(path) as writer:
+        for token_id, document in documents:
+            writer.add(token_id, document)
+    assert not os.path.exists(path + ".tmp")
+    with BundleReader(path) as reader:
+        assert len(reader) == 120 and reader.id_width == 3
+        assert reader.document(77) == documents[77][1].encode("utf-8")
+        assert reader[5] == json.loads(documents[5][1]) and reader.token_id(5) == "05"
+        assert reader.get("101") == json.loads(documents[101][1]) and reader.index_of("07") == 7
+        assert [token["token_id"] for token in reader] == [str(i) for i in range(120)]
+        with pytest.raises(IndexError):
+            reader.document(120)
+        with pytest.raises(KeyError):
+            reader.get("999")
+
+
+def test_failed_write_leaves_no_bundle(tmp_path):
+    path = str(tmp_path / "tokens.bundle")
+    with pytest.raises(RuntimeError):
+        with BundleWriter(path) as writer:
+            writer.add("1", "{}")
+            raise RuntimeError("interrupted")
+    assert os.listdir(tmp_path) == []
+    (tmp_path / "other").write_bytes(b"{}")
+    with pytest.raises(ValueError):
+        BundleReader(str(tmp_path / "other"))
+
+
+@pytest.mark.parametrize("json_layout", ["flat", "sharded"])
+def test_export_bundle_unpacks_to_the_json_files(tmp_path, json_layout):
+    tokens = [Token(str(i + 1).zfill(4), {"Body": f"Body {i % 9}", "Hat": "Cap"}, law_number=i % 5 or None) for i in range(1500)]
+    exporter = Exporter(output_dir_base=str(tmp_path / "output"), json_layout=json_layout, bundle=True, max_workers=2)
+    exporter.export_tokens(tokens, ["Body", "Hat"])
+    json_dir = os.path.join(exporter.versioned_output_dir, "json")
+    unpacked_dir = str(tmp_path / "unpacked")
+    assert unpack_bundle(os.path.join(exporter.versioned_output_dir, BUNDLE_NAME), unpacked_dir, json_layout) == 1500
+    for dir_path, _, file_names in os.walk(json_dir):
+        for file_name in file_names:
+            relative_path = os.path.relpath(os.path.join(dir_path, file_name), json_dir)
+            with open(os.path.join(json_dir, relative_path), 'rb') as exported, open(os.path.join(unpacked_dir, relative_path), 'rb') as unpacked:
+                assert exported.read() == unpacked.read()
+    assert sum(len(file_names) for _, _, file_names in os.walk(unpacked_dir)) == 1500
@@ -0,0 +1,74 @@
+# tests/test_category_order.py
+"""
+Tests for the dynamic (most-constrained-first) category order of the weighted fill.
+"""
+import os
+import pytest
+
+try:
+    from src.generator import Generator
+    from src.pre_validator import load_yaml_config
+except ImportError:
+    import sys
+    import os
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+    from src.generator import Generator
+    from src.pre_validator import load_yaml_config
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+NUMEROLOGY = {
+    "target_count": 4,
+    "categories": {
+        "Gender": {"traits": {"Male": {"target_count": 2, "tolerance": 0}, "Female": {"target_count": 2, "tolerance": 0}}},
+        "Eyes": {"traits": {"Blue": {"target_count": 2, "tolerance": 0}, "Green": {"target_count": 1, "tolerance": 0}, "Red": {"target_count": 1, "tolerance": 0}}},
+        "Hat": {"traits": {"Cap": {"target_count": 2, "tolerance": 0}, "Beret": {"target_count": 2, "tolerance": 0}}},
+        "Masks": {"traits": {"Veil": {"target_count": 2, "tolerance": 0, "gender": "Female"}, "Bandana": {"target_count": 2, "tolerance": 0}}},
+    }
+}
+RULES = {"incompatibilities": [{"trait_a": ["Hat", "Cap"], "trait_b": ["Masks", "Bandana"]}]}
+
+
+def make_generator(**kwargs):
+    generator = Generator(NUMEROLOGY, RULES, seed=1, log_callback=lambda m: None, category_order="dynamic", **kwargs)
+    for trait_id in range(generator.compiled_config.trait_total):
+        generator._refresh_under_target(trait_id)
+    return generator
+
+
+def test_unknown_category_order_is_rejected():
+    with pytest.raises(ValueError):
+        Generator(NUMEROLOGY, RULES, category_order="random")
+
+
+def test_most_constrained_category_goes_first():
+    generator = make_generator()
+    config = generator.compiled_config
+    pending = ["Gender", "Eyes", "Hat", "Masks"]
+    assert generator._pop_most_constrained_category(pending, {}, []) == "Gender" # Gender-deciding categories first
+
+    traits = {"Gender": "Male", "Hat": "Cap"}
+    assigned_ids = [config.trait_id("Gender", "Male"), config.trait_id("Hat", "Cap")]
+    # Masks: Veil is Female-only and Bandana is forbidden by Cap, so it has no valid traits left.
+    assert generator._pop_most_constrained_category(pending, traits, assigned_ids) == "Hat" # Already assigned: returned for skipping
+    assert generator._pop_most_constrained_category(pending, traits, assigned_ids) == "Masks"
+
+    generator.trait_counts[("Eyes", "Blue")] = 2
+    generator._refresh_under_target(config.trait_id("Eyes", "Blue"))
+    traits = {"Gender": "Female"}
+    assigned_ids = [config.trait_id("Gender", "Female")]
+    # Eyes has 2 traits below target, Hat 2 and Masks 2: the tie keeps the static order.
+    assert generator._pop_most_constrained_category(["Hat", "Eyes", "Masks"], traits, assigned_ids) == "Hat"
+    generator.trait_counts[("Eyes", "Red")] = 1
+    generator._refresh_under_target(config.trait_id("Eyes", "Red"))
+    assert generator._pop_most_constrained_category(["Hat", "Eyes", "Masks"], traits, assigned_ids) == "Eyes"
+
+
+@pytest.mark.parametrize("seed", [1, 2])
+def test_dynamic_order_generates_complete_valid_collection(seed):
+    numerology = load_yaml_config(os.path.join(PROJECT_ROOT, "numerology.yaml"))
+    rules = load_yaml_config(os.path.join(PROJECT_ROOT, "rules.yaml"))
+    generator = Generator(numerology, rules, seed=seed, log_callback=lambda m: None, category_order="dynamic")
+    tokens = generator.generate_tokens() # Final validation raises on duplicates, rule violations and missing categories
+    assert len(tokens) == 420
+    assert len({tuple(sorted(token.traits.items())) for token in tokens}) == 420
@@ -0,0 +1,63 @@
+# tests/test_column_sampling.py
+"""
+Tests for whole-column quota draws of free categories in the weighted fill.
+"""
+import os
+from collections import Counter
+import pytest
+
+try:
+    from src.column_sampling import free_category_ids, draw_quota_column
+    from src.pre_validator import load_yaml_config
+    from src.generator import Generator
+except ImportError:
+    import sys
+    import os
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+    from src.column_sampling import free_category_ids, draw_quota_column
+    from src.pre_validator import load_yaml_config
+    from src.generator import Generator
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def load_project_configs():
+    return (load_yaml_config(os.path.join(PROJECT_ROOT, "numerology.yaml")),
+            load_yaml_config(os.path.join(PROJECT_ROOT, "rules.yaml")))
+
+
+def test_only_unconstrained_categories_are_free():
+    numerology, rules = load_project_configs()
+    generator = Generator(numerology, rules, seed=1, log_callback=lambda m: None)
+    config = generator.compiled_config
+    free_names = [config.category_names[cat_id] for cat_id in free_category_ids(config, generator.constraint_masks)]
+    assert free_names == ["Gender"] # Every other category has rule partners or gender-tagged traits
+
+
+def test_column_matching_its_deck_hits_every_quota():
+    column = draw_quota_column([4, 5, 6], [10, 0, 25], [4, 6], 35, seed=3)
+    assert Counter(column) == {4: 10, 6: 25}
+    assert column == draw_quota_column([4, 5, 6], [10, 0, 25], [4, 6], 35, seed=3)
+    assert column != sorted(column)
+
+
+def test_column_smaller_than_deck_stays_within_quotas():
+    counts = Counter(draw_quota_column([0, 1, 2], [5, 5, 5], [0, 1, 2], 9, seed=1))
+    assert sum(counts.values()) == 9 and all(count <= 5 for count in counts.values())
+
+
+def test_column_larger_than_deck_is_padded_from_fallback():
+    counts = Counter(draw_quota_column([0, 1, 2], [3, 0, 1], [0, 2], 10, seed=1))
+    assert sum(counts.values()) == 10 and counts[0] >= 3 and counts[2] >= 1 and counts[1] == 0
+    with pytest.raises(ValueError):
+        draw_quota_column([0], [1], [], 2, seed=1)
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_generator_draws_free_columns_to_target(seed):
+    numerology, rules = load_project_configs()
+    generator = Generator(numerology, rules, seed=seed, log_callback=lambda m: None, column_sampling=True)
+    tokens = generator.generate_tokens()
+    assert len(tokens) == generator.target_collection_size
+    for gender, trait in numerology["categories"]["Gender"]["traits"].items():
+        assert generator.trait_counts[("Gender", gender)] == trait["target_count"]
@@ -0,0 +1,83 @@
+# tests/test_combination_index.py
+"""
+Tests for the fingerprint index that keeps token trait combinations unique during generation.
+"""
+import pytest
+
+try:
+    from src.combination_index import CombinationIndex
+    from src.compiled_config import CompiledConfig
+    from src.generator import Generator
+    from src.token_state import TokenStates
+except ImportError:
+    import sys
+    import os
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+    from src.combination_index import CombinationIndex
+    from src.compiled_config import CompiledConfig
+    from src.generator import Generator
+    from src.token_state import TokenStates
+
+
+NUMEROLOGY = {
+    "target_count": 6,
+    "categories": {
+        "Hat": {"traits": {"Cap": {"target_count": 2, "tolerance": 1}, "Fedora": {"target_count": 2, "tolerance": 1}, "Beret": {"target_count": 2, "tolerance": 1}}},
+        "Eyes": {"traits": {"Blue": {"target_count": 2, "tolerance": 1}, "Green": {"target_count": 2, "tolerance": 1}, "Brown": {"target_count": 2, "tolerance": 1}}},
+    }
+}
+
+
+def test_index_tracks_trait_changes():
+    tokens_data = [{"traits": {"Hat": "Cap", "Eyes": "Blue"}}, {"traits": {"Hat": "Cap", "Eyes": "Green"}}]
+    index = CombinationIndex(CompiledConfig(NUMEROLOGY), tokens_data)
+    index.add(0)
+    index.add(1)
+    assert index.duplicate_tokens() == []
+    assert index.would_duplicate(1, "Eyes", "Blue") == True
+    assert index.would_duplicate(1, "Hat", "Fedora") == False
+    assert index.find_duplicate({"Eyes": "Blue", "Hat": "Cap"}) == 0
+
+    tokens_data[1]["traits"]["Eyes"] = "Blue"
+    index.update_trait(1, "Eyes", "Green", "Blue")
+    assert index.is_duplicate(1) and index.is_duplicate(0)
+    assert index.duplicate_tokens() == [1]
+    index.remove(1)
+    assert index.duplicate_tokens() == []
+    assert len(index) == 1
+
+
+def test_unknown_traits_are_compared_exactly():
+    tokens_data = [{"traits": {"Hat": "Cap", "Aura": "Gold"}}, {"traits": {"Hat": "Cap", "Aura": "Silver"}}]
+    index = CombinationIndex(CompiledConfig(NUMEROLOGY), tokens_data)
+    index.add(0)
+    index.add(1)
+    assert index.fingerprint(tokens_data[0]["traits"]) == index.fingerprint(tokens_data[1]["traits"])
+    assert index.duplicate_tokens() == []
+
+
+@pytest.mark.parametrize("adjustment_mode", ["greedy", "flow"])
+def test_generated_tokens_are_unique(adjustment_mode):
+    # 6 tokens drawn from 9 combinations: fill collides often and must resample.
+    for seed in range(20):
+        generator = Generator(NUMEROLOGY, {}, seed=seed, log_callback=lambda m: None, adjustment_mode=adjustment_mode)
+        tokens = generator.generate_tokens() # Final validation raises on duplicates
+        assert len({tuple(sorted(t.traits.items())) for t in tokens}) == len(tokens)
+        assert generator.combination_index.duplicate_tokens() == []
+
+
+def test_resample_never_exceeds_a_strict_cap():
+    numerology = {"target_count": 2, "categories": {
+        "Rank": {"traits": {"Ace": {"target_count": 1, "tolerance": 0}, "Joker / Wildcard": {"target_count": 1, "tolerance": 0}}},
+        "Hat": {"traits": {"Cap": {"target_count": 2, "tolerance": 0}}},
+    }}
+    generator = Generator(numerology, {}, seed=1, log_callback=lambda m: None)
+    generator.tokens_data = [{"token_id": str(i + 1), "traits": {"Rank": "Ace", "Hat": "Cap"}, "law_number": None} for i in range(2)]
+    generator.combination_index = CombinationIndex(generator.compiled_config, generator.tokens_data)
+    generator.token_states = TokenStates(generator.compiled_config, generator.tokens_data)
+    generator.combination_index.add(0)
+    generator.trait_counts[("Rank", "Ace")] = 2
+    generator.trait_counts[("Rank", "Joker / Wildcard")] = 1 # At its cap: the only other Rank must not be drawn
+    generator.trait_counts[("Hat", "Cap")] = 2
+    assert not generator._resample_duplicate_token(1, ["Rank"], 0, generator._substream("fill", 1))
+    assert generator.tokens_data[1]["traits"]["Rank"] == "Ace" and generator.trait_counts[("Rank", "Joker / Wildcard")] == 1
@@ -0,0 +1,82 @@
+# tests/test_compiled_config.py
+"""
+Unit tests for the integer-interned CompiledConfig and the array-backed TraitCounts.
+"""
+import pytest
+from typing import Dict, Any
+
+try:
+    from src.compiled_config import CompiledConfig, TraitCounts, GENDER_NONE, GENDER_UNISEX
+except ImportError:
+    import sys
+    import os
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+    from src.compiled_config import CompiledConfig, TraitCounts, GENDER_NONE, GENDER_UNISEX
+
+
+@pytest.fixture
+def numerology_config() -> Dict[str, Any]:
+    return {
+        "target_count": 4,
+        "categories": {
+            "Gender": {"traits": {
+                "Male": {"target_count": 2, "tolerance": 1},
+                "Female": {"target_count": 2, "tolerance": 0},
+            }},
+            "Hat": {"gender_specific_to": "Male", "traits": {
+                "Fedora": {"target_count": 1, "tolerance": 0, "gender": "Male"},
+                "Cap": {"target_count": 1, "tolerance": 0, "gender": "unisex"},
+            }},
+            "Glyph": {"traits": {
+                "glyph_05": {"target_count": 1, "tolerance": 0},
+                "blank": {"target_count": 3, "tolerance": 1},
+            }},
+        }
+    }
+
+
+def test_trait_ids_are_dense_and_grouped_by_category(numerology_config):
+    config = CompiledConfig(numerology_config)
+    assert config.category_names == ["Gender", "Hat", "Glyph"]
+    assert config.trait_total == 6
+    assert list(config.traits_of("Hat")) == [2, 3]
+    assert config.trait_id("Glyph", "blank") == 5
+    assert config.trait_key(5) == ("Glyph", "blank")
+    assert config.trait_id("Hat", "Beret") is None
+    assert list(config.target_counts) == [2, 2, 1, 1, 1, 3]
+    assert list(config.tolerances) == [1, 0, 0, 0, 0, 1]
+    assert config.category_gender_spec == [None, "Male", None]
+
+
+def test_gender_tags_and_flexible_unisex(numerology_config):
+    config = CompiledConfig(numerology_config)
+    fedora, cap = config.trait_id("Hat", "Fedora"), config.trait_id("Hat", "Cap")
+    assert config.trait_genders[cap] == GENDER_UNISEX
+    assert config.trait_genders[config.trait_id("Gender", "Male")] == GENDER_NONE
+    assert config.trait_gender_name(fedora) == "Male"
+    assert config.is_trait_gender_allowed(fedora, "Male") == True
+    assert config.is_trait_gender_allowed(fedora, "Female") == False
+    assert config.is_trait_gender_allowed(fedora, "Unisex") == True
+    assert config.is_trait_gender_allowed(cap, "Female") == True
+    assert config.is_trait_gender_allowed(cap, "Unknown") == False
+
+
+def test_glyph_law_numbers(numerology_config):
+    config = CompiledConfig(numerology_config)
+    assert config.law_number(config.trait_id("Glyph", "glyph_05")) == 5
+    assert config.law_number(config.trait_id("Glyph", "blank")) is None
+    assert config.law_number(config.trait_id("Gender", "Male")) is None
+
+
+def test_trait_counts_mapping_interface(numerology_config):
+    config = CompiledConfig(numerology_config)
+    counts = TraitCounts(config)
+    counts.counts[config.trait_id("Hat", "Cap")] += 2
+    counts[("Gender", "Male")] = 3
+    assert counts[("Hat", "Cap")] == 2
+    assert counts.get(("Gender", "Male")) == 3
+    assert counts.get(("Hat", "Beret"), 0) == 0
+    assert dict(counts.items())[("Gender", "Male")] == 3
+    assert len(counts) == config.trait_total
+    counts.reset()
+    assert sum(counts.values()) == 0
@@ -0,0 +1,65 @@
+# tests/test_deck_allocation.py
+"""
+Tests for the deck-dealing allocation mode: exact-count decks split over gender partitions.
+"""
+import os
+import pytest
+
+try:
+    from src.deck_allocation import split_deck, deal
+    from src.generator import Generator
+    from src.pre_validator import load_yaml_config
+except ImportError:
+    import sys
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+    from src.deck_allocation import split_deck, deal
+    from src.generator import Generator
+    from src.pre_validator import load_yaml_config
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def test_split_deck_fills_partitions_exactly():
+    # Partitions: 0 = Male (4 tokens), 1 = Female (4), 2 = Unisex (2)
+    copies = [4, 4, 2]                  # Male trait, Female trait, Unisex trait
+    allowed = [[0, 2], [1, 2], [0, 1, 2]]
+    placed = split_deck(copies, allowed, [4, 4, 2])
+    assert [sum(row) for row in placed] == copies
+    assert [sum(row[p] for row in placed) for p in range(3)] == [4, 4, 2]
+    assert placed[0][1] == 0 and placed[1][0] == 0
+
+
+def test_split_deck_augments_when_proportional_split_strands_cards():
+    # Trait 0 is spread over partitions 0 and 2, leaving partition 0 one card short for trait 1;
+    # an augmenting path moves a trait 0 card over to partition 2.
+    copies, allowed, capacities = [2, 2, 2], [[0, 2], [0, 1], [2]], [3, 0, 3]
+    placed = split_deck(copies, allowed, capacities)
+    assert placed == [[1, 0, 1], [2, 0, 0], [0, 0, 2]]
+    assert [sum(row) for row in placed] == copies
+
+
+def test_deal_skips_cards_a_token_cannot_take():
+    cards = [0, 1, 1]
+    dealt, undealt = deal(cards, [10, 11, 12], lambda token_idx: 0b01 if token_idx == 10 else 0b10)
+    assert sorted(dealt) == [(10, 0), (11, 1), (12, 1)]
+    assert undealt == [] and cards == []
+
+    cards = [1]
+    dealt, undealt = deal(cards, [10], lambda token_idx: 0b01)
+    assert dealt == [] and undealt == [10] and cards == [1]
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3, 4, 5])
+def test_deck_mode_hits_every_target_exactly(seed):
+    numerology = load_yaml_config(os.path.join(PROJECT_ROOT, "numerology.yaml"))
+    rules = load_yaml_config(os.path.join(PROJECT_ROOT, "rules.yaml"))
+    generator = Generator(numerology, rules, seed=seed, log_callback=lambda m: None, allocation_mode="deck")
+    tokens = generator.generate_tokens() # Final validation raises on duplicates and rule violations
+    config = generator.compiled_config
+    assert list(generator.trait_counts.counts) == list(config.target_counts)
+    assert len(tokens) == 420
+
+
+def test_unknown_allocation_mode_is_rejected():
+    with pytest.raises(ValueError):
+        Generator({"target_count": 1, "categories": {}}, {}, allocation_mode="lottery")
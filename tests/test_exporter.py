@@ -0,0 +1,93 @@
+# tests/test_exporter.py
+"""
+Tests for the Exporter's JSON writer: the fixed-schema serializer, the batched atomic export and the JSON layouts.
+"""
+import json
+import os
+import pytest
+
+try:
+    from src import exporter as exporter_module
+    from src.exporter import Exporter, render_token_json, token_json_path, MANIFEST_NAME
+    from src.models import Token
+except ImportError:
+    import sys
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+    from src import exporter as exporter_module
+    from src.exporter import Exporter, render_token_json, token_json_path, MANIFEST_NAME
+    from src.models import Token
+
+CATEGORIES = ["Background", "Body", "Hat"]
+
+
+def make_tokens(count):
+    tokens = [Token(str(i + 1).zfill(3), {"Background": f"Wall {i % 4}", "Body": "Robot" if i % 2 else "Quéen"}) for i in range(count)]
+    tokens[0].traits = {}
+    tokens[1].law_number = 12
+    tokens[1].special_abilities = ["Stealth", "Luck \"7\""]
+    return tokens
+
+
+@pytest.mark.parametrize("traits, metadata", [
+    ({"Body": "Robot", "Hat": "Ca\\p \"x\" ü"}, {"power_tier": "Common", "power_score": 10, "law_number": None, "trait_count": 2,
+                                                  "special_abilities": [], "set_bonuses": ["Full Set"]}),
+    ({}, {"power_tier": "Rare", "power_score": -3, "law_number": 7, "trait_count": 0, "special_abilities": ["A", "B"], "set_bonuses": []}),
+])
+def test_render_matches_json_dump(traits, metadata):
+    document = {"token_id": "007", "hash_id": "ab12", "traits": traits, "metadata": metadata}
+    assert render_token_json("007", "ab12", traits, metadata) == json.dumps(document, indent=4)
+    assert render_token_json("007", "ab12", traits, metadata, compact=True) == json.dumps(document, separators=(",", ":"))
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_export_writes_every_token(tmp_path, monkeypatch, compact):
+    monkeypatch.setattr(exporter_module, "JSON_BATCH_SIZE", 3)
+    tokens = make_tokens(10)
+    exporter = Exporter(output_dir_base=str(tmp_path / "output"), compact_json=compact, max_workers=4)
+    exporter.export_tokens(tokens, CATEGORIES)
+    assert sorted(os.listdir(exporter.versioned_output_dir)) == ["json", MANIFEST_NAME, "metadata.csv"] # No staging directory left
+    json_dir = os.path.join(exporter.versioned_output_dir, "json")
+    assert sorted(os.listdir(json_dir)) == [f"{token.token_id}.json" for token in tokens]
+    for token in tokens:
+        with open(os.path.join(json_dir, f"{token.token_id}.json")) as f:
+            text = f.read()
+        data = json.loads(text)
+        assert (text.count("\n") == 0) == compact
+        assert data["hash_id"] == token.hash_id and data["traits"] == token.traits
+        assert data["metadata"]["law_number"] == token.law_number and data["metadata"]["trait_count"] == len(token.traits)
+        assert data["metadata"]["special_abilities"] == token.special_abilities
+
+
+def test_failed_export_leaves_no_json_directory(tmp_path, monkeypatch):
+    def fail(batch):
+        raise OSError("disk full")
+    monkeypatch.setattr(exporter_module, "_write_json_batch", fail)
+    exporter = Exporter(output_dir_base=str(tmp_path / "output"))
+    with pytest.raises(OSError):
+        exporter.export_tokens(make_tokens(3), CATEGORIES)
+    assert os.listdir(exporter.versioned_output_dir) == []
+
+
+def test_token_json_path():
+    assert token_json_path("012345") == "012345.json"
+    assert token_json_path("012345", "sharded") == "012/012345.json"
+    assert token_json_path("042", "sharded") == "0/042.json" # IDs of up to SHARD_DIGITS characters share shard "0"
+
+
+def test_sharded_layout_and_manifest(tmp_path, monkeypatch):
+    monkeypatch.setattr(exporter_module, "JSON_BATCH_SIZE", 500)
+    tokens = [Token(str(i + 1).zfill(6), {"Body": f"Body {i}"}) for i in range(2100)]
+    exporter = Exporter(output_dir_base=str(tmp_path / "output"), json_layout="sharded", max_workers=2)
+    exporter.export_tokens(tokens, CATEGORIES)
+    json_dir = os.path.join(exporter.versioned_output_dir, "json")
+    assert sorted(os.listdir(json_dir)) == ["000", "001", "002"]
+    assert len(os.listdir(os.path.join(json_dir, "001"))) == 1000
+    with open(os.path.join(exporter.versioned_output_dir, MANIFEST_NAME)) as f:
+        manifest = json.load(f)
+    assert manifest["layout"] == "sharded" and manifest["token_count"] == 2100
+    assert manifest["files"]["001234"] == "001/001234.json"
+    for token in tokens[::97]:
+        with open(os.path.join(json_dir, manifest["files"][token.token_id])) as f:
+            assert json.load(f)["traits"] == token.traits
+    with pytest.raises(ValueError):
+        Exporter(output_dir_base=str(tmp_path / "other"), json_layout="nested")
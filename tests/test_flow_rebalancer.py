@@ -0,0 +1,74 @@
+# tests/test_flow_rebalancer.py
+"""
+Unit tests for the per-category flow rebalancing network and the Generator's "flow" mode.
+"""
+import pytest
+
+try:
+    from src.flow_rebalancer import CategoryFlowNetwork
+    from src.generator import Generator
+except ImportError:
+    import sys
+    import os
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+    from src.flow_rebalancer import CategoryFlowNetwork
+    from src.generator import Generator
+
+
+def test_direct_move_fixes_both_bounds():
+    # Traits 0..2; trait 0 holds everything, traits 1 and 2 need one token each.
+    network = CategoryFlowNetwork(range(0, 3), [1, 1, 1], [1, 1, 1])
+    for token_idx in range(3):
+        network.add_token(token_idx, 0, 0b111)
+    moves, unresolved = network.rebalance()
+    assert unresolved == []
+    assert len(moves) == 2
+    assert network.counts == [1, 1, 1]
+
+
+def test_augmenting_path_through_intermediate_trait():
+    # Token 0 (trait 0) may only move to trait 1; token 1 (trait 1) may move to trait 2.
+    network = CategoryFlowNetwork(range(10, 13), [0, 0, 1], [0, 1, 1])
+    network.add_token(0, 10, 1 << 11)
+    network.add_token(1, 11, 1 << 12)
+    moves, unresolved = network.rebalance()
+    assert unresolved == []
+    assert moves == [(1, 11, 12), (0, 10, 11)]
+
+
+def test_ineligible_tokens_leave_trait_unresolved():
+    network = CategoryFlowNetwork(range(0, 2), [0, 1], [2, 1])
+    network.add_token(0, 0, 0) # May not move at all
+    moves, unresolved = network.rebalance()
+    assert moves == []
+    assert unresolved == [1]
+
+
+def test_generator_flow_mode_meets_targets_and_rules():
+    numerology = {
+        "target_count": 6,
+        "categories": {
+            "Gender": {"traits": {"Male": {"target_count": 3, "tolerance": 0}, "Female": {"target_count": 3, "tolerance": 0}}},
+            "Hat": {"traits": {
+                "Fedora": {"target_count": 2, "tolerance": 0, "gender": "Male"},
+                "Bonnet": {"target_count": 2, "tolerance": 0, "gender": "Female"},
+                "Cap": {"target_count": 2, "tolerance": 0},
+            }},
+            "Eyes": {"traits": {"Blue": {"target_count": 3, "tolerance": 0}, "Green": {"target_count": 3, "tolerance": 0}}},
+            "Background": {"traits": {f"Color {i}": {"target_count": 1, "tolerance": 0} for i in range(6)}},
+        }
+    }
+    rules = {"incompatibilities": [{"trait_a": ["Hat", "Cap"], "trait_b": ["Eyes", "Green"]}]}
+    generator = Generator(numerology, rules, seed=5, log_callback=lambda m: None, adjustment_mode="flow")
+    tokens = generator.generate_tokens()
+    config = generator.compiled_config
+    assert all(config.within_tolerance(t, c) for t, c in enumerate(generator.trait_counts.counts))
+    for token in tokens:
+        assert not (token.traits.get("Hat") == "Cap" and token.traits.get("Eyes") == "Green")
+        hat_gender = config.trait_gender_name(config.trait_id("Hat", token.traits["Hat"]))
+        assert hat_gender in (None, token.traits["Gender"])
+
+
+def test_unknown_adjustment_mode_is_rejected():
+    with pytest.raises(ValueError):
+        Generator({"target_count": 1, "categories": {}}, {}, adjustment_mode="annealing")
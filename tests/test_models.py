@@ -0,0 +1,48 @@
+# tests/test_models.py
+"""
+Tests for the canonical token hash: Token.hash_id caching and the batch hash_tokens API.
+"""
+import hashlib
+import json
+
+try:
+    from src import models
+    from src.models import Token, trait_hash, hash_tokens
+except ImportError:
+    import sys
+    import os
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+    from src import models
+    from src.models import Token, trait_hash, hash_tokens
+
+
+def test_trait_hash_is_sha1_of_sorted_json():
+    traits = {"Eyes": "Blue", "Body": "Robot"}
+    expected = hashlib.sha1(json.dumps({"Body": "Robot", "Eyes": "Blue"}, sort_keys=True).encode('utf-8')).hexdigest()
+    assert trait_hash(traits) == expected
+    assert trait_hash({}) == hashlib.sha1(b"").hexdigest()
+    assert Token("1", {"Body": "Robot", "Eyes": "Blue"}).hash_id == Token("2", traits).hash_id == expected
+
+
+def test_hash_id_is_cached_and_invalidated(monkeypatch):
+    calls = []
+    original = models.trait_hash
+    monkeypatch.setattr(models, "trait_hash", lambda traits: calls.append(1) or original(traits))
+    token = Token("1", {"Body": "Robot"})
+    first = token.hash_id
+    assert token.hash_id == first and len(calls) == 1
+    token.traits["Eyes"] = "Blue" # In-place change
+    assert token.hash_id == original({"Body": "Robot", "Eyes": "Blue"}) and len(calls) == 2
+    token.traits = {"Body": "Robot"} # Reassignment
+    assert token.hash_id == first and len(calls) == 3
+    assert Token("1", {"Body": "Robot"}) == token # The cache takes no part in equality
+
+
+def test_hash_tokens_matches_hash_id_and_fills_cache(monkeypatch):
+    monkeypatch.setattr(models, "HASH_BATCH_SIZE", 3)
+    tokens = [Token(str(i), {"Body": f"Body {i % 7}", "Eyes": f"Eyes {i % 5}"}) for i in range(20)]
+    expected = [trait_hash(token.traits) for token in tokens]
+    assert hash_tokens(tokens, max_workers=4) == expected # Threaded batches keep the input order
+    assert all(token._hash_cache[1] == hash_id for token, hash_id in zip(tokens, expected))
+    tokens[0].traits["Eyes"] = "Red"
+    assert hash_tokens(tokens, max_workers=1)[0] == trait_hash(tokens[0].traits)
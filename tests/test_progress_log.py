@@ -0,0 +1,52 @@
+# tests/test_progress_log.py
+"""
+Tests for the generator's leveled progress logging.
+"""
+import pytest
+
+try:
+    from src.progress_log import TRACE, DEBUG, INFO, WARN, parse_log_level
+    from src.generator import Generator
+except ImportError:
+    import sys
+    import os
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+    from src.progress_log import TRACE, DEBUG, INFO, WARN, parse_log_level
+    from src.generator import Generator
+
+
+NUMEROLOGY = {
+    "target_count": 2,
+    "categories": {
+        "Gender": {"traits": {"Male": {"target_count": 1, "tolerance": 0}, "Female": {"target_count": 1, "tolerance": 0}}},
+        "Accessory": {"traits": {"Watch": {"target_count": 1, "tolerance": 0}, "Ring": {"target_count": 1, "tolerance": 0}}},
+    }
+}
+
+
+def test_parse_log_level():
+    assert parse_log_level("trace") == TRACE
+    assert parse_log_level("WARN") == WARN
+    assert parse_log_level(DEBUG) == DEBUG
+    with pytest.raises(ValueError):
+        parse_log_level("verbose")
+
+
+@pytest.mark.parametrize("level, expect_debug_lines", [("INFO", False), ("DEBUG", True)])
+def test_messages_below_level_are_not_emitted(level, expect_debug_lines):
+    messages = []
+    generator = Generator(NUMEROLOGY, {"incompatibilities": []}, seed=1, log_callback=messages.append, log_level=level)
+    generator.generate_tokens()
+    assert any("Weighted Random Fill Phase starting" in m for m in messages)
+    assert any("DEBUG_FILL" in m for m in messages) == expect_debug_lines
+    assert not any("DEBUG_VALID_TRAITS" in m for m in messages)
+
+
+def test_set_log_level_updates_guards():
+    generator = Generator(NUMEROLOGY, {}, seed=1, log_callback=lambda m: None, log_level=WARN)
+    assert not generator._debug_enabled and not generator._trace_enabled
+    generator.set_log_level("trace")
+    assert generator._debug_enabled and generator._trace_enabled
+    assert generator.log_level == TRACE
+    generator.set_log_level(INFO)
+    assert not generator._debug_enabled
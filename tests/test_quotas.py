@@ -0,0 +1,91 @@
+# tests/test_quotas.py
+"""
+Tests for percentage/ratio targets and collection-size scaling of numerology.
+"""
+import os
+import pytest
+
+try:
+    from src.quotas import apportion_largest_remainder, apportion_grouped, resolve_numerology
+    from src.pre_validator import PreValidator, load_yaml_config
+    from src.generator import Generator
+except ImportError:
+    import sys
+    import os
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+    from src.quotas import apportion_largest_remainder, apportion_grouped, resolve_numerology
+    from src.pre_validator import PreValidator, load_yaml_config
+    from src.generator import Generator
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def test_largest_remainder_sums_to_total_and_stays_within_quota():
+    weights = [0.5, 0.3, 0.2]
+    for total in (0, 1, 7, 100, 4201):
+        counts = apportion_largest_remainder(weights, total)
+        assert sum(counts) == total
+        for weight, count in zip(weights, counts):
+            assert int(total * weight) <= count <= int(total * weight) + 1
+    assert apportion_largest_remainder([1, 1, 1], 4) == [2, 1, 1] # Equal remainders: earlier weight wins
+    assert apportion_largest_remainder([0, 0], 5) == [0, 0]
+
+
+def test_grouped_apportionment_matches_group_totals():
+    # Two categories with the same 3:3:1 gender split get the same per-gender totals.
+    gender_counts = apportion_largest_remainder([180, 180, 60], 1001)
+    styles = apportion_grouped([100, 80, 90, 90, 60], ["Male", "Male", "Female", "Female", "Unisex"], 1001)
+    assert [styles[0] + styles[1], styles[2] + styles[3], styles[4]] == gender_counts
+
+
+def test_percent_and_ratio_targets_are_resolved():
+    numerology = {
+        "target_count": 1000,
+        "categories": {
+            "Hat": {"traits": {
+                "Crown": {"target_count": 1, "tolerance": 0},
+                "Cap": {"target_percent": 66.6, "tolerance_percent": 5},
+                "Beret": {"target_ratio": 0.333, "tolerance": 2},
+            }}
+        }
+    }
+    resolved = resolve_numerology(numerology)
+    traits = resolved["categories"]["Hat"]["traits"]
+    assert [traits[name]["target_count"] for name in ("Crown", "Cap", "Beret")] == [1, 666, 333]
+    assert traits["Cap"]["tolerance"] == 34 # ceil(5% of 666)
+    assert "target_count" not in numerology["categories"]["Hat"]["traits"]["Cap"] # Input left untouched
+
+
+def test_config_without_shares_is_returned_unchanged():
+    numerology = {"target_count": 2, "categories": {"Hat": {"traits": {"Cap": {"target_count": 2, "tolerance": 0}}}}}
+    assert resolve_numerology(numerology) is numerology
+
+
+@pytest.mark.parametrize("size", [42, 420, 4200, 42000, 100000])
+def test_project_numerology_scales_and_validates(size):
+    numerology = load_yaml_config(os.path.join(PROJECT_ROOT, "numerology.yaml"))
+    rules = load_yaml_config(os.path.join(PROJECT_ROOT, "rules.yaml"))
+    resolved = resolve_numerology(numerology, target_count=size)
+    for cat_data in resolved["categories"].values():
+        assert sum(trait["target_count"] for trait in cat_data["traits"].values()) == size
+    assert PreValidator(resolved, rules).validate() == ["Configuration Valid"]
+
+
+def test_validator_reports_expected_range_for_scaled_glyph_tiers():
+    numerology = load_yaml_config(os.path.join(PROJECT_ROOT, "numerology.yaml"))
+    resolved = resolve_numerology(numerology, target_count=1000)
+    glyphs = resolved["categories"]["Glyph"]["traits"]
+    glyphs["glyph_01"]["target_count"] = 5 # Sovereign at 1000 tokens: 1000/420 -> expected 2-3
+    errors = PreValidator(resolved, {}).validate()
+    assert "Numerology Invariant (glyph_distribution): Glyph 'glyph_01' (Tier: Sovereign) has target_count 5, expected 2-3." in errors
+
+
+def test_sovereign_glyphs_are_seeded_for_every_copy():
+    numerology = load_yaml_config(os.path.join(PROJECT_ROOT, "numerology.yaml"))
+    rules = load_yaml_config(os.path.join(PROJECT_ROOT, "rules.yaml"))
+    generator = Generator(resolve_numerology(numerology, target_count=1260), rules, seed=1, log_callback=lambda m: None)
+    generator.generate_tokens()
+    for glyph in ("glyph_01", "glyph_05", "glyph_07"):
+        assert generator.trait_counts[("Glyph", glyph)] == 3
+    law5_tokens = [data for data in generator.tokens_data if data["law_number"] == 5]
+    assert len(law5_tokens) == 3 and all(data["traits"]["Rank"] == "Boss / Don" for data in law5_tokens)
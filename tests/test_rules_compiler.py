@@ -0,0 +1,111 @@
+# tests/test_rules_compiler.py
+"""
+Unit tests for the compiled incompatibility index used by the Generator.
+"""
+import pytest
+from typing import Dict, Any
+
+try:
+    from src.rules_compiler import CompiledRules, ConstraintMasks
+    from src.compiled_config import CompiledConfig
+except ImportError:
+    import sys
+    import os
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+    from src.rules_compiler import CompiledRules, ConstraintMasks
+    from src.compiled_config import CompiledConfig
+
+
+@pytest.fixture
+def rules_config() -> Dict[str, Any]:
+    return {
+        "incompatibilities": [
+            {"trait_a": ["Masks", "Ski Mask"], "trait_b": ["Hat", "Top Hat"]},
+            {"trait_a": ["Hat", "Top Hat"], "trait_b": ["Masks", "Ski Mask"]},  # Duplicate, reversed
+            {"trait_a": ["Body", "Zombie"], "trait_b": ["Eyes", "Sunglasses"], "breakable_by": ["Glyph", "glyph_02"]},
+            {"trait_a": ["Body", "Zombie"], "trait_b": ["Body", "Zombie"]},  # Self-incompatibility, ignored
+            "not a rule",
+        ]
+    }
+
+
+def test_pairs_are_symmetric_and_deduplicated(rules_config):
+    compiled = CompiledRules(rules_config)
+    assert len(compiled) == 2
+    assert compiled.is_compatible("Masks", "Ski Mask", "Hat", "Top Hat") == False
+    assert compiled.is_compatible("Hat", "Top Hat", "Masks", "Ski Mask") == False
+    assert compiled.lookup("Masks", "Ski Mask", "Hat", "Top Hat").rule_indices == (0, 1)
+    assert compiled.is_compatible("Masks", "Opera Mask", "Hat", "Top Hat") == True
+
+
+def test_breakable_by_is_honoured(rules_config):
+    compiled = CompiledRules(rules_config)
+    assert compiled.breaker_categories == frozenset({"Glyph"})
+    assert compiled.is_compatible("Body", "Zombie", "Eyes", "Sunglasses") == False
+    assert compiled.is_compatible("Body", "Zombie", "Eyes", "Sunglasses", token_traits={"Glyph": "glyph_03"}) == False
+    assert compiled.is_compatible("Body", "Zombie", "Eyes", "Sunglasses", token_traits={"Glyph": "glyph_02"}) == True
+
+
+def test_unbreakable_duplicate_wins_over_breakable():
+    compiled = CompiledRules({"incompatibilities": [
+        {"trait_a": ["Body", "Zombie"], "trait_b": ["Eyes", "Sunglasses"], "breakable_by": ["Glyph", "glyph_02"]},
+        {"trait_a": ["Eyes", "Sunglasses"], "trait_b": ["Body", "Zombie"]},
+    ]})
+    assert compiled.is_compatible("Body", "Zombie", "Eyes", "Sunglasses", token_traits={"Glyph": "glyph_02"}) == False
+
+
+def test_find_violation(rules_config):
+    compiled = CompiledRules(rules_config)
+    assert compiled.find_violation({"Masks": "Ski Mask", "Hat": "Top Hat", "Eyes": "Blue"}) == ("Masks", "Ski Mask", "Hat", "Top Hat")
+    assert compiled.find_violation({"Body": "Zombie", "Eyes": "Sunglasses", "Glyph": "glyph_02"}) is None
+    assert compiled.find_violation({"Body": "Zombie", "Eyes": "Sunglasses", "Glyph": "blank"}) is not None
+
+
+def test_empty_rules():
+    assert len(CompiledRules({})) == 0
+    assert len(CompiledRules(None)) == 0
+    assert CompiledRules({"incompatibilities": []}).is_compatible("Masks", "Ski Mask", "Hat", "Top Hat") == True
+
+
+@pytest.fixture
+def numerology_config() -> Dict[str, Any]:
+    return {
+        "target_count": 2,
+        "categories": {
+            "Body": {"traits": {"Zombie": {"target_count": 1, "tolerance": 0, "gender": "Male"},
+                                "Human Female": {"target_count": 1, "tolerance": 0, "gender": "Female"}}},
+            "Glyph": {"traits": {"glyph_02": {"target_count": 1, "tolerance": 0},
+                                 "blank": {"target_count": 1, "tolerance": 0}}},
+            "Eyes": {"traits": {"Sunglasses": {"target_count": 1, "tolerance": 0},
+                                "Blue": {"target_count": 1, "tolerance": 0}}},
+            "Masks": {"traits": {"Ski Mask": {"target_count": 1, "tolerance": 0},
+                                 "Opera Mask": {"target_count": 1, "tolerance": 0, "gender": "Female"}}},
+            "Hat": {"traits": {"Top Hat": {"target_count": 1, "tolerance": 0},
+                               "Beret": {"target_count": 1, "tolerance": 0}}},
+        }
+    }
+
+
+def test_constraint_masks_candidates_and_forbidden(numerology_config, rules_config):
+    config = CompiledConfig(numerology_config)
+    masks = ConstraintMasks(config, CompiledRules(rules_config))
+    masks_cat = config.category_index["Masks"]
+    names = lambda mask: [config.trait_names[t] for t in masks.iter_bits(mask)]
+
+    assert names(masks.candidate_mask(masks_cat, "Male")) == ["Ski Mask"]
+    assert names(masks.candidate_mask(masks_cat, "Unisex")) == ["Ski Mask", "Opera Mask"]
+
+    top_hat = config.trait_id("Hat", "Top Hat")
+    assert names(masks.forbidden_by([top_hat])) == ["Ski Mask"]
+    assert masks.forbidden_by([top_hat], skip_category=config.category_index["Hat"]) == 0
+
+
+def test_constraint_masks_breakable_by(numerology_config, rules_config):
+    config = CompiledConfig(numerology_config)
+    masks = ConstraintMasks(config, CompiledRules(rules_config))
+    zombie = config.trait_id("Body", "Zombie")
+    sunglasses = config.trait_id("Eyes", "Sunglasses")
+
+    assert (masks.forbidden_by([zombie]) >> sunglasses) & 1
+    assert (masks.forbidden_by([zombie, config.trait_id("Glyph", "blank")]) >> sunglasses) & 1
+    assert not (masks.forbidden_by([zombie, config.trait_id("Glyph", "glyph_02")]) >> sunglasses) & 1
@@ -0,0 +1,71 @@
+# tests/test_sampling.py
+"""
+Tests for the Fenwick-tree weighted sampler used by the weighted fill.
+"""
+import random
+import pytest
+
+try:
+    from src.sampling import FenwickSampler, MaskedTraitSampler
+    from src.compiled_config import CompiledConfig
+    from src.rules_compiler import CompiledRules, ConstraintMasks
+except ImportError:
+    import sys
+    import os
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+    from src.sampling import FenwickSampler, MaskedTraitSampler
+    from src.compiled_config import CompiledConfig
+    from src.rules_compiler import CompiledRules, ConstraintMasks
+
+
+def test_prefix_sums_follow_updates():
+    sampler = FenwickSampler([3, 0, 5, 1, 2])
+    assert [sampler.prefix_sum(end) for end in range(6)] == [0, 3, 3, 8, 9, 11]
+    sampler.update(1, 4)
+    sampler.update(4, 0)
+    assert sampler.total == 13
+    assert [sampler.prefix_sum(end) for end in range(6)] == [0, 3, 7, 12, 13, 13]
+
+
+def test_find_skips_zero_weights():
+    sampler = FenwickSampler([2, 0, 0, 3])
+    assert [sampler.find(x) for x in (0, 1.99, 2, 4.5)] == [0, 0, 3, 3]
+
+
+@pytest.mark.parametrize("size", [1, 2, 7, 16, 33])
+def test_draws_match_random_choices(size):
+    weight_rng = random.Random(size)
+    weights = [weight_rng.choice([0, 1, 1000, 5000, 17000]) for _ in range(size)]
+    weights[-1] = weights[-1] or 1
+    sampler = FenwickSampler(weights)
+    rng_a, rng_b = random.Random(42), random.Random(42)
+    for _ in range(500):
+        assert sampler.sample(rng_a) == rng_b.choices(range(size), weights=weights, k=1)[0]
+
+
+def test_masked_sampler_excludes_traits_outside_valid_mask():
+    numerology = {"target_count": 10, "categories": {
+        "Gender": {"traits": {"Male": {"target_count": 5, "tolerance": 0}, "Female": {"target_count": 5, "tolerance": 0}}},
+        "Hat": {"traits": {
+            "Cap": {"target_count": 4, "tolerance": 0},
+            "Tiara": {"target_count": 3, "tolerance": 0, "gender": "Female"},
+            "Fedora": {"target_count": 3, "tolerance": 0},
+        }},
+    }}
+    config = CompiledConfig(numerology)
+    masks = ConstraintMasks(config, CompiledRules({}))
+    weights = {trait_id: 1 for trait_id in range(config.trait_total)}
+    sampler = MaskedTraitSampler(masks, lambda trait_id: weights[trait_id])
+    hat = config.category_index["Hat"]
+    cap, tiara, fedora = (config.trait_id("Hat", name) for name in ("Cap", "Tiara", "Fedora"))
+    rng = random.Random(1)
+
+    male_candidates = masks.candidate_mask(hat, "Male")
+    assert not (male_candidates >> tiara) & 1
+    assert {sampler.sample(hat, "Male", male_candidates, rng) for _ in range(50)} == {cap, fedora}
+    assert {sampler.sample(hat, "Male", 1 << fedora, rng) for _ in range(20)} == {fedora}
+
+    weights[cap] = 0
+    sampler.refresh(cap)
+    assert {sampler.sample(hat, "Female", masks.candidate_mask(hat, "Female"), rng) for _ in range(50)} == {tiara, fedora}
+    assert sampler.sample(hat, "Female", 1 << cap, rng) is None # Only zero-weight traits valid
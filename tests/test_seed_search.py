@@ -0,0 +1,85 @@
+# tests/test_seed_search.py
+"""
+Tests for the multi-seed search mode.
+"""
+import pytest
+
+try:
+    from src.seed_search import search_seeds, score_seed, parse_seed_range, SeedResult
+except ImportError:
+    import sys
+    import os
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+    from src.seed_search import search_seeds, score_seed, parse_seed_range, SeedResult
+
+
+NUMEROLOGY = {
+    "target_count": 8,
+    "categories": {
+        "Hat": {"traits": {f"Hat {i}": {"target_count": 2, "tolerance": 0} for i in range(4)}},
+        "Eyes": {"traits": {f"Eyes {i}": {"target_count": 1, "tolerance": 0} for i in range(8)}},
+    }
+}
+# Hat totals 8 but one trait wants 3 with no tolerance: at least one trait is always off.
+IMPOSSIBLE = {
+    "target_count": 4,
+    "categories": {"Hat": {"traits": {"Cap": {"target_count": 3, "tolerance": 0}, "Fedora": {"target_count": 3, "tolerance": 0}}}}
+}
+
+
+def test_parse_seed_range():
+    assert parse_seed_range("3-6") == [3, 4, 5, 6]
+    assert parse_seed_range("1,5, 9") == [1, 5, 9]
+    assert parse_seed_range("7,10-11") == [7, 10, 11]
+    with pytest.raises(ValueError):
+        parse_seed_range("9-2")
+    with pytest.raises(ValueError):
+        parse_seed_range("")
+
+
+def test_score_seed_measures_violations():
+    result = score_seed(IMPOSSIBLE, {}, seed=1)
+    assert not result.is_perfect
+    assert result.violation_count >= 1
+    assert result.violation_total >= 1
+    assert score_seed(NUMEROLOGY, {}, seed=1).score < result.score
+
+
+def test_search_stops_at_first_perfect_seed_in_order():
+    seen = []
+    search = search_seeds(NUMEROLOGY, {}, [11, 12, 13], workers=1, progress_callback=seen.append)
+    assert search.best.seed == 11 and search.best.is_perfect
+    assert [r.seed for r in seen] == [11]
+    assert search.cancelled == 2
+
+
+def test_pooled_search_counts_only_cancelled_seeds():
+    search = search_seeds(NUMEROLOGY, {}, list(range(11, 19)), workers=2)
+    assert search.best.seed == 11 and search.best.is_perfect
+    # Seeds that were already running when 11 finished are neither completed results nor cancelled
+    assert len(search.results) + search.cancelled <= 8
+
+
+def test_seed_that_cannot_be_set_up_is_a_failed_seed():
+    result = score_seed(NUMEROLOGY, {}, seed=1, generator_kwargs={"adjustment_mode": "bogus"})
+    assert result.error is not None and "adjustment mode" in result.error and not result.is_perfect
+    search = search_seeds(NUMEROLOGY, {}, [1, 2], workers=1, generator_kwargs={"adjustment_mode": "bogus"})
+    assert len(search.results) == 2 and search.best.error is not None
+
+
+def test_search_ranks_imperfect_seeds_by_score():
+    search = search_seeds(IMPOSSIBLE, {}, [1, 2, 3], workers=1)
+    assert len(search.results) == 3
+    assert search.best.score == min(r.score for r in search.results)
+
+
+def test_process_pool_matches_inline_search():
+    inline = search_seeds(NUMEROLOGY, {}, list(range(6)), workers=1, stop_on_perfect=False)
+    pooled = search_seeds(NUMEROLOGY, {}, list(range(6)), workers=2, stop_on_perfect=False)
+    assert [(r.seed, r.score) for r in pooled.results] == [(r.seed, r.score) for r in inline.results]
+    assert pooled.best.seed == inline.best.seed
+
+
+def test_best_prefers_fewer_violations_then_earlier_seed():
+    assert min([SeedResult(seed=5, violation_count=1, violation_total=2), SeedResult(seed=6, violation_count=1, violation_total=1)], key=lambda r: r.score).seed == 6
+    assert SeedResult(seed=1, error="Duplicate").score > SeedResult(seed=2, violation_count=3, violation_total=9).score
@@ -0,0 +1,90 @@
+# tests/test_swap_repair.py
+"""
+Tests for the count-neutral swap repair built on Generator._can_swap / _execute_swap.
+"""
+
+try:
+    from src.generator import Generator
+    from src.combination_index import CombinationIndex
+    from src.token_state import TokenStates
+except ImportError:
+    import sys
+    import os
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+    from src.generator import Generator
+    from src.combination_index import CombinationIndex
+    from src.token_state import TokenStates
+
+
+NUMEROLOGY = {
+    "target_count": 4,
+    "categories": {
+        "Gender": {"traits": {"Male": {"target_count": 2, "tolerance": 0}, "Female": {"target_count": 2, "tolerance": 0}}},
+        "Hat": {"traits": {
+            "Fedora": {"target_count": 1, "tolerance": 0, "gender": "Male"},
+            "Cap": {"target_count": 2, "tolerance": 0},
+            "Beret": {"target_count": 1, "tolerance": 0},
+        }},
+        "Eyes": {"traits": {"Blue": {"target_count": 2, "tolerance": 0}, "Green": {"target_count": 2, "tolerance": 0}}},
+        "Glyph": {"traits": {"glyph_01": {"target_count": 2, "tolerance": 0}, "glyph_02": {"target_count": 2, "tolerance": 0}}},
+    }
+}
+RULES = {"incompatibilities": [{"trait_a": ["Hat", "Cap"], "trait_b": ["Eyes", "Green"]}]}
+
+
+def make_generator(token_traits):
+    generator = Generator(NUMEROLOGY, RULES, seed=1, log_callback=lambda m: None, swap_repair=True)
+    generator.tokens_data = [
+        {"token_id": str(i + 1), "traits": dict(traits), "law_number": int(traits["Glyph"][-2:])}
+        for i, traits in enumerate(token_traits)
+    ]
+    for traits in token_traits:
+        for cat_val in traits.items():
+            generator.trait_counts[cat_val] += 1
+    generator.combination_index = CombinationIndex(generator.compiled_config, generator.tokens_data)
+    generator.token_states = TokenStates(generator.compiled_config, generator.tokens_data)
+    for token_idx in range(len(generator.tokens_data)):
+        generator.combination_index.add(token_idx)
+    return generator
+
+
+def test_can_swap_respects_gender_and_rules():
+    generator = make_generator([
+        {"Gender": "Male", "Hat": "Fedora", "Eyes": "Blue", "Glyph": "glyph_01"},
+        {"Gender": "Female", "Hat": "Cap", "Eyes": "Blue", "Glyph": "glyph_02"},
+        {"Gender": "Female", "Hat": "Beret", "Eyes": "Green", "Glyph": "glyph_01"},
+        {"Gender": "Male", "Hat": "Cap", "Eyes": "Green", "Glyph": "glyph_02"},
+    ])
+    assert generator._can_swap(0, 1, "Hat") == False   # Fedora is Male-only
+    assert generator._can_swap(1, 2, "Hat") == False   # Cap + Green is incompatible
+    assert generator._can_swap(0, 3, "Hat") == True    # Both Male; Cap moves onto Blue eyes
+    assert generator._can_swap(0, 1, "Gender") == False # The first token would be Female with a Fedora
+
+
+def test_execute_swap_keeps_counts_and_law_numbers():
+    generator = make_generator([
+        {"Gender": "Male", "Hat": "Fedora", "Eyes": "Blue", "Glyph": "glyph_01"},
+        {"Gender": "Female", "Hat": "Cap", "Eyes": "Blue", "Glyph": "glyph_02"},
+    ])
+    counts_before = list(generator.trait_counts.counts)
+    generator._execute_swap(0, 1, "Glyph")
+    assert generator.tokens_data[0]["traits"]["Glyph"] == "glyph_02"
+    assert generator.tokens_data[0]["law_number"] == 2
+    assert generator.tokens_data[1]["law_number"] == 1
+    assert list(generator.trait_counts.counts) == counts_before
+
+
+def test_swap_repair_fixes_violation_and_duplicate_without_changing_counts():
+    generator = make_generator([
+        {"Gender": "Male", "Hat": "Cap", "Eyes": "Green", "Glyph": "glyph_01"},   # Violates Cap/Green
+        {"Gender": "Female", "Hat": "Beret", "Eyes": "Blue", "Glyph": "glyph_02"},
+        {"Gender": "Male", "Hat": "Fedora", "Eyes": "Blue", "Glyph": "glyph_01"},
+        {"Gender": "Female", "Hat": "Cap", "Eyes": "Green", "Glyph": "glyph_02"}, # Violates Cap/Green
+    ])
+    counts_before = list(generator.trait_counts.counts)
+    generator._run_swap_repair_phase()
+    assert list(generator.trait_counts.counts) == counts_before
+    combinations = [tuple(sorted(t["traits"].items())) for t in generator.tokens_data]
+    assert len(set(combinations)) == len(combinations)
+    for token_data in generator.tokens_data:
+        assert generator.compiled_rules.find_violation(token_data["traits"]) is None
@@ -0,0 +1,60 @@
+# tests/test_token_pool.py
+"""
+Tests for TokenPool and the singleton seeding built on it.
+"""
+import random
+
+try:
+    from src.token_pool import TokenPool
+    from src.generator import Generator
+    from src.token_state import TokenStates
+except ImportError:
+    import sys
+    import os
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+    from src.token_pool import TokenPool
+    from src.generator import Generator
+    from src.token_state import TokenStates
+
+
+def test_pool_membership_and_removal():
+    pool = TokenPool([5, 1, 9, 3])
+    pool.remove(5)
+    pool.discard(42)
+    assert len(pool) == 3 and 5 not in pool and 9 in pool
+    assert sorted(pool) == [1, 3, 9]
+    pool.add(5)
+    pool.add(5)
+    assert sorted(pool) == [1, 3, 5, 9]
+
+
+def test_random_order_is_a_uniform_permutation():
+    pool = TokenPool(range(4))
+    rng = random.Random(7)
+    first_counts = [0] * 4
+    for _ in range(4000):
+        order = list(pool.random_order(rng))
+        assert sorted(order) == [0, 1, 2, 3]
+        first_counts[order[0]] += 1
+    assert all(900 < count < 1100 for count in first_counts)
+    for token_idx in range(4):
+        pool.remove(token_idx) # Positions stay consistent after shuffling
+    assert len(pool) == 0
+
+
+def test_singletons_seed_distinct_valid_tokens():
+    numerology = {"target_count": 12, "categories": {
+        "Gender": {"traits": {"Male": {"target_count": 6, "tolerance": 0}, "Female": {"target_count": 6, "tolerance": 0}}},
+        "Hat": {"traits": {"Crown": {"target_count": 1, "tolerance": 0}, "Cap": {"target_count": 11, "tolerance": 0}}},
+        "Eyes": {"traits": {"Laser": {"target_count": 1, "tolerance": 0}, "Halo": {"target_count": 1, "tolerance": 0},
+                            "Blue": {"target_count": 10, "tolerance": 0}}},
+    }}
+    rules = {"incompatibilities": [{"trait_a": ["Hat", "Crown"], "trait_b": ["Eyes", "Laser"]}]}
+    for seed in range(20):
+        generator = Generator(numerology, rules, seed=seed, log_callback=lambda m: None)
+        generator.tokens_data = [{"token_id": str(i + 1), "traits": {}, "law_number": None} for i in range(12)]
+        generator.token_states = TokenStates(generator.compiled_config, generator.tokens_data)
+        generator._seed_special_singletons()
+        seeded = [data["traits"] for data in generator.tokens_data if data["traits"]]
+        assert sorted(trait for traits in seeded for trait in traits.values()) == ["Crown", "Halo", "Laser"]
+        assert len(seeded) == 3 # Each singleton on its own token, so Crown never meets Laser
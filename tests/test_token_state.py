@@ -0,0 +1,93 @@
+# tests/test_token_state.py
+"""
+Tests for TokenStates, the per-token derived gender / law number / glyph tier record, and glyph_tier.
+"""
+import os
+import pytest
+
+try:
+    from src.compiled_config import CompiledConfig, glyph_tier
+    from src.token_state import TokenStates
+    from src.generator import Generator
+    from src.pre_validator import load_yaml_config
+except ImportError:
+    import sys
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+    from src.compiled_config import CompiledConfig, glyph_tier
+    from src.token_state import TokenStates
+    from src.generator import Generator
+    from src.pre_validator import load_yaml_config
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+NUMEROLOGY = {
+    "target_count": 4,
+    "categories": {
+        "Body": {"traits": {
+            "Robot": {"target_count": 2, "tolerance": 0},
+            "Queen": {"target_count": 2, "tolerance": 0, "gender": "Female"},
+        }},
+        "Glyph": {"traits": {
+            "glyph_03": {"target_count": 1, "tolerance": 0},
+            "glyph_20": {"target_count": 1, "tolerance": 0},
+            "blank": {"target_count": 2, "tolerance": 0},
+        }},
+    }
+}
+
+
+def test_glyph_tier_by_law_number():
+    assert [glyph_tier(law) for law in (1, 7, 8, 14, 15, 28, 29, 48)] == [
+        "Sovereign", "Sovereign", "Capo", "Capo", "Soldier", "Soldier", "Street", "Street"]
+    assert glyph_tier(None) == "Blank"
+    assert glyph_tier(49) is None
+
+
+def test_states_are_derived_from_gender_body_and_glyph():
+    tokens_data = [
+        {"token_id": "1", "traits": {"Body": "Queen", "Glyph": "glyph_03"}, "law_number": None},
+        {"token_id": "2", "traits": {"Body": "Robot", "Glyph": "blank"}, "law_number": None},
+        {"token_id": "3", "traits": {"Gender": "Male", "Body": "Queen"}, "law_number": None},
+        {"token_id": "4", "traits": {}, "law_number": None},
+    ]
+    states = TokenStates(CompiledConfig(NUMEROLOGY), tokens_data)
+    assert states.genders == ["Female", "Unknown", "Male", "Unknown"] # A Gender trait outranks the Body tag
+    assert states.law_numbers == [3, None, None, None]
+    assert states.tiers == ["Sovereign", "Blank", None, None]
+    assert list(states.is_sovereign) == [1, 0, 0, 0]
+    assert [data["law_number"] for data in tokens_data] == [3, None, None, None]
+
+
+def test_update_follows_trait_changes():
+    tokens_data = [{"token_id": "1", "traits": {"Body": "Robot"}, "law_number": None}]
+    states = TokenStates(CompiledConfig(NUMEROLOGY), tokens_data)
+    tokens_data[0]["traits"]["Body"] = "Queen"
+    tokens_data[0]["traits"]["Glyph"] = "glyph_20"
+    states.update(0, "Body")
+    states.update(0, "Glyph")
+    assert (states.genders[0], states.law_numbers[0], states.tiers[0], states.is_sovereign[0]) == ("Female", 20, "Soldier", 0)
+    assert tokens_data[0]["law_number"] == 20
+    tokens_data[0]["traits"]["Glyph"] = "glyph_03"
+    states.update(0, "Eyes") # Not a derived category: nothing is recomputed
+    assert states.law_numbers[0] == 20
+    states.update(0, "Glyph")
+    assert (states.law_numbers[0], states.is_sovereign[0]) == (3, 1)
+
+
+@pytest.mark.parametrize("generator_kwargs", [
+    {},
+    {"allocation_mode": "deck"},
+    {"adjustment_mode": "flow", "swap_repair": True},
+])
+def test_states_match_generated_tokens(generator_kwargs):
+    numerology = load_yaml_config(os.path.join(PROJECT_ROOT, "numerology.yaml"))
+    rules = load_yaml_config(os.path.join(PROJECT_ROOT, "rules.yaml"))
+    generator = Generator(numerology, rules, seed=5, log_callback=lambda m: None, **generator_kwargs)
+    generator.generate_tokens()
+    fresh = TokenStates(generator.compiled_config, [dict(data, traits=dict(data["traits"])) for data in generator.tokens_data])
+    states = generator.token_states
+    assert states.genders == fresh.genders
+    assert states.law_numbers == fresh.law_numbers == [data["law_number"] for data in generator.tokens_data]
+    assert states.tiers == fresh.tiers
+    assert states.is_sovereign == fresh.is_sovereign
+    assert sum(states.is_sovereign) == 7
@@ -0,0 +1,112 @@
+# tests/test_token_store.py
+"""
+Tests for the columnar TokenStore: row views, file backing and reopening, and the Token views the Generator returns.
+"""
+import os
+import pytest
+
+try:
+    from src.models import Token, hash_tokens
+    from src.token_store import TokenStore, MISSING
+    from src.compiled_config import CompiledConfig
+    from src.generator import Generator
+    from src.pre_validator import load_yaml_config
+except ImportError:
+    import sys
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+    from src.models import Token, hash_tokens
+    from src.token_store import TokenStore, MISSING
+    from src.compiled_config import CompiledConfig
+    from src.generator import Generator
+    from src.pre_validator import load_yaml_config
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+NUMEROLOGY = {
+    "target_count": 3,
+    "categories": {
+        "Body": {"traits": {"Robot": {"target_count": 2, "tolerance": 0}, "Queen": {"target_count": 1, "tolerance": 0}}},
+        "Glyph": {"traits": {"glyph_03": {"target_count": 1, "tolerance": 0}, "blank": {"target_count": 2, "tolerance": 0}}},
+        "Hat": {"traits": {"Cap": {"target_count": 2, "tolerance": 0}}},
+    }
+}
+
+
+def make_store(path=None):
+    store = TokenStore.create(CompiledConfig(NUMEROLOGY), 3, 1, path)
+    rows = store.rows()
+    rows[0]["traits"].update({"Hat": "Cap", "Body": "Robot"})
+    rows[1]["traits"].update({"Body": "Queen", "Glyph": "glyph_03"})
+    rows[1]["law_number"] = 3
+    rows[2]["traits"].update({"Body": "Robot", "Hat": "Halo", "Glyph": "blank"}) # Halo is not in numerology
+    return store
+
+
+def test_rows_read_and_write_the_codes():
+    store = make_store()
+    rows = store.rows()
+    assert [row["token_id"] for row in rows] == ["1", "2", "3"]
+    assert rows[0]["traits"] == {"Body": "Robot", "Hat": "Cap"} and list(rows[0]["traits"]) == ["Body", "Hat"] # Category order
+    assert "Glyph" not in rows[0]["traits"] and rows[0]["traits"].get("Glyph") is None and len(rows[0]["traits"]) == 2
+    assert store.names[-1] == "Halo" and store.code_categories[-1] == 2
+    assert store.code_array().tolist() == [[0, MISSING, 4], [1, 2, MISSING], [0, 3, 5]]
+    assert [store.law_numbers[row] for row in range(3)] == [None, 3, None]
+    assert [store.tier(row) for row in range(3)] == [None, "Sovereign", None] # No law number set on token 3 yet
+    rows[2]["law_number"] = None
+    assert store.tier(2) == "Blank"
+    del rows[0]["traits"]["Hat"]
+    assert rows[0]["traits"] == {"Body": "Robot"} and rows[0]["traits"] != rows[2]["traits"]
+    with pytest.raises(KeyError):
+        rows[0]["traits"]["Eyes"] = "Blue" # Not a numerology category
+
+
+def test_views_match_owned_tokens():
+    tokens = make_store().tokens()
+    owned = Token("2", {"Body": "Queen", "Glyph": "glyph_03"}, law_number=3)
+    assert tokens[1] == owned and tokens[1].token_id == "2" and tokens[1].law_number == 3
+    assert tokens[0].trait_count == 2 and tokens[0].special_abilities == [] and tokens[0].set_bonuses == []
+    assert hash_tokens(tokens) == [Token(t.token_id, dict(t.traits)).hash_id for t in tokens]
+    assert "Token(token_id='2', traits={'Body': 'Queen', 'Glyph': 'glyph_03'}" in repr(tokens[1])
+
+
+def test_view_traits_are_rebuilt_until_assigned():
+    token = make_store().tokens()[0]
+    hash_before = token.hash_id
+    token.traits["Hat"] = "Beret" # Edits to the built dict are not kept
+    assert token.traits == {"Body": "Robot", "Hat": "Cap"} and token.hash_id == hash_before
+    token.traits = {"Body": "Robot"} # Assigning detaches the token from the store
+    token.traits["Hat"] = "Beret"
+    assert token.traits == {"Body": "Robot", "Hat": "Beret"}
+    assert token.hash_id == Token("1", {"Body": "Robot", "Hat": "Beret"}).hash_id
+
+
+def test_file_store_reopens_without_the_config(tmp_path):
+    path = str(tmp_path / "tokens.store")
+    with make_store(path) as store:
+        expected = [dict(row["traits"]) for row in store.rows()]
+    with TokenStore.open(path) as reopened:
+        assert [dict(row["traits"]) for row in reopened.rows()] == expected
+        assert reopened.law_numbers[1] == 3 and reopened.tier(1) == "Sovereign"
+        assert reopened.code_array()[2, 2] == 5 and reopened.names[5] == "Halo"
+        with pytest.raises(TypeError):
+            reopened.set_trait(0, 2, "Cap") # Read-only mapping
+    (tmp_path / "other").write_bytes(b"not a store" * 4)
+    with pytest.raises(ValueError):
+        TokenStore.open(str(tmp_path / "other"))
+
+
+def test_generator_returns_views_over_its_store(tmp_path):
+    numerology = load_yaml_config(os.path.join(PROJECT_ROOT, "numerology.yaml"))
+    rules = load_yaml_config(os.path.join(PROJECT_ROOT, "rules.yaml"))
+    in_memory = Generator(numerology, rules, seed=2, log_callback=lambda m: None).generate_tokens()
+    path = str(tmp_path / "run.store")
+    generator = Generator(numerology, rules, seed=2, log_callback=lambda m: None, token_store_path=path)
+    tokens = generator.generate_tokens()
+    assert all(token._table is generator.token_store for token in tokens)
+    assert tokens == in_memory
+    for token, token_data in zip(tokens, generator.tokens_data):
+        assert token.token_id == token_data["token_id"]
+        assert token.traits == token_data["traits"]
+        assert token.law_number == token_data["law_number"]
+    with TokenStore.open(path) as reopened:
+        assert reopened.tokens() == tokens
@@ -0,0 +1,55 @@
+# tests/test_token_table.py
+"""
+Tests for CodeMatrix, the token x category code matrix final validation runs on.
+"""
+import os
+
+try:
+    from src.token_table import CodeMatrix, MISSING
+    from src.token_store import TokenStore
+    from src.compiled_config import CompiledConfig
+except ImportError:
+    import sys
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+    from src.token_table import CodeMatrix, MISSING
+    from src.token_store import TokenStore
+    from src.compiled_config import CompiledConfig
+
+NUMEROLOGY = {
+    "target_count": 3,
+    "categories": {
+        "Body": {"traits": {"Robot": {"target_count": 2, "tolerance": 0}, "Queen": {"target_count": 1, "tolerance": 0}}},
+        "Hat": {"traits": {"Cap": {"target_count": 2, "tolerance": 0}}},
+    }
+}
+
+
+TOKENS_DATA = [
+    {"token_id": "1", "traits": {"Hat": "Cap", "Body": "Robot"}, "law_number": None},
+    {"token_id": "2", "traits": {"Body": "Queen"}, "law_number": 4},
+    {"token_id": "3", "traits": {"Body": "Robot", "Hat": "Halo"}, "law_number": None}, # Halo is not in numerology
+]
+
+
+def test_string_table_and_rows():
+    matrix = CodeMatrix(CompiledConfig(NUMEROLOGY), TOKENS_DATA)
+    assert matrix.names == ["Robot", "Queen", "Cap", "Halo"]
+    assert list(matrix.columns[1]) == [2, MISSING, 3]
+    assert [matrix.row_traits(row) for row in range(3)] == [
+        {"Body": "Robot", "Hat": "Cap"}, {"Body": "Queen"}, {"Body": "Robot", "Hat": "Halo"}] # Category order
+    assert [matrix.row_trait_count(row) for row in range(3)] == [2, 1, 2]
+    assert matrix.code_of("Hat", "Halo") == 3 and matrix.code_of("Hat", "Beret") is None
+
+
+def test_matrix_over_store_shares_its_buffer():
+    config = CompiledConfig(NUMEROLOGY)
+    store = TokenStore.create(config, 3, 1)
+    for token_data, row in zip(TOKENS_DATA, store.rows()):
+        row["traits"] = token_data["traits"]
+    matrix = CodeMatrix.from_store(config, store)
+    built = CodeMatrix(config, TOKENS_DATA)
+    assert [list(column) for column in matrix.columns] == [list(column) for column in built.columns]
+    assert matrix.extra_names == built.extra_names == [("Hat", "Halo")]
+    assert matrix.code_array().tolist() == built.code_array().tolist()
+    store.set_trait(1, 1, "Cap") # Seen through the matrix without rebuilding it
+    assert matrix.row_traits(1) == {"Body": "Queen", "Hat": "Cap"} and matrix.code_array()[1, 1] == 2
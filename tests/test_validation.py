@@ -0,0 +1,153 @@
+# tests/test_validation.py
+"""
+Tests for the one-pass final validation over the token x category code matrix.
+Each check runs with NumPy (when installed) and with the plain-Python fallback.
+"""
+import json
+import os
+import random
+import pytest
+
+try:
+    import src.validation as validation
+    from src.validation import validate_collection, CodeMatrix, MISSING
+    from src.generator import Generator
+    from src.pre_validator import load_yaml_config
+except ImportError:
+    import sys
+    import os
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+    import src.validation as validation
+    from src.validation import validate_collection, CodeMatrix, MISSING
+    from src.generator import Generator
+    from src.pre_validator import load_yaml_config
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+NUMEROLOGY = {
+    "target_count": 5,
+    "categories": {
+        "Gender": {"traits": {"Male": {"target_count": 3, "tolerance": 0}, "Female": {"target_count": 2, "tolerance": 0}}},
+        "Hat": {"traits": {"Cap": {"target_count": 3, "tolerance": 0}, "Beret": {"target_count": 2, "tolerance": 0}}},
+        "Eyes": {"traits": {"Blue": {"target_count": 3, "tolerance": 0}, "Green": {"target_count": 2, "tolerance": 0}}},
+        "Beard": {"gender_specific_to": "Male", "traits": {"Full": {"target_count": 3, "tolerance": 0}}},
+        "Aura": {"traits": {"Glow": {"target_count": 4, "tolerance": 0}, "Dim": {"target_count": 1, "tolerance": 0}}},
+    }
+}
+RULES = {"incompatibilities": [
+    {"trait_a": ["Hat", "Cap"], "trait_b": ["Eyes", "Green"]},
+    {"trait_a": ["Hat", "Beret"], "trait_b": ["Eyes", "Blue"], "breakable_by": ["Beard", "Full"]},
+]}
+
+
+@pytest.fixture(params=["numpy", "python"])
+def engine(request, monkeypatch):
+    if request.param == "numpy":
+        if validation.np is None:
+            pytest.skip("NumPy is not installed")
+    else:
+        monkeypatch.setattr(validation, "np", None)
+    return request.param
+
+
+def validate(token_traits, rules=RULES):
+    generator = Generator(NUMEROLOGY, rules, seed=1, log_callback=lambda m: None)
+    tokens_data = [{"token_id": str(i + 1), "traits": traits, "law_number": None} for i, traits in enumerate(token_traits)]
+    for traits in token_traits:
+        for cat_val in traits.items():
+            if cat_val in generator.compiled_config.trait_index:
+                generator.trait_counts[cat_val] += 1
+    return validate_collection(generator.compiled_config, generator.constraint_masks, generator.compiled_rules,
+                               tokens_data, generator.trait_counts.counts)
+
+
+def test_valid_collection_has_an_empty_report(engine):
+    report = validate([
+        {"Gender": "Male", "Hat": "Cap", "Eyes": "Blue", "Beard": "Full", "Aura": "Glow"},
+        {"Gender": "Male", "Hat": "Beret", "Eyes": "Green", "Beard": "Full", "Aura": "Glow"},
+        {"Gender": "Female", "Hat": "Beret", "Eyes": "Green", "Aura": "Glow"},
+        {"Gender": "Female", "Hat": "Cap", "Eyes": "Blue", "Aura": "Glow"},
+        {"Gender": "Male", "Hat": "Cap", "Eyes": "Blue", "Beard": "Full", "Aura": "Dim"},
+    ])
+    assert report.is_valid and report.first_error() is None
+    assert report.counts == [] and report.unique_tokens == 5
+
+
+def test_every_violation_is_reported(engine):
+    report = validate([
+        {"Gender": "Male", "Hat": "Cap", "Eyes": "Green", "Beard": "Full", "Aura": "Glow"},  # Cap + Green
+        {"Gender": "Female", "Hat": "Beret", "Eyes": "Blue", "Aura": "Glow"},                 # Beret + Blue, no Beard
+        {"Gender": "Male", "Hat": "Cap", "Eyes": "Blue", "Aura": "Glow"},                     # Missing Beard
+        {"Gender": "Male", "Hat": "Cap", "Eyes": "Blue", "Aura": "Glow"},                     # Duplicate of 3
+        {"Gender": "Male", "Hat": "Cap", "Eyes": "Blue", "Aura": "Glow"},                     # Duplicate of 3
+        {"Gender": "Male", "Hat": "Beret", "Eyes": "Blue", "Beard": "Full", "Aura": "Dim"},   # Beard breaks Beret + Blue
+    ])
+    assert [(v.token_id, v.duplicate_of) for v in report.duplicates] == [("4", "3"), ("5", "3")]
+    assert report.unique_tokens == 4
+    assert [(v.token_id, v.category_a, v.trait_a, v.category_b, v.trait_b) for v in report.incompatibilities] == [
+        ("1", "Hat", "Cap", "Eyes", "Green"), ("2", "Hat", "Beret", "Eyes", "Blue")]
+    assert [(v.token_id, v.gender, v.category) for v in report.missing_categories] == [
+        ("3", "Male", "Beard"), ("4", "Male", "Beard"), ("5", "Male", "Beard")]
+    assert [(v.category, v.trait, v.count) for v in report.counts] == [("Gender", "Male", 5), ("Gender", "Female", 1), ("Hat", "Cap", 4),
+                                                                       ("Eyes", "Blue", 5), ("Eyes", "Green", 1), ("Beard", "Full", 2), ("Aura", "Glow", 5)]
+    assert report.error_count == 7
+    assert report.first_error() == ("Validation Error (Uniqueness): Duplicate token. Token ID 4 is same as 3. "
+                                    "Traits: {'Gender': 'Male', 'Hat': 'Cap', 'Eyes': 'Blue', 'Aura': 'Glow'}")
+    assert json.loads(json.dumps(report.to_dict()))["valid"] is False
+
+
+def test_undefined_traits_keep_rows_distinct_and_honour_rules(engine):
+    rules = {"incompatibilities": [{"trait_a": ["Hat", "Tophat"], "trait_b": ["Eyes", "Blue"]}]}
+    report = validate([
+        {"Gender": "Female", "Hat": "Tophat", "Eyes": "Blue", "Aura": "Glow"},
+        {"Gender": "Female", "Hat": "Fez", "Eyes": "Blue", "Aura": "Glow"},
+        {"Gender": "Unisex", "Aura": "Glow"},
+    ], rules)
+    assert report.duplicates == []
+    assert [(v.token_id, v.trait_a) for v in report.incompatibilities] == [("1", "Tophat")]
+    # An undefined gender still needs every category it has candidates for, but not the Male-only Beard.
+    assert [(v.token_id, v.gender, v.category) for v in report.missing_categories] == [("3", "Unisex", "Hat"), ("3", "Unisex", "Eyes")]
+
+
+def test_code_matrix_round_trips_token_traits():
+    generator = Generator(NUMEROLOGY, RULES, seed=1, log_callback=lambda m: None)
+    tokens_data = [{"token_id": "1", "traits": {"Gender": "Male", "Hat": "Fez"}}, {"token_id": "2", "traits": {"Eyes": "Blue"}}]
+    matrix = CodeMatrix(generator.compiled_config, tokens_data)
+    assert matrix.columns[1][0] >= generator.compiled_config.trait_total and matrix.columns[0][1] == MISSING
+    assert [matrix.row_traits(i) for i in range(2)] == [data["traits"] for data in tokens_data]
+
+
+def test_engines_agree_on_corrupted_project_collection(monkeypatch):
+    if validation.np is None:
+        pytest.skip("NumPy is not installed")
+    numerology = load_yaml_config(os.path.join(PROJECT_ROOT, "numerology.yaml"))
+    rules = load_yaml_config(os.path.join(PROJECT_ROOT, "rules.yaml"))
+    generator = Generator(numerology, rules, seed=3, log_callback=lambda m: None)
+    generator.generate_tokens()
+    rng = random.Random(3)
+    config = generator.compiled_config
+    for token_data in rng.sample(generator.tokens_data, 60):
+        cat = rng.choice(config.category_names)
+        if rng.random() < 0.3:
+            token_data["traits"].pop(cat, None)
+        else:
+            token_data["traits"][cat] = config.trait_names[rng.choice(config.category_trait_ids[config.category_index[cat]])]
+    generator.tokens_data[10]["traits"] = dict(generator.tokens_data[20]["traits"])
+    args = (config, generator.constraint_masks, generator.compiled_rules, generator.tokens_data, generator.trait_counts.counts)
+    with_numpy = validate_collection(*args).to_dict()
+    monkeypatch.setattr(validation, "np", None)
+    assert validate_collection(*args).to_dict() == with_numpy
+    assert with_numpy["duplicates"] and with_numpy["incompatibilities"] and with_numpy["missing_categories"]
+
+
+def test_generator_keeps_report_and_raises_first_error():
+    numerology = load_yaml_config(os.path.join(PROJECT_ROOT, "numerology.yaml"))
+    rules = load_yaml_config(os.path.join(PROJECT_ROOT, "rules.yaml"))
+    generator = Generator(numerology, rules, seed=1, log_callback=lambda m: None)
+    generator.generate_tokens()
+    assert generator.validation_report.is_valid
+    generator.tokens_data[1]["traits"] = dict(generator.tokens_data[0]["traits"])
+    del generator.tokens_data[2]["traits"]["Eyes"]
+    with pytest.raises(ValueError, match=r"Duplicate token\. Token ID 002 is same as 001.*\(1 more error"):
+        generator._final_validation_checks()
+    assert len(generator.validation_report.missing_categories) == 1
@@ -0,0 +1,88 @@
+# tests/test_weighting.py
+"""
+Tests for the supply-aware "lookahead" weighting of the weighted fill.
+"""
+import os
+import pytest
+
+try:
+    from src.generator import Generator
+    from src.pre_validator import load_yaml_config
+except ImportError:
+    import sys
+    import os
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+    from src.generator import Generator
+    from src.pre_validator import load_yaml_config
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+NUMEROLOGY = {
+    "target_count": 8,
+    "categories": {
+        "Gender": {"traits": {
+            "Male": {"target_count": 4, "tolerance": 0},
+            "Female": {"target_count": 2, "tolerance": 0},
+            "Unisex": {"target_count": 2, "tolerance": 0},
+        }},
+        "Hat": {"traits": {"Cap": {"target_count": 4, "tolerance": 0}, "Beret": {"target_count": 4, "tolerance": 0}}},
+        "Masks": {"traits": {
+            "Veil": {"target_count": 2, "tolerance": 0, "gender": "Female"},
+            "Bandana": {"target_count": 2, "tolerance": 0},
+            "Domino": {"target_count": 4, "tolerance": 0},
+        }},
+    }
+}
+RULES = {"incompatibilities": [{"trait_a": ["Hat", "Cap"], "trait_b": ["Masks", "Bandana"]}]}
+
+
+class RecordingRng:
+    """Captures the weights of a `choices` call and returns the first trait."""
+    def choices(self, population, weights, k):
+        self.weights = dict(zip(population, weights))
+        return [population[0]]
+
+
+def make_generator():
+    return Generator(NUMEROLOGY, RULES, seed=1, log_callback=lambda m: None, weighting_mode="lookahead")
+
+
+def test_unknown_weighting_mode_is_rejected():
+    with pytest.raises(ValueError):
+        Generator(NUMEROLOGY, RULES, weighting_mode="oracle")
+
+
+def test_compatible_share_discounts_forbidden_partners():
+    generator = make_generator()
+    config = generator.compiled_config
+    shares = generator._compatible_shares()
+    assert shares[config.trait_id("Masks", "Bandana")] == pytest.approx(0.5) # Cap takes half of the Hat slots
+    assert shares[config.trait_id("Hat", "Cap")] == pytest.approx(0.75)
+    assert shares[config.trait_id("Masks", "Domino")] == 1.0
+
+
+def test_scarce_traits_get_larger_weights():
+    generator = make_generator()
+    config = generator.compiled_config
+    supply_genders = generator._supply_genders_by_code()
+    veil, bandana, domino = (config.trait_id("Masks", name) for name in ("Veil", "Bandana", "Domino"))
+    assert [config.trait_names[g] for g in supply_genders[config.trait_genders[veil]]] == ["Female", "Unisex"]
+
+    # 4 tokens left to fill: this Female one (already counted) and 3 Male.
+    for gender, count in (("Male", 1), ("Female", 2), ("Unisex", 2)):
+        generator.trait_counts[("Gender", gender)] = count
+    rng = RecordingRng()
+    generator._draw_lookahead((veil, bandana, domino), "Female", supply_genders, generator._compatible_shares(), rng)
+    # Remaining + 1 over supply: Veil 3 / 1 Female token, Bandana 3 / (4 * 0.5), Domino 5 / 4.
+    assert rng.weights == {veil: pytest.approx(3.0), bandana: pytest.approx(1.5), domino: pytest.approx(1.25)}
+
+
+@pytest.mark.parametrize("seed", [1, 2])
+def test_lookahead_generates_complete_valid_collection(seed):
+    numerology = load_yaml_config(os.path.join(PROJECT_ROOT, "numerology.yaml"))
+    rules = load_yaml_config(os.path.join(PROJECT_ROOT, "rules.yaml"))
+    generator = Generator(numerology, rules, seed=seed, log_callback=lambda m: None, weighting_mode="lookahead")
+    tokens = generator.generate_tokens()
+    assert len(tokens) == 420
+    config = generator.compiled_config
+    assert all(config.within_tolerance(t, count) for t, count in enumerate(generator.trait_counts.counts))
@@ -3,19 +3,47 @@ import csv
 from pathlib import Path
 from collections import Counter
 
+from src.bundle import BundleReader, BUNDLE_NAME
+from src.exporter import MANIFEST_NAME
+
+def token_json_files(output_dir):
+    """Token ID -> JSON file: from the export manifest if present (any layout), else json/*.json"""
+    manifest_path = Path(output_dir) / MANIFEST_NAME
+    if manifest_path.is_file():
+        with open(manifest_path) as file:
+            manifest = json.load(file)
+        return {token_id: Path(output_dir) / "json" / relative_path for token_id, relative_path in manifest["files"].items()}
+    return {f.stem: f for f in Path(output_dir).glob("json/*.json")}
+
 def quick_verify(output_dir):
     """Quick verification of the most important aspects"""
     
     # 1. Check all 420 JSONs exist
-    json_files = list(Path(output_dir).glob("json/*.json"))
-    print(f"✓ Found {len(json_files)} NFTs (expected 420)")
+    json_files = token_json_files(output_dir)
+    missing_files = [token_id for token_id, f in json_files.items() if not f.is_file()]
+    print(f"{'✓' if not missing_files else '✗'} Found {len(json_files) - len(missing_files)} NFTs (expected 420)")
     
     # 2. Load all NFTs
     nfts = []
-    for f in json_files:
+    for token_id, f in json_files.items():
+        if token_id in missing_files: continue
         with open(f) as file:
             nfts.append(json.load(file))
     
+    # 2b. When the export also packed a bundle, it must hold the same documents as the JSON files
+    bundle_ok = True
+    bundle_path = Path(output_dir) / BUNDLE_NAME
+    if bundle_path.is_file():
+        with BundleReader(str(bundle_path)) as reader:
+            mismatched = []
+            for n in range(len(reader)):
+                token_id = reader.token_id(n)
+                if (token_id not in json_files or token_id in missing_files
+                        or json_files[token_id].stat().st_size != len(reader.document(n))):
+                    mismatched.append(token_id)
+            bundle_ok = len(reader) == len(json_files) and not mismatched
+            print(f"{'✓' if bundle_ok else '✗'} Bundle holds {len(reader)} NFTs, {len(mismatched)} differing in size from their JSON files")
+    
     # 3. Check uniqueness
     # Assuming 'hash_id' is a unique identifier in your NFT JSON structure
     # If not, you might need to create a unique signature from traits
@@ -51,7 +79,7 @@ def quick_verify(output_dir):
         count = glyph_counts.get(glyph_key, 0)
         print(f"{'✓' if count == 1 else '✗'} {glyph_key}: {count} (expected 1)")
     
-    all_passed = (len(json_files) == 420 and 
+    all_passed = (len(json_files) == 420 and not missing_files and bundle_ok and 
                   len(set(hashes)) == 420 and 
                   joker_count == 1 and
                   all(glyph_counts.get(f'glyph_{i:02d}', 0) == 1 for i in range(1,8)))